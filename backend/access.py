@@ -0,0 +1,90 @@
+import os
+import time
+import contextvars
+from http.cookies import SimpleCookie
+from fastapi import Depends
+from pymongo import ReadPreference
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from pymongo.write_concern import WriteConcern
+
+# Data-access policies. Routes declare the class of read they do
+# (Depends(read_policy("analytical"))) and collection handles can pin a write
+# policy (LazyCollection(name, policy="fire_and_forget")); db.LazyCollection
+# applies the matching read preference / write concern on every call.
+#
+#   analytical       dashboards, lists, feeds, analytics: DATA_ANALYTICAL_READ
+#                    (default secondaryPreferred) with maxStalenessSeconds
+#                    DATA_MAX_STALENESS_SECONDS (>= 90, Mongo's minimum)
+#   detail           single-document routes: primary (the client default)
+#   fire_and_forget  writes nobody waits on: w=DATA_FIRE_AND_FORGET_W, no journal
+#
+# Read-your-writes: a successful mutation sets a short-lived cookie; while it is
+# valid, that client's analytical reads go to the primary so it never sees a
+# list older than its own write.
+DATA_ANALYTICAL_READ = os.environ.get("DATA_ANALYTICAL_READ", "secondaryPreferred")
+DATA_MAX_STALENESS_SECONDS = max(90, int(os.environ.get("DATA_MAX_STALENESS_SECONDS", "90")))
+DATA_FIRE_AND_FORGET_W = os.environ.get("DATA_FIRE_AND_FORGET_W", "1")
+READ_YOUR_WRITES_SECONDS = int(os.environ.get("READ_YOUR_WRITES_SECONDS", str(DATA_MAX_STALENESS_SECONDS)))
+RYW_COOKIE = "ryw_until"
+
+
+def _w(value: str):
+    return int(value) if value.isdigit() else value
+
+
+def _read_preference(mode: str):
+    mode_id = read_pref_mode_from_name(mode)
+    if mode_id == 0:
+        return ReadPreference.PRIMARY
+    return make_read_preference(mode_id, None, max_staleness=DATA_MAX_STALENESS_SECONDS)
+
+
+POLICIES = {
+    "analytical": {"read_preference": _read_preference(DATA_ANALYTICAL_READ)},
+    "detail": {"read_preference": ReadPreference.PRIMARY},
+    "fire_and_forget": {"write_concern": WriteConcern(w=_w(DATA_FIRE_AND_FORGET_W), j=False)},
+}
+
+_read_policy = contextvars.ContextVar("read_policy", default=None)
+_pinned = contextvars.ContextVar("read_your_writes", default=False)
+
+
+def options(policy: str = None) -> dict:
+    """with_options() kwargs for a handle's own policy plus the request's read policy."""
+    opts = dict(POLICIES.get(_read_policy.get(), {}))
+    opts.update(POLICIES.get(policy, {}))
+    if _pinned.get() and "read_preference" in opts:
+        opts["read_preference"] = ReadPreference.PRIMARY
+    return opts
+
+
+def read_policy(name: str):
+    async def dependency():
+        # Plain (non-yield) async dependency: runs in the request's own context
+        _read_policy.set(name)
+    return Depends(dependency)
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        _read_policy.set(None)  # routes opt in through read_policy()
+        cookies = SimpleCookie(dict(scope["headers"]).get(b"cookie", b"").decode())
+        try:
+            _pinned.set(float(cookies[RYW_COOKIE].value) > time.time())
+        except (KeyError, ValueError):
+            _pinned.set(False)
+        if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = f"{RYW_COOKIE}={time.time() + READ_YOUR_WRITES_SECONDS:.0f}; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict, deque, defaultdict
+from fastapi import Depends, HTTPException, Request
+from runtime import process_local, share_of, worker_count
+
+# Admission control for AI-backed routes. A request must take a token from the
+# caller's global bucket and from its (caller, route) bucket, then a slot from
+# a fair-share gate: when all slots are busy, waiters are queued per caller and
+# released round-robin so one caller cannot monopolize the LLM budget. Rates
+# are divided across workers since every worker keeps its own buckets.
+USER_RATE_PER_MIN = float(os.environ.get("ADMISSION_USER_RATE_PER_MIN", "60"))
+USER_BURST = float(os.environ.get("ADMISSION_USER_BURST", "20"))
+QUEUE_MAX = int(os.environ.get("ADMISSION_QUEUE_MAX", "200"))
+QUEUE_PER_USER = int(os.environ.get("ADMISSION_QUEUE_PER_USER", "4"))
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "30"))
+MAX_TRACKED_BUCKETS = 10000
+
+# route -> (tokens per minute, burst)
+ROUTE_LIMITS = {
+    "nets_chat": (30, 10),
+    "nets_nudge": (6, 3),
+    "nets_end": (6, 2),
+    "suggest_scenario": (10, 3),
+    "performance_chat": (20, 5),
+    "coaching_feedback": (10, 3),
+    "one_on_one_feedback": (6, 2),
+    "briefing_packet": (10, 3),
+}
+ROUTE_LIMITS.update({k: tuple(v) for k, v in json.loads(os.environ.get("ADMISSION_ROUTE_LIMITS", "{}")).items()})
+
+
+class TokenBucket:
+    def __init__(self, rate_per_min: float, burst: float):
+        self.rate = rate_per_min / 60.0 / worker_count()
+        self.burst = max(1.0, burst / worker_count())
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class FairShareGate:
+    def __init__(self, slots: int):
+        self.free = slots
+        self.slots = slots
+        self.waiting = OrderedDict()
+        self.queued = 0
+
+    async def acquire(self, user: str):
+        if self.free > 0 and not self.queued:
+            self.free -= 1
+            return
+        if self.queued >= QUEUE_MAX or len(self.waiting.get(user, ())) >= QUEUE_PER_USER:
+            raise Rejected("queue_full", QUEUE_TIMEOUT)
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(user, deque()).append(fut)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(fut, QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            q = self.waiting.get(user)
+            if q and fut in q:
+                q.remove(fut)
+                self.queued -= 1
+                if not q:
+                    del self.waiting[user]
+            raise Rejected("queue_timeout", QUEUE_TIMEOUT)
+
+    def release(self):
+        # Hand the slot to the next caller in round-robin order
+        while self.waiting:
+            user, q = next(iter(self.waiting.items()))
+            fut = q.popleft()
+            self.queued -= 1
+            if q:
+                self.waiting.move_to_end(user)
+            else:
+                del self.waiting[user]
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.free += 1
+
+
+class AdmissionController:
+    def __init__(self):
+        self.gate = FairShareGate(share_of("LLM_CONCURRENCY_BUDGET", 32))
+        self.buckets = OrderedDict()
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def _bucket(self, key, limits):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(*limits)
+            while len(self.buckets) > MAX_TRACKED_BUCKETS:
+                self.buckets.popitem(last=False)
+        self.buckets.move_to_end(key)
+        return bucket
+
+    def _take_tokens(self, user: str, route: str):
+        buckets = [self._bucket(("user", user), (USER_RATE_PER_MIN, USER_BURST))]
+        if route in ROUTE_LIMITS:
+            buckets.append(self._bucket(("route", user, route), ROUTE_LIMITS[route]))
+        wait = max(b.wait_time() for b in buckets)
+        if wait > 0:
+            raise Rejected("rate_limited", wait)
+        for b in buckets:
+            b.take()
+
+    async def enter(self, user: str, route: str):
+        counters = self.counters[route]
+        try:
+            self._take_tokens(user, route)
+            if self.gate.free <= 0 or self.gate.queued:
+                counters["queued"] += 1
+            await self.gate.acquire(user)
+        except Rejected as e:
+            counters[f"rejected_{e.reason}"] += 1
+            raise
+        counters["admitted"] += 1
+
+    def leave(self):
+        self.gate.release()
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.gate.slots,
+            "in_flight": self.gate.slots - self.gate.free,
+            "queued": self.gate.queued,
+            "queued_users": len(self.gate.waiting),
+            "routes": {route: dict(c) for route, c in self.counters.items()},
+        }
+
+
+controller = process_local(AdmissionController)
+
+
+def caller_id(request: Request) -> str:
+    return request.headers.get("x-user-id") or (request.client.host if request.client else "anonymous")
+
+
+def admission(route: str):
+    async def dependency(request: Request):
+        ctl = controller()
+        try:
+            await ctl.enter(caller_id(request), route)
+        except Rejected as e:
+            raise HTTPException(429, f"Too many requests ({e.reason})", headers={"Retry-After": str(max(1, round(e.retry_after)))})
+        try:
+            yield
+        finally:
+            ctl.leave()
+    return Depends(dependency)
@@ -1,16 +1,64 @@
 import os
 import json
+import asyncio
 from dotenv import load_dotenv
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from emergentintegrations.llm.chat import UserMessage
+from model_routing import RoutedChat
+from singleflight import coalesced
+from llm_scheduler import priority, scheduler
+from degradation import breaker
+from streaming_json import SectionParser, check_sections
 
 load_dotenv()
 
-API_KEY = os.environ.get("EMERGENT_LLM_KEY")
-
-def _make_chat(system_message: str, session_id: str = "default"):
-    chat = LlmChat(api_key=API_KEY, session_id=session_id, system_message=system_message)
-    chat.with_model("gemini", "gemini-2.5-flash")
-    return chat
+def _make_chat(route: str, system_message: str, session_id: str = "default"):
+    """Chat for one ai_service function; its models come from model_routing.ROUTES."""
+    return RoutedChat(route, system_message, session_id)
+
+# Upstream calls take a slot from the worker's share of the LLM budget under
+# the caller's priority class (llm_scheduler.py): interactive or batch.
+# Outcomes feed the degradation breaker (degradation.py).
+async def _send(chat, msg):
+    async with scheduler().slot():
+        try:
+            reply = await chat.send_message(msg)
+        except Exception:
+            breaker().failure()
+            raise
+    breaker().success()
+    return reply
+
+async def _stream(chat, msg):
+    """Completion text as it arrives; a single chunk when the client can't stream."""
+    async with scheduler().slot():
+        stream = getattr(chat, "stream_message", None)
+        try:
+            if stream is None:
+                yield await chat.send_message(msg)
+            else:
+                async for chunk in stream(msg):
+                    yield chunk
+        except Exception:
+            breaker().failure()
+            raise
+    breaker().success()
+
+async def _stream_sections(chat, msg, schema: dict):
+    """{"section", "value"} per top-level key as it closes, then {"result", "validation"}."""
+    parser, text = SectionParser(), []
+    async for chunk in _stream(chat, msg):
+        text.append(chunk)
+        for key, value in parser.feed(chunk):
+            yield {"section": key, "value": value}
+    result = _parse_json("".join(text))
+    if "raw" in result and parser.sections:
+        result = dict(parser.sections)  # truncated or trailing junk: keep what closed
+    yield {"result": result, "validation": check_sections(result, schema)}
+
+async def _result(events) -> dict:
+    async for event in events:
+        if "result" in event:
+            return event["result"]
 
 def _parse_json(text: str) -> dict:
     text = text.strip()
@@ -26,8 +74,26 @@ def _parse_json(text: str) -> dict:
         return {"raw": text}
 
 
-async def analyze_one_on_one(session_data: dict, employee: dict, goals: list) -> dict:
+# Expected top-level keys of the streamed analyses, checked once the stream ends
+NUMBER = (int, float)
+ONE_ON_ONE_SCHEMA = {
+    "supervisor_summary": str, "employee_summary": str, "leadership_score": NUMBER, "effectiveness_score": NUMBER,
+    "swot_analysis": dict, "strengths_observed": list, "coaching_recommendations": list, "action_items": list,
+    "missed_signals": list, "critical_coaching_insight": (dict, type(None)), "employee_insights": list,
+}
+SCORECARD_SCHEMA = {
+    "scores": dict, "strengths": list, "gaps": list, "annotated_conversation": list,
+    "key_takeaways": list, "practice_recommendations": list,
+}
+SURVEY_ANALYSIS_SCHEMA = {
+    "overall_sentiment": str, "sentiment_score": NUMBER, "key_themes": list,
+    "initial_recommendations": list, "areas_of_concern": list,
+}
+
+
+def analyze_one_on_one_stream(session_data: dict, employee: dict, goals: list, score_facts: dict = None, score_trends: dict = None):
     chat = _make_chat(
+        "analyze_one_on_one",
         "You are an expert HR analyst AI. Analyze 1-on-1 meeting data and provide comprehensive feedback. Always respond with valid JSON only.",
         f"analysis-{session_data.get('session_id', 'x')}"
     )
@@ -46,7 +112,9 @@ async def analyze_one_on_one(session_data: dict, employee: dict, goals: list) ->
 
 Meeting Data:
 Employee: {employee.get('name', 'Unknown')} - {employee.get('team', '')}
-Scores: {json.dumps(employee.get('scores', {{}}))}
+Scores: {json.dumps(employee.get('scores', {}))}
+Score Facts (precomputed percentiles/z-scores - cite these, do not estimate rankings): {json.dumps(score_facts or {})}
+Score Trends (recorded history; per_30d is the fitted change per 30 days - cite these, do not guess trajectories): {json.dumps(score_trends or {})}
 Location: {session_data.get('meeting_location', 'office')}
 Feedback Tone: {session_data.get('feedback_tone', 3)}/5
 Reception Quality: {session_data.get('reception_quality', 3)}/5
@@ -60,13 +128,18 @@ Active Goals: {json.dumps([g.get('title', '') for g in goals])}
 
 Return ONLY valid JSON."""
 
-    msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
-    return _parse_json(response)
+    return _stream_sections(chat, UserMessage(text=prompt), ONE_ON_ONE_SCHEMA)
+
 
+@coalesced(ignore=("session_id", "status", "submitted_at"))
+async def analyze_one_on_one(session_data: dict, employee: dict, goals: list, score_facts: dict = None, score_trends: dict = None) -> dict:
+    return await _result(analyze_one_on_one_stream(session_data, employee, goals, score_facts, score_trends))
 
-async def generate_briefing_packet(sessions: list, employee: dict, goals: list) -> dict:
+
+@coalesced
+async def generate_briefing_packet(sessions: list, employee: dict, goals: list, score_facts: dict = None) -> dict:
     chat = _make_chat(
+        "generate_briefing_packet",
         "You are an HR briefing assistant. Generate concise meeting preparation packets. Always respond with valid JSON.",
         "briefing"
     )
@@ -76,17 +149,20 @@ async def generate_briefing_packet(sessions: list, employee: dict, goals: list)
 - last_sessions_summary (string)
 - action_items_breakdown (object with: pending (array), completed (array))
 
-Employee: {json.dumps(employee or {{}})}
+Employee: {json.dumps(employee or {})}
+Score Facts (precomputed percentiles/z-scores - cite these, do not estimate rankings): {json.dumps(score_facts or {})}
 Recent Sessions: {json.dumps(sessions[:3] if sessions else [])}
-Active Goals: {json.dumps([{{"title": g.get("title"), "progress": g.get("progress")}} for g in goals])}
+Active Goals: {json.dumps([{"title": g.get("title"), "progress": g.get("progress")} for g in goals])}
 
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
+@coalesced
+@priority("interactive")
 async def nets_simulate(scenario: str, persona: str, difficulty: str, messages: list) -> str:
     difficulty_traits = {
         "friendly": "warm, supportive, agreeable, understanding",
@@ -97,6 +173,7 @@ async def nets_simulate(scenario: str, persona: str, difficulty: str, messages:
     traits = difficulty_traits.get(difficulty, "professional, balanced")
     
     chat = _make_chat(
+        "nets_simulate",
         f"""You are simulating a {persona} with a {difficulty} demeanor.
 Your personality traits: {traits}
 Scenario: {scenario}
@@ -116,12 +193,15 @@ User just said: {latest}
 Respond in character as the {persona}. Keep it to 2-4 sentences."""
     
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return response
 
 
+@coalesced
+@priority("interactive")
 async def nets_nudge(messages: list, scenario: str) -> dict:
     chat = _make_chat(
+        "nets_nudge",
         "You are a communication coach providing helpful hints. Respond with JSON only.",
         "nudge"
     )
@@ -137,12 +217,13 @@ Conversation so far:
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
-async def nets_scorecard(messages: list, scenario: str, persona: str) -> dict:
+def nets_scorecard_stream(messages: list, scenario: str, persona: str):
     chat = _make_chat(
+        "nets_scorecard",
         "You are an expert communication evaluator. Analyze practice conversations and provide detailed scorecards. Respond with JSON only.",
         "scorecard"
     )
@@ -162,13 +243,122 @@ Conversation:
 
 Return ONLY valid JSON."""
 
+    return _stream_sections(chat, UserMessage(text=prompt), SCORECARD_SCHEMA)
+
+
+@coalesced
+async def nets_scorecard(messages: list, scenario: str, persona: str) -> dict:
+    return await _result(nets_scorecard_stream(messages, scenario, persona))
+
+
+# Chunked scorecards: turns are annotated in fixed windows in parallel (or as
+# the session runs), then one reduce call scores the whole conversation from
+# the transcript plus the per-turn comments.
+SCORECARD_WINDOW = int(os.environ.get("NETS_SCORECARD_WINDOW", "8"))
+SCORECARD_CONTEXT = 2
+
+
+@coalesced
+async def nets_annotate_window(messages: list, start: int, scenario: str, persona: str) -> list:
+    chat = _make_chat(
+        "nets_annotate_window",
+        "You are an expert communication evaluator. Annotate practice conversation turns. Respond with JSON only.",
+        f"scorecard-window-{start}"
+    )
+    window = messages[start:start + SCORECARD_WINDOW]
+    context = "\n".join([f"{'User' if m['role']=='user' else persona}: {m['content']}" for m in messages[max(0, start - SCORECARD_CONTEXT):start]])
+    turns = "\n".join([f"Turn {start + i + 1} - {'User' if m['role']=='user' else persona}: {m['content']}" for i, m in enumerate(window)])
+    prompt = f"""Annotate each numbered turn below. Return a JSON array with one object per turn:
+- turn (number, as given)
+- speaker (user/ai)
+- message (string)
+- feedback (object with type positive/negative and comment, or null for ai turns and unremarkable user turns)
+
+Scenario: {scenario}
+Persona: {persona}
+Earlier context (do not annotate):
+{context or 'None'}
+
+Turns to annotate:
+{turns}
+
+Return ONLY a valid JSON array."""
+
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
-    return _parse_json(response)
+    response = await _send(chat, msg)
+    result = _parse_json(response)
+    if not isinstance(result, list):
+        result = result.get("annotated_conversation", []) if isinstance(result, dict) else []
+    return result
 
 
+def nets_scorecard_reduce_stream(messages: list, scenario: str, persona: str, annotations: list):
+    chat = _make_chat(
+        "nets_scorecard_reduce",
+        "You are an expert communication evaluator. Analyze practice conversations and provide detailed scorecards. Respond with JSON only.",
+        "scorecard-reduce"
+    )
+    convo = "\n".join([f"{'User' if m['role']=='user' else persona}: {m['content']}" for m in messages])
+    comments = [{"turn": a.get("turn"), "feedback": a.get("feedback")} for a in annotations if a.get("feedback")]
+    prompt = f"""Evaluate this practice conversation using the per-turn feedback already collected. Return a JSON scorecard with:
+- scores (object with: clarity (1-10), empathy (1-10), assertiveness (1-10), overall (1-10))
+- strengths (array of strings)
+- gaps (array of strings)
+- key_takeaways (array of strings)
+- practice_recommendations (array of strings)
+
+Scenario: {scenario}
+Persona: {persona}
+Conversation:
+{convo}
+Per-turn feedback: {json.dumps(comments)}
+
+Return ONLY valid JSON."""
+
+    # annotated_conversation is attached by the caller, not generated here
+    schema = {k: v for k, v in SCORECARD_SCHEMA.items() if k != "annotated_conversation"}
+    return _stream_sections(chat, UserMessage(text=prompt), schema)
+
+
+@coalesced
+async def nets_scorecard_reduce(messages: list, scenario: str, persona: str, annotations: list) -> dict:
+    return await _result(nets_scorecard_reduce_stream(messages, scenario, persona, annotations))
+
+
+def scorecard_windows(messages: list) -> list:
+    """Start offsets of the annotation windows covering messages."""
+    return list(range(0, len(messages), SCORECARD_WINDOW))
+
+
+async def _annotate_all(messages: list, scenario: str, persona: str, annotations: dict = None) -> list:
+    annotations = dict(annotations or {})
+    missing = [start for start in scorecard_windows(messages) if str(start) not in annotations]
+    done = await asyncio.gather(*[nets_annotate_window(messages, start, scenario, persona) for start in missing])
+    annotations.update({str(start): turns for start, turns in zip(missing, done)})
+    return [turn for start in scorecard_windows(messages) for turn in annotations.get(str(start), [])]
+
+
+async def nets_scorecard_chunked(messages: list, scenario: str, persona: str, annotations: dict = None) -> dict:
+    annotated = await _annotate_all(messages, scenario, persona, annotations)
+    scorecard = await nets_scorecard_reduce(messages, scenario, persona, annotated)
+    return {**scorecard, "annotated_conversation": annotated} if isinstance(scorecard, dict) else scorecard
+
+
+async def nets_scorecard_chunked_stream(messages: list, scenario: str, persona: str, annotations: dict = None):
+    annotated = await _annotate_all(messages, scenario, persona, annotations)
+    yield {"section": "annotated_conversation", "value": annotated}
+    async for event in nets_scorecard_reduce_stream(messages, scenario, persona, annotated):
+        if "result" in event and isinstance(event["result"], dict):
+            event["result"]["annotated_conversation"] = annotated
+            event["validation"] = check_sections(event["result"], SCORECARD_SCHEMA)
+        yield event
+
+
+@coalesced
+@priority("interactive")
 async def coaching_feedback(goal_description: str, situation: str, check_ins: list) -> dict:
     chat = _make_chat(
+        "coaching_feedback",
         "You are a professional development coach. Provide actionable feedback. Respond with JSON only.",
         "coaching-fb"
     )
@@ -184,12 +374,14 @@ Check-in History: {json.dumps(check_ins)}
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
+@coalesced
 async def generate_survey_questions(objective: str) -> list:
     chat = _make_chat(
+        "generate_survey_questions",
         "You are an organizational psychologist specializing in workplace surveys. Respond with JSON only.",
         "survey-gen"
     )
@@ -203,13 +395,14 @@ Objective: {objective}
 Return ONLY a valid JSON array."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     result = _parse_json(response)
     return result if isinstance(result, list) else result.get("questions", [result])
 
 
-async def analyze_survey(survey: dict, responses: list) -> dict:
+def analyze_survey_stream(survey: dict, responses: list):
     chat = _make_chat(
+        "analyze_survey",
         "You are an organizational analytics expert. Analyze anonymous survey results. Respond with JSON only.",
         "survey-analysis"
     )
@@ -226,13 +419,18 @@ Responses: {json.dumps(responses)}
 
 Return ONLY valid JSON."""
 
-    msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
-    return _parse_json(response)
+    return _stream_sections(chat, UserMessage(text=prompt), SURVEY_ANALYSIS_SCHEMA)
+
+
+@coalesced
+async def analyze_survey(survey: dict, responses: list) -> dict:
+    return await _result(analyze_survey_stream(survey, responses))
 
 
+@coalesced
 async def generate_leadership_pulse(analysis: dict) -> dict:
     chat = _make_chat(
+        "generate_leadership_pulse",
         "You are an HR leadership consultant. Generate targeted pulse survey questions. Respond with JSON only.",
         "pulse-gen"
     )
@@ -246,12 +444,14 @@ Analysis: {json.dumps(analysis)}
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
+@coalesced
 async def summarize_leadership_pulse(original_analysis: dict, pulse_responses: list) -> dict:
     chat = _make_chat(
+        "summarize_leadership_pulse",
         "You are a senior HR strategist. Synthesize survey and leadership responses into actionable plans. Respond with JSON only.",
         "pulse-summary"
     )
@@ -267,12 +467,15 @@ Leadership Responses: {json.dumps(pulse_responses)}
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
+@coalesced
+@priority("interactive")
 async def generate_scenario_suggestion(user_role: str, recent_sessions: list) -> dict:
     chat = _make_chat(
+        "generate_scenario_suggestion",
         "You are a professional development advisor. Suggest practice scenarios. Respond with JSON only.",
         "scenario-suggest"
     )
@@ -288,12 +491,15 @@ Recent Session Context: {json.dumps(recent_sessions[:3] if recent_sessions else
 Return ONLY valid JSON."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return _parse_json(response)
 
 
+@coalesced
+@priority("interactive")
 async def performance_chat(message: str, context: dict) -> dict:
     chat = _make_chat(
+        "performance_chat",
         "You are a supportive AI performance coach. Help employees understand and improve their performance. Be encouraging and specific. Keep responses concise (3-5 sentences).",
         "perf-chat"
     )
@@ -304,5 +510,5 @@ Employee asks: {message}
 Provide helpful, specific, growth-focused advice."""
 
     msg = UserMessage(text=prompt)
-    response = await chat.send_message(msg)
+    response = await _send(chat, msg)
     return {"response": response}
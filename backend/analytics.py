@@ -0,0 +1,137 @@
+import os
+import time
+import numpy as np
+from db import LazyCollection
+from rollups import SCORE_KEYS
+from runtime import process_local
+import tenancy
+
+# Bulk score analytics over users.scores. The whole population is loaded into
+# one (users x dimensions) array and every statistic is computed column-wise,
+# so per-user facts for prompts come from the same pass as the endpoints.
+ANALYTICS_CACHE_SECONDS = float(os.environ.get("ANALYTICS_CACHE_SECONDS", "30"))
+
+users_col = LazyCollection("users")
+_cache = process_local(dict)
+
+
+class ScoreTable:
+    def __init__(self, users: list):
+        users = [u for u in users if all(k in (u.get("scores") or {}) for k in SCORE_KEYS)]
+        self.user_ids = np.array([u["user_id"] for u in users], dtype=object)
+        self.names = [u.get("name", "") for u in users]
+        self.teams = np.array([u.get("team", "") for u in users], dtype=object)
+        self.roles = np.array([u.get("role", "") for u in users], dtype=object)
+        self.scores = np.array([[u["scores"][k] for k in SCORE_KEYS] for u in users], dtype=float).reshape(len(users), len(SCORE_KEYS))
+        self._team_idx = np.unique(self.teams, return_inverse=True)[1] if len(users) else np.zeros(0, dtype=int)
+        self.org_percentiles = _percentile_ranks(self.scores)
+        self.team_percentiles = _percentile_ranks(self.scores, self._team_idx)
+        self.team_z = _group_z_scores(self.scores, self._team_idx)
+        self.team_sizes = np.bincount(self._team_idx)[self._team_idx] if len(users) else np.zeros(0, dtype=int)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def index_of(self, user_id: str):
+        hits = np.flatnonzero(self.user_ids == user_id)
+        return int(hits[0]) if len(hits) else None
+
+
+def _percentile_ranks(scores, groups=None):
+    """Mid-rank percentile of every value within its group, per column."""
+    out = np.zeros_like(scores)
+    if not len(scores):
+        return out
+    groups = np.zeros(len(scores), dtype=int) if groups is None else groups
+    for g in np.unique(groups):
+        rows = groups == g
+        block = scores[rows]
+        ranked = np.sort(block, axis=0)
+        for j in range(block.shape[1]):
+            below = np.searchsorted(ranked[:, j], block[:, j], "left")
+            ties = np.searchsorted(ranked[:, j], block[:, j], "right") - below
+            out[rows, j] = (below + 0.5 * ties) / len(block) * 100
+    return out
+
+
+def _group_z_scores(scores, groups):
+    if not len(scores):
+        return np.zeros_like(scores)
+    counts = np.bincount(groups).astype(float)[:, None]
+    sums = np.zeros((len(counts), scores.shape[1]))
+    np.add.at(sums, groups, scores)
+    means = sums / counts
+    dev = scores - means[groups]
+    sq = np.zeros_like(sums)
+    np.add.at(sq, groups, dev ** 2)
+    std = np.sqrt(sq / counts)[groups]
+    return np.divide(dev, std, out=np.zeros_like(dev), where=std > 0)
+
+
+def _describe(block) -> dict:
+    if not len(block):
+        return {k: None for k in SCORE_KEYS}
+    q = np.percentile(block, [25, 50, 75], axis=0)
+    mean = block.mean(axis=0)
+    return {k: {"mean": round(float(mean[j]), 2), "p25": float(q[0, j]), "median": float(q[1, j]), "p75": float(q[2, j])} for j, k in enumerate(SCORE_KEYS)}
+
+
+def _round(row) -> dict:
+    return {k: round(float(v), 2) for k, v in zip(SCORE_KEYS, row)}
+
+
+def load_table() -> ScoreTable:
+    cache = _cache().setdefault(tenancy.org_id(), {})
+    if cache.get("expires", 0) > time.monotonic():
+        return cache["table"]
+    users = list(users_col.find({"scores": {"$exists": True}}, {"_id": 0, "user_id": 1, "name": 1, "team": 1, "role": 1, "scores": 1}))
+    table = ScoreTable(users)
+    cache.update(table=table, expires=time.monotonic() + ANALYTICS_CACHE_SECONDS)
+    return table
+
+
+def invalidate():
+    _cache().pop(tenancy.org_id(), None)
+
+
+# ─── Queries ───
+def summary() -> dict:
+    table = load_table()
+    corr = None
+    if len(table) >= 2:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = np.corrcoef(table.scores, rowvar=False)
+        corr = {a: {b: (None if np.isnan(m[i, j]) else round(float(m[i, j]), 3)) for j, b in enumerate(SCORE_KEYS)} for i, a in enumerate(SCORE_KEYS)}
+    return {"population": len(table), "dimensions": list(SCORE_KEYS), "org": _describe(table.scores), "correlation": corr}
+
+
+def cohorts(by: str = "team") -> dict:
+    table = load_table()
+    labels = table.roles if by == "role" else table.teams
+    org_mean = table.scores.mean(axis=0) if len(table) else np.zeros(len(SCORE_KEYS))
+    result = []
+    for label in sorted(set(labels)):
+        block = table.scores[labels == label]
+        result.append({
+            by: label,
+            "size": int(len(block)),
+            "stats": _describe(block),
+            "delta_vs_org": _round(block.mean(axis=0) - org_mean),
+        })
+    return {"by": by, "cohorts": result}
+
+
+def user_facts(user_id: str):
+    table = load_table()
+    i = table.index_of(user_id)
+    if i is None:
+        return None
+    return {
+        "user_id": user_id,
+        "team": table.teams[i],
+        "team_size": int(table.team_sizes[i]),
+        "org_population": len(table),
+        "org_percentile": _round(table.org_percentiles[i]),
+        "team_percentile": _round(table.team_percentiles[i]),
+        "team_z_score": _round(table.team_z[i]),
+    }
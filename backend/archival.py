@@ -0,0 +1,232 @@
+import os
+import json
+import zlib
+import asyncio
+from datetime import datetime, timezone, timedelta
+from bson import Binary
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from db import LazyCollection, get_db
+from runtime import process_local
+import history
+import tenancy
+
+# Tiered archival of finished documents. Completed 1-on-1s and Nets sessions,
+# resolved critical cases and answered messages older than ARCHIVE_AFTER_DAYS
+# (per collection: ARCHIVE_AFTER_DAYS_BY_COLLECTION, JSON) move into
+# <collection>_archive as one zlib-compressed JSON blob each, together with
+# their bucketed history (case timeline, Nets turns), which is deleted. The
+# source document is replaced by a stub that keeps its id, status, dates and
+# the fields lists and rollups read, plus archived: true, so references stay
+# valid. List routes leave stubs out unless include_archived=true; detail
+# routes return the stub, or the full document with include_archived=true;
+# history routes page an archived parent's history from its blob.
+#
+# Archiving writes the blob before the stub, and the stub only replaces a
+# document that is still finished, so an interrupted run just repeats.
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_AFTER_DAYS_BY_COLLECTION = json.loads(os.environ.get("ARCHIVE_AFTER_DAYS_BY_COLLECTION", "{}"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "200"))
+ARCHIVE_INTERVAL_HOURS = float(os.environ.get("ARCHIVE_INTERVAL_HOURS", "24"))  # 0: only on demand
+ARCHIVE_LEASE_SECONDS = 3600
+
+# id field, finished filter, age fields (first one present wins), stub fields
+TIERS = {
+    "one_on_one_sessions": ("session_id", {"status": "completed"}, ("date", "submitted_at"),
+                            ["supervisor_id", "supervisor_name", "employee_id", "employee_name", "date", "submitted_at", "status", "meeting_location"]),
+    "nets_sessions": ("session_id", {"status": "completed"}, ("created_at",),
+                      ["scenario", "persona", "difficulty", "status", "created_at", "message_count"]),
+    "critical_cases": ("case_id", {"status": "resolved"}, ("latest_timeline_entry.timestamp",),
+                       ["session_id", "employee_id", "status", "current_level", "created_at", "timeline_count"]),
+    "messages": ("message_id", {"status": "responded"}, ("created_at",),
+                 ["type", "survey_id", "target_role", "status", "created_at"]),
+}
+HISTORIES = {col: (array, hist) for col, _, array, hist, _, _ in history.EMBEDDED}
+
+
+def _archive(name: str) -> LazyCollection:
+    return LazyCollection(f"{name}_archive")
+
+
+def ensure_indexes():
+    for name in TIERS:
+        _archive(name).create_index([("org_id", 1), ("key", 1)], unique=True)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def cutoff(name: str, older_than_days: float = None) -> str:
+    days = older_than_days if older_than_days is not None else ARCHIVE_AFTER_DAYS_BY_COLLECTION.get(name, ARCHIVE_AFTER_DAYS)
+    return (_now() - timedelta(days=days)).isoformat()
+
+
+def live(include_archived: bool = False) -> dict:
+    """Filter for list routes: stubs only on request."""
+    return {} if include_archived else {"archived": {"$ne": True}}
+
+
+# ─── Blobs ───
+def _pack(doc: dict) -> tuple:
+    """(compressed blob, uncompressed size)"""
+    raw = json.dumps(doc, default=str, separators=(",", ":")).encode()
+    return Binary(zlib.compress(raw)), len(raw)
+
+
+def _unpack(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def restore(name: str, stub: dict) -> dict:
+    """Full document behind a stub (the stub itself when it isn't one)."""
+    if not stub.get("archived"):
+        return stub
+    return hydrate(name, [stub])[0]
+
+
+def hydrate(name: str, docs: list) -> list:
+    """Swap stubs in docs for their archived documents, one read for all of them."""
+    id_field = TIERS[name][0]
+    keys = [d[id_field] for d in docs if d.get("archived")]
+    if not keys:
+        return docs
+    blobs = {a["key"]: a for a in _archive(name).find({"key": {"$in": keys}}, {"_id": 0, "key": 1, "data": 1})}
+    out = []
+    for d in docs:
+        a = blobs.get(d[id_field]) if d.get("archived") else None
+        out.append({**_unpack(a["data"]), "archived": True, "archived_at": d.get("archived_at")} if a else d)
+    return out
+
+
+def history_page(name: str, stub: dict, offset: int = 0, limit: int = 20) -> dict:
+    """history.BucketedHistory.page over an archived parent's history."""
+    array, _ = HISTORIES[name]
+    entries = restore(name, stub).get(array) or []
+    offset, limit = max(0, offset), max(1, min(limit, 200))
+    return {"total": len(entries), "offset": offset, "limit": limit, "items": entries[::-1][offset:offset + limit]}
+
+
+# ─── Archiving ───
+def _older_than(fields: tuple, before: str) -> dict:
+    """Age taken from the first of fields that is set, e.g. a session's date, else submitted_at."""
+    clauses, unset = [], {}
+    for field in fields:
+        clauses.append({**unset, field: {"$lt": before}})
+        unset = {**unset, field: None}
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _archive_batch(name: str, before: str, size: int, dry_run: bool) -> int:
+    id_field, finished, ages, stub_fields = TIERS[name]
+    col = LazyCollection(name)
+    due = {**finished, **_older_than(ages, before), "archived": {"$ne": True}}
+    docs = list(col.find(due).limit(size))
+    if not docs or dry_run:
+        return len(docs)
+    array, hist = HISTORIES.get(name, (None, None))
+    org, at = tenancy.org_id(), _now().isoformat()
+    blobs, stubs = [], []
+    for doc in docs:
+        key = doc[id_field]
+        full = {k: v for k, v in doc.items() if k not in ("_id", "org_id")}
+        if hist:
+            full[array] = hist.all(key)
+        data, raw_size = _pack(full)
+        blobs.append(UpdateOne(
+            _archive(name).scoped({"key": key}),
+            {"$set": {"data": data, "archived_at": at, "stored_bytes": len(data), "raw_bytes": raw_size}},
+            upsert=True,
+        ))
+        stub = {k: doc[k] for k in stub_fields if k in doc}
+        stubs.append(ReplaceOne(col.scoped({**finished, "_id": doc["_id"], "archived": {"$ne": True}}),
+                                {**stub, id_field: key, "org_id": org, "archived": True, "archived_at": at}))
+    _archive(name).bulk_write(blobs, ordered=False)
+    col.bulk_write(stubs, ordered=False)
+    if hist:
+        hist.col.delete_many({"parent_id": {"$in": [d[id_field] for d in docs]}})
+    return len(docs)
+
+
+def run(collections: list = None, older_than_days: float = None, limit: int = None, dry_run: bool = False) -> dict:
+    """Archive the current org's due documents; counts per collection."""
+    counts = {}
+    for name in collections or TIERS:
+        before, done = cutoff(name, older_than_days), 0
+        while limit is None or done < limit:
+            size = ARCHIVE_BATCH_SIZE if limit is None else min(ARCHIVE_BATCH_SIZE, limit - done)
+            n = _archive_batch(name, before, size, dry_run)
+            done += n
+            if n < size or dry_run:
+                break
+        counts[name] = done
+    return counts
+
+
+def _claim(db) -> bool:
+    """One archiving worker per database per ARCHIVE_LEASE_SECONDS."""
+    now = _now()
+    try:
+        db["meta"].update_one({"_id": "archive_lease", "until": {"$lt": now}},
+                              {"$set": {"until": now + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}}, upsert=True)
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def run_all() -> dict:
+    """run() for every org in every database this worker can claim."""
+    out = {}
+    for placement in tenancy.placements():
+        with tenancy.using(placement):
+            db = get_db()
+            if not _claim(db):
+                continue
+            orgs = set()
+            for name in TIERS:
+                orgs.update(db[name].distinct("org_id", {"archived": {"$ne": True}}))
+        for org in sorted(orgs):
+            with tenancy.using(org):
+                out[org] = run()
+    return out
+
+
+class ArchiveWorker:
+    def __init__(self):
+        self.task = None
+        self.last_run = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+            try:
+                counts = await asyncio.to_thread(run_all)
+                self.last_run = {"at": _now().isoformat(), "archived": counts}
+            except Exception:
+                pass  # the lease lapses and the next run picks up where this one stopped
+
+    def start(self):
+        if self.task is None and ARCHIVE_INTERVAL_HOURS > 0:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+archive_worker = process_local(ArchiveWorker)
+
+
+def stats() -> dict:
+    tiers = {}
+    for name in TIERS:
+        sizes = next(_archive(name).aggregate([{"$group": {"_id": None, "n": {"$sum": 1}, "raw": {"$sum": "$raw_bytes"}, "stored": {"$sum": "$stored_bytes"}}}]), None) or {}
+        tiers[name] = {
+            "live": LazyCollection(name).count_documents({"archived": {"$ne": True}}),
+            "archived": sizes.get("n", 0),
+            "raw_bytes": sizes.get("raw", 0),
+            "stored_bytes": sizes.get("stored", 0),
+            "due_after": cutoff(name),
+        }
+    return {"collections": tiers, "interval_hours": ARCHIVE_INTERVAL_HOURS, "last_run": archive_worker().last_run}
@@ -0,0 +1,144 @@
+import os
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from runtime import process_local, share_of
+import access
+import tenancy
+
+
+def _build_client(url: str = None):
+    return MongoClient(
+        url or os.environ.get("MONGO_URL"),
+        maxPoolSize=share_of("MONGO_CONNECTION_BUDGET", 100),
+        minPoolSize=0,
+        connect=False,
+    )
+
+
+get_client = process_local(_build_client)
+_routed_clients = process_local(dict)
+
+
+def get_db(org: str = None):
+    """Database holding an org's data (the current request's org by default)."""
+    url, name = tenancy.route(org or tenancy.org_id())
+    if url is None:
+        return get_client()[name]
+    clients = _routed_clients()
+    if url not in clients:
+        clients[url] = _build_client(url)
+    return clients[url][name]
+
+
+def replace_index(col, keys: list, name: str, **kwargs):
+    """create_index, dropping an older index of the same name/kind whose keys changed."""
+    try:
+        col.create_index(keys, name=name, **kwargs)
+    except OperationFailure:
+        col.drop_index(name)
+        col.create_index(keys, name=name, **kwargs)
+
+
+VERSIONS = "collection_versions"
+
+
+def _filter_method(method, write: bool = False):
+    def call(self, filter=None, *args, **kwargs):
+        result = getattr(self.raw(), method)(self.scoped(filter), *args, **kwargs)
+        if write:
+            self._bump()
+        return result
+    return call
+
+
+def collection_versions(names) -> dict:
+    """Current write version of each named collection for this org (0 if never written)."""
+    org = tenancy.org_id()
+    col = get_db()[VERSIONS]
+    opts = access.options()
+    if opts:
+        col = col.with_options(**opts)
+    docs = col.find({"_id": {"$in": [f"{org}:{n}" for n in names]}})
+    return {d["_id"].split(":", 1)[1]: d["v"] for d in docs}
+
+
+class LazyCollection:
+    """Module-level collection handle that resolves against this process's client.
+
+    Reads and writes are scoped to the current org: filters get an org_id
+    equality, inserted documents get an org_id, aggregations start with a
+    $match on it. bulk_write is passed through, so build its ops with scoped().
+    Read preference and write concern follow the data-access policy of the
+    handle and the current route (see access.py). Every write bumps the
+    collection's version counter, which ETags are derived from (http_cache.py).
+    """
+
+    def __init__(self, name: str, policy: str = None):
+        self.name = name
+        self.policy = policy
+
+    def raw(self):
+        col = get_db()[self.name]
+        opts = access.options(self.policy)
+        return col.with_options(**opts) if opts else col
+
+    def scoped(self, filter: dict = None) -> dict:
+        return {**(filter or {}), "org_id": tenancy.org_id()}
+
+    find = _filter_method("find")
+    find_one = _filter_method("find_one")
+    find_one_and_update = _filter_method("find_one_and_update", write=True)
+    find_one_and_delete = _filter_method("find_one_and_delete", write=True)
+    update_one = _filter_method("update_one", write=True)
+    update_many = _filter_method("update_many", write=True)
+    replace_one = _filter_method("replace_one", write=True)
+    delete_one = _filter_method("delete_one", write=True)
+    delete_many = _filter_method("delete_many", write=True)
+    count_documents = _filter_method("count_documents")
+
+    def distinct(self, key: str, filter: dict = None, **kwargs):
+        return self.raw().distinct(key, self.scoped(filter), **kwargs)
+
+    def insert_one(self, document: dict, **kwargs):
+        document.setdefault("org_id", tenancy.org_id())
+        result = self.raw().insert_one(document, **kwargs)
+        self._bump()
+        return result
+
+    def insert_many(self, documents: list, **kwargs):
+        for doc in documents:
+            doc.setdefault("org_id", tenancy.org_id())
+        try:
+            return self.raw().insert_many(documents, **kwargs)
+        finally:
+            self._bump()  # unordered inserts can partly succeed before raising
+
+    def bulk_write(self, requests: list, **kwargs):
+        try:
+            return self.raw().bulk_write(requests, **kwargs)
+        finally:
+            self._bump()
+
+    def _bump(self):
+        org = tenancy.org_id()
+        col = get_db()[VERSIONS]
+        if self.policy:
+            col = col.with_options(**access.options(self.policy))
+        col.update_one({"_id": f"{org}:{self.name}"}, {"$inc": {"v": 1}, "$set": {"org_id": org}}, upsert=True)
+
+    def aggregate(self, pipeline: list, **kwargs):
+        return self.raw().aggregate([{"$match": {"org_id": tenancy.org_id()}}, *pipeline], **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.raw(), attr)
+
+
+def backfill_org_ids():
+    """Stamp DEFAULT_ORG onto documents written before partitioning (once)."""
+    db = get_db(tenancy.DEFAULT_ORG)
+    claim = db["meta"].update_one({"_id": "org_ids"}, {"$setOnInsert": {"org_id": tenancy.DEFAULT_ORG}}, upsert=True)
+    if claim.upserted_id is None:
+        return
+    for name in db.list_collection_names():
+        if name != "meta" and not name.startswith("system."):
+            db[name].update_many({"org_id": {"$exists": False}}, {"$set": {"org_id": tenancy.DEFAULT_ORG}})
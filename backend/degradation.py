@@ -0,0 +1,238 @@
+import os
+import re
+import time
+import copy
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from fastapi import HTTPException
+from db import LazyCollection
+from llm_scheduler import scheduler
+from runtime import process_local
+import tenancy
+
+# Degradation mode for AI routes. The worker is degraded while its upstream
+# breaker is open (LLM_BREAKER_FAILURES consecutive failed calls, reopened for
+# LLM_BREAKER_OPEN_SECONDS; the first call after that probes) or while more
+# than LLM_DEGRADE_QUEUE_DEPTH calls are queued for a slot. Degraded routes
+# answer from, in order: the last good result for the same input, a rule-based
+# template, or (1-on-1 analysis) the retry queue; otherwise 503. Responses
+# served that way carry degraded = {"reason", "source"}.
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_OPEN_SECONDS = float(os.environ.get("LLM_BREAKER_OPEN_SECONDS", "30"))
+LLM_DEGRADE_QUEUE_DEPTH = int(os.environ.get("LLM_DEGRADE_QUEUE_DEPTH", "0"))  # 0: twice the worker's slots
+DEGRADED_CACHE_SIZE = int(os.environ.get("DEGRADED_CACHE_SIZE", "1024"))
+DEGRADED_CACHE_MAX_AGE_SECONDS = float(os.environ.get("DEGRADED_CACHE_MAX_AGE_SECONDS", "86400"))
+ANALYSIS_RETRY_INTERVAL_SECONDS = float(os.environ.get("ANALYSIS_RETRY_INTERVAL_SECONDS", "30"))
+ANALYSIS_RETRY_MAX_ATTEMPTS = int(os.environ.get("ANALYSIS_RETRY_MAX_ATTEMPTS", "6"))
+ANALYSIS_RETRY_LEASE_SECONDS = 600
+
+analysis_retry_col = LazyCollection("analysis_retry_queue")
+
+
+# ─── State ───
+class CircuitBreaker:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= LLM_BREAKER_FAILURES:
+            self.opened_at = time.monotonic()
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < LLM_BREAKER_OPEN_SECONDS
+
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 1
+        return max(1, round(LLM_BREAKER_OPEN_SECONDS - (time.monotonic() - self.opened_at)))
+
+
+breaker = process_local(CircuitBreaker)
+
+
+def reason():
+    """Why this worker is degraded right now, or None."""
+    if breaker().is_open():
+        return "breaker_open"
+    sched = scheduler()
+    if sched.depth() > (LLM_DEGRADE_QUEUE_DEPTH or 2 * sched.slots):
+        return "queue_depth"
+    return None
+
+
+# ─── Last good results ───
+class ResultCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+
+    def put(self, key: tuple, value):
+        self.entries[key] = (time.monotonic(), copy.deepcopy(value))
+        self.entries.move_to_end(key)
+        while len(self.entries) > DEGRADED_CACHE_SIZE:
+            self.entries.popitem(last=False)
+
+    def get(self, key: tuple):
+        hit = self.entries.get(key)
+        if hit is None or time.monotonic() - hit[0] > DEGRADED_CACHE_MAX_AGE_SECONDS:
+            return None
+        return copy.deepcopy(hit[1])
+
+
+cache = process_local(ResultCache)
+
+
+async def guarded(name: str, call, key=None, fallback=None):
+    """(result, degraded flag or None) for an AI call.
+
+    key names the input whose last good result may stand in for this one;
+    fallback() builds a rule-based result. With neither, upstream errors are
+    raised as-is and an open breaker answers 503 without calling upstream."""
+    why = reason()
+    cache_key = (tenancy.org_id(), name, key)
+    if why is None or (why == "queue_depth" and key is None and fallback is None):
+        try:
+            result = await call()
+        except Exception:
+            if key is None and fallback is None:
+                raise
+            why = "upstream_error"
+        else:
+            if key is not None:
+                cache().put(cache_key, result)
+            return result, None
+    hit = cache().get(cache_key) if key is not None else None
+    if hit is not None:
+        return hit, {"reason": why, "source": "cache"}
+    if fallback is not None:
+        return fallback(), {"reason": why, "source": "template"}
+    raise HTTPException(503, f"AI temporarily unavailable ({why})", headers={"Retry-After": str(breaker().retry_after())})
+
+
+def flagged(result: dict, degraded) -> dict:
+    return {**result, "degraded": degraded} if degraded else result
+
+
+# ─── Templates ───
+_ABSOLUTES = re.compile(r"\b(always|never|everyone|nobody|every time)\b", re.I)
+
+
+def nudge_template(messages: list, scenario: str) -> dict:
+    mine = [m["content"] for m in messages if m.get("role") == "user"]
+    last = mine[-1] if mine else ""
+    if not last:
+        return {"nudge": "Open by stating why you asked for this conversation and what a good outcome looks like for both of you.",
+                "specific_suggestion": "\"I wanted to talk about this because...\""}
+    if _ABSOLUTES.search(last):
+        return {"nudge": "Words like \"always\" or \"never\" tend to put people on the defensive. Anchor on one specific, recent example instead.",
+                "specific_suggestion": "Describe one concrete situation and its impact."}
+    if len(last.split()) < 8:
+        return {"nudge": "Your last reply was brief. Give the other person more context so they understand where you're coming from.",
+                "specific_suggestion": "Add a specific example or the reason behind your point."}
+    if "?" not in last:
+        return {"nudge": "You've been making statements. An open question will surface their perspective and lower the temperature.",
+                "specific_suggestion": "Ask \"How do you see this situation?\""}
+    return {"nudge": "Check that you've understood them before moving on. Summarizing shows you're listening.",
+            "specific_suggestion": "\"What I'm hearing is... is that right?\""}
+
+
+def survey_question_template(objective: str) -> list:
+    topic = objective.strip().rstrip(".") or "this topic"
+    return [
+        {"question": f"How satisfied are you with how we are doing on: {topic}?", "justification": "Baseline sentiment", "question_type": "scale"},
+        {"question": "How clearly have priorities and expectations been communicated to you recently?", "justification": "Clarity of direction", "question_type": "scale"},
+        {"question": "How supported do you feel by your direct manager?", "justification": "Manager support", "question_type": "scale"},
+        {"question": "How manageable is your current workload?", "justification": "Workload and stress", "question_type": "scale"},
+        {"question": "How comfortable do you feel raising concerns or disagreeing openly?", "justification": "Psychological safety", "question_type": "scale"},
+        {"question": "Which of these would most improve your day-to-day work?", "justification": "Improvement priorities", "question_type": "multiple_choice"},
+        {"question": f"What is working well today with regard to {topic}?", "justification": "Strengths to preserve", "question_type": "text"},
+        {"question": f"What one change would make the biggest difference to {topic}?", "justification": "Actionable suggestions", "question_type": "text"},
+    ]
+
+
+# ─── Deferred 1-on-1 analysis ───
+def ensure_indexes():
+    analysis_retry_col.create_index([("org_id", 1), ("session_id", 1)], unique=True)
+    analysis_retry_col.create_index("next_attempt_at")
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=ANALYSIS_RETRY_INTERVAL_SECONDS * 2 ** max(0, attempts - 1))
+
+
+def defer(session_id: str, payload: dict, why: str) -> bool:
+    """Queue (or requeue) a session's analysis; False once it has used up its attempts."""
+    job = analysis_retry_col.find_one({"session_id": session_id}, {"attempts": 1}) or {}
+    attempts = job.get("attempts", 0) + 1
+    if attempts > ANALYSIS_RETRY_MAX_ATTEMPTS:
+        analysis_retry_col.delete_one({"session_id": session_id})
+        return False
+    analysis_retry_col.update_one(
+        {"session_id": session_id},
+        {"$set": {"payload": payload, "reason": why, "attempts": attempts,
+                  "next_attempt_at": datetime.now(timezone.utc) + _backoff(attempts)}},
+        upsert=True,
+    )
+    return True
+
+
+def done(session_id: str):
+    analysis_retry_col.delete_one({"session_id": session_id})
+
+
+def _claim_due():
+    """Lease one due job from the current database, whichever org it belongs to."""
+    now = datetime.now(timezone.utc)
+    return analysis_retry_col.raw().find_one_and_update(
+        {"next_attempt_at": {"$lte": now}},
+        {"$set": {"next_attempt_at": now + timedelta(seconds=ANALYSIS_RETRY_LEASE_SECONDS)}},
+    )
+
+
+class RetryWorker:
+    def __init__(self):
+        self.task = None
+
+    async def _run(self, handler):
+        while True:
+            await asyncio.sleep(ANALYSIS_RETRY_INTERVAL_SECONDS)
+            try:
+                for placement in tenancy.placements():
+                    while reason() is None:
+                        with tenancy.using(placement):
+                            job = await asyncio.to_thread(_claim_due)
+                        if job is None:
+                            break
+                        with tenancy.using(job["org_id"]):
+                            await handler(job["payload"])
+            except Exception:
+                pass  # leased jobs come due again after the lease
+
+    def start(self, handler):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run(handler))
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+retry_worker = process_local(RetryWorker)
+
+
+def stats() -> dict:
+    b = breaker()
+    return {
+        "degraded": reason(),
+        "breaker": {"open": b.is_open(), "consecutive_failures": b.failures},
+        "queued_llm_calls": scheduler().depth(),
+        "cached_results": len(cache().entries),
+        "deferred_analyses": analysis_retry_col.count_documents({}),
+    }
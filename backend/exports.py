@@ -0,0 +1,117 @@
+import io
+import os
+import csv
+import json
+import zlib
+from itertools import islice
+from db import LazyCollection
+import archival
+
+# Streaming exports. Rows are produced straight off a Mongo cursor with a
+# fixed batch size and written out in small chunks (optionally gzip-framed), so
+# memory stays flat however many documents a survey or org has. Archived
+# sessions are read back from their archive blobs a batch at a time.
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "200"))
+
+survey_responses_col = LazyCollection("survey_responses")
+sessions_col = LazyCollection("one_on_one_sessions")
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _question_text(q) -> str:
+    return q.get("question", "") if isinstance(q, dict) else str(q)
+
+
+# ─── Row sources ───
+def survey_response_rows(survey: dict):
+    """(columns, row iterator) with one column per survey question."""
+    questions = [_question_text(q) for q in survey.get("questions", [])]
+    by_text = {q: i for i, q in enumerate(questions)}
+    columns = ["response_id", "submitted_at"] + [f"q{i + 1}: {q}" for i, q in enumerate(questions)]
+
+    def rows():
+        cursor = survey_responses_col.find({"survey_id": survey["survey_id"]}, {"_id": 0}).sort("submitted_at", 1).batch_size(EXPORT_BATCH_SIZE)
+        for doc in cursor:
+            answers = [""] * len(questions)
+            for r in doc.get("responses") or []:
+                if not isinstance(r, dict):
+                    continue
+                idx = r.get("question_index")
+                if not isinstance(idx, int):
+                    idx = by_text.get(r.get("question"))
+                if idx is not None and 0 <= idx < len(questions):
+                    answers[idx] = r.get("answer", "")
+            yield [doc.get("response_id"), doc.get("submitted_at")] + answers
+
+    return columns, rows()
+
+
+SESSION_COLUMNS = [
+    "session_id", "employee_id", "employee_name", "supervisor_id", "date", "submitted_at", "meeting_location",
+    "leadership_score", "effectiveness_score", "supervisor_summary", "employee_summary",
+    "swot_analysis", "action_items", "coaching_recommendations", "critical_coaching_insight",
+]
+_SESSION_PROJECTION = {"_id": 0, **{c: 1 for c in SESSION_COLUMNS[:7]}, "analysis": 1, "archived": 1}
+
+
+def _batches(cursor):
+    while batch := list(islice(cursor, EXPORT_BATCH_SIZE)):
+        yield batch
+
+
+def session_analysis_rows():
+    def rows():
+        # Archived stubs carry no analysis; theirs is in the archive blob
+        query = {"$or": [{"analysis": {"$type": "object"}}, {"archived": True}]}
+        cursor = sessions_col.find(query, _SESSION_PROJECTION).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+        for doc in (d for batch in _batches(cursor) for d in archival.hydrate("one_on_one_sessions", batch)):
+            a = doc.get("analysis")
+            if not isinstance(a, dict):
+                continue
+            row = [doc.get(c, "") for c in SESSION_COLUMNS[:7]]
+            row += [a.get("leadership_score", ""), a.get("effectiveness_score", ""), a.get("supervisor_summary", ""), a.get("employee_summary", "")]
+            row += [json.dumps(a.get(k)) if a.get(k) is not None else "" for k in SESSION_COLUMNS[11:]]
+            yield row
+
+    return SESSION_COLUMNS, rows()
+
+
+# ─── Encoders ───
+def _csv_chunks(columns: list, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(columns: list, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=str))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _gzip(chunks):
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = gz.compress(chunk)
+        if data:
+            yield data
+    yield gz.flush()
+
+
+def encode(fmt: str, columns: list, rows, gzip: bool = False):
+    chunks = (c.encode() for c in (_csv_chunks if fmt == "csv" else _ndjson_chunks)(columns, rows))
+    return _gzip(chunks) if gzip else chunks
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime, timezone
+from db import LazyCollection, get_db, replace_index
+import tenancy
+
+# Append-only histories stored in fixed-size buckets keyed by parent id, so
+# parents (goals, cases, Nets sessions) only carry their latest entry and a
+# count. Each bucket holds up to HISTORY_BUCKET_SIZE entries in arrival order;
+# bucket order is _id order.
+HISTORY_BUCKET_SIZE = int(os.environ.get("HISTORY_BUCKET_SIZE", "50"))
+
+
+class BucketedHistory:
+    def __init__(self, collection: str, bucket_size: int = HISTORY_BUCKET_SIZE):
+        self.col = LazyCollection(collection)
+        self.bucket_size = bucket_size
+
+    def ensure_indexes(self):
+        self.col.create_index([("org_id", 1), ("parent_id", 1), ("_id", -1)])
+
+    def append(self, parent_id: str, entries: list):
+        # Only the newest bucket takes entries: filling an older, partly full
+        # one would put them out of order. A chunk that doesn't fit opens a new one.
+        for i in range(0, len(entries), self.bucket_size):
+            chunk = entries[i:i + self.bucket_size]
+            newest = self.col.find_one({"parent_id": parent_id}, {"_id": 1}, sort=[("_id", -1)])
+            if newest and self.col.update_one(
+                {"_id": newest["_id"], "count": {"$lte": self.bucket_size - len(chunk)}},
+                {"$push": {"entries": {"$each": chunk}}, "$inc": {"count": len(chunk)}},
+            ).modified_count:
+                continue
+            self.col.insert_one({"parent_id": parent_id, "entries": chunk, "count": len(chunk), "created_at": datetime.now(timezone.utc).isoformat()})
+
+    def all(self, parent_id: str) -> list:
+        """Full history, oldest first."""
+        out = []
+        for bucket in self.col.find({"parent_id": parent_id}, {"_id": 0, "entries": 1}).sort("_id", 1):
+            out.extend(bucket.get("entries", []))
+        return out
+
+    def page(self, parent_id: str, offset: int = 0, limit: int = 20) -> dict:
+        """Newest-first page; bucket headers are read first so only the buckets on the page are fetched."""
+        offset, limit = max(0, offset), max(1, min(limit, 200))
+        headers = list(self.col.find({"parent_id": parent_id}, {"_id": 1, "count": 1}).sort("_id", -1))
+        total = sum(h["count"] for h in headers)
+        needed, skip, seen = [], None, 0
+        for h in headers:
+            if seen + h["count"] > offset and seen < offset + limit:
+                if skip is None:
+                    skip = offset - seen
+                needed.append(h["_id"])
+            seen += h["count"]
+        items = []
+        if needed:
+            buckets = {b["_id"]: b["entries"] for b in self.col.find({"_id": {"$in": needed}}, {"entries": 1})}
+            for bucket_id in needed:
+                items.extend(reversed(buckets.get(bucket_id, [])))
+            items = items[skip:skip + limit]
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+    def delete(self, parent_id: str):
+        self.col.delete_many({"parent_id": parent_id})
+
+
+goal_check_ins = BucketedHistory("coaching_goal_check_ins")
+case_timeline = BucketedHistory("critical_case_timeline")
+nets_messages = BucketedHistory("nets_session_messages")
+
+# parent collection, parent id field, embedded array, history, latest field, count field
+EMBEDDED = [
+    ("coaching_goals", "goal_id", "check_ins", goal_check_ins, "latest_check_in", "check_in_count"),
+    ("critical_cases", "case_id", "timeline", case_timeline, "latest_timeline_entry", "timeline_count"),
+    ("nets_sessions", "session_id", "messages", nets_messages, "last_message", "message_count"),
+]
+
+
+def ensure_indexes():
+    for _, _, _, history, _, _ in EMBEDDED:
+        history.ensure_indexes()
+    replace_index(case_timeline.col, [("org_id", 1), ("entries.response", "text")], "timeline_text")
+
+
+def migrate_embedded():
+    """Move arrays still embedded in parents into buckets (once per database, by the worker that claims it)."""
+    claim = get_db()["meta"].update_one({"_id": tenancy.marker("history_buckets")}, {"$setOnInsert": {"migrated_at": datetime.now(timezone.utc).isoformat()}}, upsert=True)
+    if claim.upserted_id is None:
+        return
+    for col_name, id_field, array, history, latest, count in EMBEDDED:
+        col = get_db()[col_name]
+        for doc in col.find({array: {"$exists": True}}, {"org_id": 1, id_field: 1, array: 1}):
+            entries = doc.get(array) or []
+            with tenancy.using(doc.get("org_id", tenancy.DEFAULT_ORG)):
+                if entries:
+                    history.append(doc[id_field], entries)
+            col.update_one({"_id": doc["_id"]}, {"$unset": {array: ""}, "$set": {latest: entries[-1] if entries else None, count: len(entries)}})
@@ -0,0 +1,130 @@
+import os
+import time
+import zlib
+import hashlib
+from fastapi import Depends, HTTPException, Request, Response
+from pymongo import ReadPreference
+from starlette.datastructures import Headers, MutableHeaders
+import access
+import tenancy
+from db import collection_versions
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Response compression and conditional GETs.
+#
+# CompressionMiddleware brotli- or gzip-encodes responses of at least
+# COMPRESS_MIN_BYTES (streamed bodies chunk by chunk, flushed so streaming
+# still streams). Bodies that already carry an encoding or a compressed media
+# type (gzip exports) pass through untouched.
+#
+# etag(*collections) tags a route's response with the per-collection write
+# versions it depends on (db.collection_versions); a matching If-None-Match is
+# answered 304 before the route touches any documents. On secondary reads the
+# tag also carries a DATA_MAX_STALENESS_SECONDS time bucket, so a lagging
+# secondary's reply can't stay cached under a newer tag past the staleness bound.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+PRECOMPRESSED = {"application/gzip", "application/x-gzip", "application/zip"}
+
+
+# ─── Compression ───
+class _Gzip:
+    def __init__(self):
+        self.z = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self.z.compress(data) + self.z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self.z.compress(data) + self.z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self.c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self.c.process(data) + self.c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self.c.process(data) + self.c.finish()
+
+
+def _negotiate(accept: str):
+    accepted = {part.split(";")[0].strip() for part in accept.lower().split(",")}
+    if brotli and "br" in accepted:
+        return "br", _Brotli
+    if "gzip" in accepted:
+        return "gzip", _Gzip
+    return None, None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding, codec = _negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            return await self.app(scope, receive, send)
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def compress(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message  # held until the first body chunk decides
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                return await send(message)
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if state["compressor"] is None:
+                start = state["start"]
+                headers = MutableHeaders(raw=start["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if ("content-encoding" in headers or media_type in PRECOMPRESSED or start["status"] in (204, 304)
+                        or (not more and len(body) < self.minimum_size)):
+                    state["passthrough"] = True
+                    await send(start)
+                    return await send(message)
+                state["compressor"] = codec()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more:
+                    del headers["Content-Length"]
+                else:
+                    body = state["compressor"].finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": body})
+                await send(start)
+            compressor = state["compressor"]
+            data = compressor.chunk(body) if more else compressor.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, compress)
+
+
+# ─── Conditional GET ───
+def _matches(if_none_match: str, tag: str) -> bool:
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in candidates or tag.removeprefix("W/") in candidates
+
+
+def etag(*collections: str):
+    def dependency(request: Request, response: Response):
+        versions = collection_versions(collections)
+        parts = [tenancy.org_id(), request.url.path, request.url.query, *(f"{c}={versions.get(c, 0)}" for c in collections)]
+        if access.options().get("read_preference", ReadPreference.PRIMARY) != ReadPreference.PRIMARY:
+            parts.append(str(int(time.time() // access.DATA_MAX_STALENESS_SECONDS)))
+        tag = 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:24] + '"'
+        if _matches(request.headers.get("if-none-match", ""), tag):
+            raise HTTPException(304, headers={"ETag": tag})
+        response.headers["ETag"] = tag
+    return Depends(dependency)
@@ -0,0 +1,113 @@
+import os
+import json
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime, timezone, timedelta
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+from db import LazyCollection
+
+# Idempotency-Key support for expensive AI-backed POSTs. The first request with
+# a key claims it (status in_flight) and runs; its JSON result is stored under
+# the key for IDEMPOTENCY_TTL_SECONDS (TTL index). A retry with the same key
+# replays the stored result without running again, or, while the original is
+# still in flight on any worker, waits up to IDEMPOTENCY_WAIT_SECONDS for it
+# (409 after that). The owner renews its IDEMPOTENCY_LEASE_SECONDS lease while
+# it runs, so only a claim whose worker died is taken over once the lease
+# lapses; completing or releasing a claim is conditional on still owning it.
+# Reusing a key with a different body is a 422; a run that raises releases the
+# key so the client can retry.
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "120"))
+IDEMPOTENCY_LEASE_SECONDS = float(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "300"))
+IDEMPOTENCY_POLL_SECONDS = 0.25
+IDEMPOTENCY_RENEW_FRACTION = 1 / 3  # renew every third of a lease
+MAX_KEY_LENGTH = 255
+
+idempotency_col = LazyCollection("idempotency_keys")
+
+
+def ensure_indexes():
+    idempotency_col.create_index([("org_id", 1), ("route", 1), ("key", 1)], unique=True)
+    idempotency_col.create_index("expires_at", expireAfterSeconds=0)
+
+
+def _fingerprint(payload) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(route: str, key: str, fingerprint: str, owner: str):
+    """None when owner now holds the key, else the existing record."""
+    now = datetime.now(timezone.utc)
+    try:
+        idempotency_col.insert_one({
+            "route": route, "key": key, "fingerprint": fingerprint, "status": "in_flight", "owner": owner,
+            "lease_until": now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS),
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+    # Take over a claim whose owner stopped renewing it
+    taken = idempotency_col.find_one_and_update(
+        {"route": route, "key": key, "fingerprint": fingerprint, "status": "in_flight", "lease_until": {"$lt": now}},
+        {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)}},
+    )
+    if taken:
+        return None
+    return idempotency_col.find_one({"route": route, "key": key}) or {"status": "in_flight", "fingerprint": fingerprint}
+
+
+async def _renew(claim: dict):
+    """Keep a claim's lease from lapsing while its run is in progress."""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_LEASE_SECONDS * IDEMPOTENCY_RENEW_FRACTION)
+        renewed = idempotency_col.update_one(
+            claim,
+            {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)}},
+        )
+        if not renewed.matched_count:
+            return  # taken over after all (e.g. this worker stalled past the lease)
+
+
+async def once(request: Request, response: Response, route: str, payload, run):
+    """await run() at most once per Idempotency-Key (plain await run() without one)."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return await run()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"{IDEMPOTENCY_HEADER} is longer than {MAX_KEY_LENGTH} characters")
+    fingerprint, owner = _fingerprint(payload), uuid.uuid4().hex
+    waited = 0.0
+    while (record := _claim(route, key, fingerprint, owner)) is not None:
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(422, f"{IDEMPOTENCY_HEADER} was already used with a different request body")
+        if record["status"] == "completed":
+            response.headers["Idempotent-Replayed"] = "true"
+            return record["response"]
+        if waited >= IDEMPOTENCY_WAIT_SECONDS:
+            raise HTTPException(409, "A request with this Idempotency-Key is still in progress",
+                                headers={"Retry-After": "5"})
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+        waited += IDEMPOTENCY_POLL_SECONDS
+    mine = {"route": route, "key": key, "owner": owner, "status": "in_flight"}
+    renewer = asyncio.create_task(_renew(mine))
+    try:
+        result = await run()
+    except BaseException:
+        idempotency_col.delete_one(mine)
+        raise
+    finally:
+        renewer.cancel()
+    result = jsonable_encoder(result)
+    idempotency_col.update_one(
+        mine,
+        {"$set": {"status": "completed", "response": result,
+                  "expires_at": datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)},
+         "$unset": {"lease_until": "", "owner": ""}},
+    )
+    return result
@@ -0,0 +1,54 @@
+import os
+from datetime import datetime, timezone, timedelta
+from pymongo.errors import BulkWriteError
+from db import LazyCollection
+
+# Per-user insight feed: the latest INSIGHT_FEED_SIZE documents per user stay in
+# `insights`; older ones roll into `insights_archive`, which expires via TTL.
+INSIGHT_FEED_SIZE = int(os.environ.get("INSIGHT_FEED_SIZE", "20"))
+INSIGHT_ARCHIVE_TTL_DAYS = int(os.environ.get("INSIGHT_ARCHIVE_TTL_DAYS", "180"))
+
+insights_col = LazyCollection("insights")
+# Feed inserts are never read back by the request that makes them
+insights_writes = LazyCollection("insights", policy="fire_and_forget")
+insights_archive_col = LazyCollection("insights_archive")
+
+
+def ensure_indexes():
+    insights_col.create_index([("org_id", 1), ("user_id", 1), ("created_ts", -1)])
+    insights_col.create_index([("org_id", 1), ("created_ts", -1)])
+    insights_archive_col.create_index([("org_id", 1), ("user_id", 1), ("created_ts", -1)])
+    insights_archive_col.create_index("archived_at", expireAfterSeconds=INSIGHT_ARCHIVE_TTL_DAYS * 86400)
+    # Older documents only carry the ISO string; give them a sortable date.
+    insights_col.update_many({"created_ts": {"$exists": False}}, [{"$set": {"created_ts": {"$toDate": "$created_at"}}}])
+
+
+def add_insights(user_id: str, texts: list):
+    if not texts:
+        return
+    now = datetime.now(timezone.utc)
+    # Offset by a millisecond each so one batch keeps its order in the feed.
+    docs = []
+    for i, text in enumerate(texts):
+        ts = now + timedelta(milliseconds=i)
+        docs.append({"user_id": user_id, "insight": text, "created_at": ts.isoformat(), "created_ts": ts})
+    insights_writes.insert_many(docs)
+    _roll_over(user_id)
+
+
+def _roll_over(user_id: str):
+    stale = list(insights_col.find({"user_id": user_id}).sort("created_ts", -1).skip(INSIGHT_FEED_SIZE))
+    if not stale:
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        insights_archive_col.insert_many([{**d, "archived_at": now} for d in stale], ordered=False)
+    except BulkWriteError:
+        pass  # already archived by a concurrent roll-over
+    insights_col.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+
+
+def get_feed(user_id: str = "", limit: int = 10) -> list:
+    query = {"user_id": user_id} if user_id else {}
+    cursor = insights_col.find(query, {"_id": 0, "created_ts": 0}).sort("created_ts", -1)
+    return list(cursor.limit(max(1, min(limit, INSIGHT_FEED_SIZE))))
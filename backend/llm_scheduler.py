@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from contextlib import asynccontextmanager
+from runtime import process_local, share_of
+
+# Priority scheduling of upstream LLM calls. Every call takes a slot from the
+# worker's LLM budget under a priority class:
+#
+#   interactive  someone is waiting on the reply turn by turn (practice arena,
+#                nudges, performance chat); always served first and has
+#                LLM_INTERACTIVE_RESERVED_SHARE of the slots to itself
+#   batch        heavy analyses (surveys, pulses, 1-on-1 reports); limited to
+#                the unreserved slots so it can never crowd interactive out
+#
+# A batch call that has waited LLM_BATCH_MAX_WAIT_SECONDS is aged ahead of
+# queued interactive calls for the next free unreserved slot, so a steady
+# stream of interactive turns can't starve batch work. The class comes from
+# the calling ai_service function (@priority); unmarked calls are batch.
+CLASSES = ("interactive", "batch")
+LLM_INTERACTIVE_RESERVED_SHARE = float(os.environ.get("LLM_INTERACTIVE_RESERVED_SHARE", "0.25"))
+LLM_BATCH_MAX_WAIT_SECONDS = float(os.environ.get("LLM_BATCH_MAX_WAIT_SECONDS", "10"))
+
+_class = contextvars.ContextVar("llm_class", default="batch")
+
+
+def priority(cls: str):
+    """Run the decorated coroutine's LLM calls under priority class cls."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def call(*args, **kwargs):
+            token = _class.set(cls)
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _class.reset(token)
+        return call
+    return wrap
+
+
+class PriorityScheduler:
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.reserved = min(slots - 1, round(slots * LLM_INTERACTIVE_RESERVED_SHARE))
+        self.running = dict.fromkeys(CLASSES, 0)
+        self.queues = {cls: deque() for cls in CLASSES}  # (future, enqueued at)
+        self.counters = {cls: {"admitted": 0, "cancelled": 0, "aged": 0, "wait_total": 0.0, "wait_max": 0.0} for cls in CLASSES}
+
+    def _fits(self, cls: str) -> bool:
+        if sum(self.running.values()) >= self.slots:
+            return False
+        return cls == "interactive" or self.running["batch"] < self.slots - self.reserved
+
+    def _admit(self, cls: str, waited: float):
+        self.running[cls] += 1
+        c = self.counters[cls]
+        c["admitted"] += 1
+        c["wait_total"] += waited
+        c["wait_max"] = max(c["wait_max"], waited)
+
+    def _head(self, cls: str):
+        q = self.queues[cls]
+        while q and q[0][0].done():  # cancelled while queued
+            q.popleft()
+        return q[0] if q else None
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while True:
+            batch = self._head("batch")
+            aged = batch is not None and now - batch[1] >= LLM_BATCH_MAX_WAIT_SECONDS
+            order = ("batch", "interactive") if aged else CLASSES
+            cls = next((c for c in order if self._head(c) and self._fits(c)), None)
+            if cls is None:
+                return
+            fut, enqueued = self.queues[cls].popleft()
+            if cls == "batch" and aged and self._head("interactive"):
+                self.counters[cls]["aged"] += 1
+            self._admit(cls, now - enqueued)
+            fut.set_result(True)
+
+    async def acquire(self, cls: str):
+        if not self._head(cls) and self._fits(cls) and (cls == "interactive" or not self._head("interactive")):
+            self._admit(cls, 0.0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self.queues[cls].append((fut, time.monotonic()))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(cls)  # granted just as the caller went away
+            else:
+                self.counters[cls]["cancelled"] += 1
+                fut.cancel()
+            raise
+
+    def release(self, cls: str):
+        self.running[cls] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, cls: str = None):
+        cls = cls or _class.get()
+        await self.acquire(cls)
+        try:
+            yield
+        finally:
+            self.release(cls)
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def stats(self) -> dict:
+        classes = {}
+        for cls in CLASSES:
+            c = self.counters[cls]
+            self._head(cls)
+            classes[cls] = {
+                "running": self.running[cls],
+                "queued": len(self.queues[cls]),
+                "admitted": c["admitted"],
+                "cancelled": c["cancelled"],
+                "aged": c["aged"],
+                "avg_wait_ms": round(1000 * c["wait_total"] / c["admitted"], 1) if c["admitted"] else 0.0,
+                "max_wait_ms": round(1000 * c["wait_max"], 1),
+            }
+        return {"slots": self.slots, "reserved_interactive": self.reserved, "classes": classes}
+
+
+scheduler = process_local(lambda: PriorityScheduler(share_of("LLM_CONCURRENCY_BUDGET", 32)))
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from dotenv import load_dotenv
+from emergentintegrations.llm.chat import LlmChat
+from runtime import process_local
+
+load_dotenv()
+
+# Model routing for ai_service. Each function (route) has an ordered list of
+# "provider/model" candidates and a timeout. A call goes to the first
+# candidate whose prompt-size limit fits and whose recent p95 latency is within
+# the route's latency budget (slow models are moved to the back, not dropped);
+# on timeout or error it falls back to the next candidate. Streamed calls fall
+# back only until the first chunk arrives, after that the model is committed.
+#
+# MODEL_LIMITS / MODEL_ROUTES (JSON env) override or extend the tables below.
+API_KEY = os.environ.get("EMERGENT_LLM_KEY")
+FLASH = "gemini/gemini-2.5-flash"
+FLASH_LITE = "gemini/gemini-2.5-flash-lite"
+MINI = "openai/gpt-4o-mini"
+LATENCY_WINDOW = int(os.environ.get("MODEL_LATENCY_WINDOW", "50"))
+LATENCY_MIN_SAMPLES = 5
+
+# model -> max prompt chars (system + user message)
+MODEL_LIMITS = {
+    FLASH: 1_000_000,
+    FLASH_LITE: 1_000_000,
+    MINI: 400_000,
+}
+MODEL_LIMITS.update(json.loads(os.environ.get("MODEL_LIMITS", "{}")))
+
+_LIGHT = {"models": [FLASH_LITE, FLASH, MINI], "timeout": 10, "latency_budget_ms": 3000}
+_CHAT = {"models": [FLASH, FLASH_LITE, MINI], "timeout": 20, "latency_budget_ms": 6000}
+_HEAVY = {"models": [FLASH, MINI], "timeout": 120, "latency_budget_ms": 60000}
+
+ROUTES = {
+    "nets_nudge": _LIGHT,
+    "generate_scenario_suggestion": _LIGHT,
+    "generate_survey_questions": _LIGHT,
+    "nets_simulate": _CHAT,
+    "performance_chat": _CHAT,
+    "coaching_feedback": _CHAT,
+    "generate_briefing_packet": {**_CHAT, "timeout": 45, "latency_budget_ms": 20000},
+    "nets_annotate_window": {**_HEAVY, "timeout": 60, "latency_budget_ms": 30000},
+    "nets_scorecard": _HEAVY,
+    "nets_scorecard_reduce": _HEAVY,
+    "analyze_one_on_one": _HEAVY,
+    "analyze_survey": _HEAVY,
+    "generate_leadership_pulse": _HEAVY,
+    "summarize_leadership_pulse": _HEAVY,
+}
+ROUTES.update({k: {**ROUTES.get(k, _CHAT), **v} for k, v in json.loads(os.environ.get("MODEL_ROUTES", "{}")).items()})
+
+
+class ModelMetrics:
+    def __init__(self):
+        self.models = {}
+
+    def _entry(self, model: str) -> dict:
+        if model not in self.models:
+            self.models[model] = {"calls": 0, "ok": 0, "timeouts": 0, "errors": 0, "fallbacks": 0,
+                                  "latencies": deque(maxlen=LATENCY_WINDOW)}
+        return self.models[model]
+
+    def record(self, model: str, outcome: str, seconds: float = None):
+        m = self._entry(model)
+        m["calls"] += 1
+        m[outcome] += 1
+        if seconds is not None:
+            m["latencies"].append(seconds * 1000)
+
+    def fell_back(self, model: str):
+        self._entry(model)["fallbacks"] += 1
+
+    def p95_ms(self, model: str):
+        lat = sorted(self._entry(model)["latencies"])
+        if len(lat) < LATENCY_MIN_SAMPLES:
+            return None
+        return lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+
+    def stats(self) -> dict:
+        out = {}
+        for model, m in self.models.items():
+            lat = m["latencies"]
+            out[model] = {k: m[k] for k in ("calls", "ok", "timeouts", "errors", "fallbacks")}
+            out[model]["success_rate"] = round(m["ok"] / m["calls"], 3) if m["calls"] else None
+            out[model]["avg_ms"] = round(sum(lat) / len(lat), 1) if lat else None
+            out[model]["p95_ms"] = round(self.p95_ms(model), 1) if len(lat) >= LATENCY_MIN_SAMPLES else None
+        return out
+
+
+metrics = process_local(ModelMetrics)
+
+
+def candidates(route: str, prompt_chars: int) -> list:
+    """Route's models in call order: within size limit, then within latency budget."""
+    spec = ROUTES.get(route, _CHAT)
+    models = spec["models"]
+    fitting = [m for m in models if prompt_chars <= MODEL_LIMITS.get(m, float("inf"))] or models[-1:]
+    budget, m = spec["latency_budget_ms"], metrics()
+    fast = [x for x in fitting if (m.p95_ms(x) or 0) <= budget]
+    return fast + [x for x in fitting if x not in fast]
+
+
+class RoutedChat:
+    """LlmChat stand-in that sends through the route's model candidates."""
+
+    def __init__(self, route: str, system_message: str, session_id: str):
+        self.route = route
+        self.system_message = system_message
+        self.session_id = session_id
+        self.timeout = ROUTES.get(route, _CHAT)["timeout"]
+
+    def _chat(self, model: str):
+        provider, name = model.split("/", 1)
+        return LlmChat(api_key=API_KEY, session_id=self.session_id, system_message=self.system_message).with_model(provider, name)
+
+    def _candidates(self, msg) -> list:
+        return candidates(self.route, len(self.system_message) + len(getattr(msg, "text", "")))
+
+    def _failed(self, model: str, error: Exception, started: float, last: bool):
+        m = metrics()
+        if isinstance(error, asyncio.TimeoutError):
+            m.record(model, "timeouts", time.monotonic() - started)
+        else:
+            m.record(model, "errors")
+        if last:
+            raise error
+        m.fell_back(model)
+
+    async def _send_one(self, chat, model: str, msg, last: bool):
+        """One attempt on one model; None when it failed and the next should be tried."""
+        started = time.monotonic()
+        try:
+            reply = await asyncio.wait_for(chat.send_message(msg), self.timeout)
+        except Exception as e:
+            self._failed(model, e, started, last)
+            return None
+        metrics().record(model, "ok", time.monotonic() - started)
+        return reply
+
+    async def send_message(self, msg):
+        models = self._candidates(msg)
+        for i, model in enumerate(models):
+            reply = await self._send_one(self._chat(model), model, msg, last=i + 1 == len(models))
+            if reply is not None:
+                return reply
+
+    async def stream_message(self, msg):
+        models = self._candidates(msg)
+        for i, model in enumerate(models):
+            chat, last, started = self._chat(model), i + 1 == len(models), time.monotonic()
+            stream = getattr(chat, "stream_message", None)
+            if stream is None:
+                reply = await self._send_one(chat, model, msg, last)
+                if reply is None:
+                    continue
+                yield reply
+                return
+            chunks = stream(msg)
+            try:
+                first = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+            except StopAsyncIteration:
+                first = ""
+            except Exception as e:
+                await chunks.aclose()
+                self._failed(model, e, started, last)
+                continue
+            yield first
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception:
+                metrics().record(model, "errors")
+                raise
+            metrics().record(model, "ok", time.monotonic() - started)
+            return
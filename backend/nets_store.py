@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from pymongo import UpdateOne
+from db import LazyCollection
+from history import nets_messages
+from runtime import process_local, worker_count
+import tenancy
+
+# Hot store for active Nets practice sessions.
+#
+# Active sessions are served from an in-process LRU (capped at
+# NETS_HOT_MAX_SESSIONS, evicted after NETS_HOT_IDLE_SECONDS idle) and new
+# turns are persisted write-behind: appended to a pending buffer and flushed to
+# Mongo as one bulk write every NETS_FLUSH_INTERVAL_MS. Evicted sessions stay
+# readable (and are taken back on access) until that flush has written their
+# pending turns, so a reload from Mongo never misses any.
+#
+# Crash safety: session creation and completion are written through, and
+# end_nets_session plus app shutdown flush everything pending. A worker that
+# dies without a clean shutdown loses at most the turns from the last flush
+# interval. A failed flush keeps its batch and retries on the next tick.
+# Turns themselves live in the nets_session_messages buckets (history.py); the
+# session document only carries last_message and message_count.
+# Because each worker has its own store, multi-worker deployments need sticky
+# routing by session; without it, leave NETS_HOT_STORE off (the default when
+# WEB_CONCURRENCY > 1) and every turn is written through.
+NETS_HOT_STORE = os.environ.get("NETS_HOT_STORE", "1" if worker_count() == 1 else "0") == "1"
+NETS_HOT_MAX_SESSIONS = int(os.environ.get("NETS_HOT_MAX_SESSIONS", "1000"))
+NETS_HOT_IDLE_SECONDS = float(os.environ.get("NETS_HOT_IDLE_SECONDS", "900"))
+NETS_FLUSH_INTERVAL_MS = int(os.environ.get("NETS_FLUSH_INTERVAL_MS", "200"))
+
+nets_sessions_col = LazyCollection("nets_sessions")
+
+
+def _apply_set(doc: dict, path: str, value):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+class NetsHotStore:
+    def __init__(self, enabled: bool = NETS_HOT_STORE):
+        self.enabled = enabled
+        self.sessions = OrderedDict()
+        self.evicting = {}  # evicted, still served until their turns are flushed
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.task = None
+
+    # ─── Reads ───
+    def get(self, session_id: str):
+        if self.enabled:
+            with self.lock:
+                entry = self.sessions.get(session_id) or self.evicting.get(session_id)
+                if entry and entry["doc"].get("org_id") == tenancy.org_id():
+                    self.evicting.pop(session_id, None)
+                    entry["touched"] = time.monotonic()
+                    self.sessions[session_id] = entry
+                    self.sessions.move_to_end(session_id)
+                    return entry["doc"]
+        doc = nets_sessions_col.find_one({"session_id": session_id}, {"_id": 0})
+        if doc:
+            doc["messages"] = nets_messages.all(session_id)
+        if doc and self.enabled and doc.get("status") == "active":
+            self.put(doc)
+        return doc
+
+    def put(self, doc: dict):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.evicting.pop(doc["session_id"], None)
+            self.sessions[doc["session_id"]] = {"doc": doc, "touched": time.monotonic()}
+            self.sessions.move_to_end(doc["session_id"])
+            while len(self.sessions) > NETS_HOT_MAX_SESSIONS:
+                sid, entry = self.sessions.popitem(last=False)
+                self.evicting[sid] = entry  # the flusher writes and releases it
+
+    # ─── Writes ───
+    def append(self, session_id: str, messages: list):
+        if not self.enabled:
+            nets_messages.append(session_id, messages)
+            nets_sessions_col.update_one({"session_id": session_id}, {"$set": {"last_message": messages[-1]}, "$inc": {"message_count": len(messages)}})
+            return
+        doc = self.get(session_id)
+        with self.lock:
+            doc["messages"].extend(messages)
+            self._pending(session_id)["push"].extend(messages)
+
+    def set_fields(self, session_id: str, fields: dict):
+        if not self.enabled:
+            nets_sessions_col.update_one({"session_id": session_id}, {"$set": fields})
+            return
+        with self.lock:
+            entry = self.sessions.get(session_id) or self.evicting.get(session_id)
+            if entry:
+                for path, value in fields.items():
+                    _apply_set(entry["doc"], path, value)
+            pending = self._pending(session_id)["set"]
+            for path, value in fields.items():
+                # Mongo rejects a $set holding both a path and its parent; keep the outermost
+                for key in [k for k in pending if k.startswith(path + ".")]:
+                    del pending[key]
+                parent = next((k for k in pending if path.startswith(k + ".")), None)
+                if parent and isinstance(pending[parent], dict):
+                    _apply_set(pending[parent], path[len(parent) + 1:], value)
+                else:
+                    pending[path] = value
+
+    def _pending(self, session_id: str) -> dict:
+        return self.pending.setdefault(session_id, {"org": tenancy.org_id(), "push": [], "set": {}, "inc": 0})
+
+    def flush(self, session_ids: list = None):
+        with self.flush_lock:
+            with self.lock:
+                keys = list(self.pending) if session_ids is None else [k for k in session_ids if k in self.pending]
+                batch = {k: self.pending.pop(k) for k in keys}
+            if batch:
+                try:
+                    by_org = {}
+                    for sid, p in batch.items():
+                        by_org.setdefault(p["org"], []).append((sid, p))
+                    for org, items in by_org.items():
+                        # Flushes run off the request; write as the org that queued the turns
+                        with tenancy.using(org):
+                            self._write(items)
+                except Exception:
+                    # Put the batch back in front of anything appended meanwhile
+                    with self.lock:
+                        for sid, p in batch.items():
+                            newer = self.pending.get(sid, {"push": [], "set": {}, "inc": 0})
+                            self.pending[sid] = {"org": p["org"], "push": p["push"] + newer["push"], "set": {**p["set"], **newer["set"]}, "inc": p["inc"] + newer["inc"]}
+                    raise
+            self._release()
+
+    def _release(self):
+        """Drop evicted sessions with nothing left to write (called under flush_lock)."""
+        with self.lock:
+            for sid in [sid for sid in self.evicting if sid not in self.pending]:
+                del self.evicting[sid]
+
+    def _write(self, items: list):
+        ops = []
+        for sid, p in items:
+            if p["push"]:
+                nets_messages.append(sid, p["push"])
+                # Turns are in their buckets now; only the parent counters remain to retry
+                p["set"]["last_message"] = p["push"][-1]
+                p["inc"] += len(p["push"])
+                p["push"] = []
+            update = {}
+            if p["inc"]:
+                update["$inc"] = {"message_count": p["inc"]}
+            if p["set"]:
+                update["$set"] = p["set"]
+            if update:
+                ops.append(UpdateOne(nets_sessions_col.scoped({"session_id": sid}), update))
+        if ops:
+            nets_sessions_col.bulk_write(ops, ordered=False)
+
+    async def close_session(self, session_id: str):
+        """Flush a finished session and drop it from memory."""
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self.flush, [session_id])
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            self.evicting.pop(session_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - NETS_HOT_IDLE_SECONDS
+        with self.lock:
+            for sid in [sid for sid, e in self.sessions.items() if e["touched"] < cutoff]:
+                self.evicting[sid] = self.sessions.pop(sid)
+
+    async def tick(self):
+        """One write-behind round: evict idle sessions, flush, release what was written."""
+        self._evict_idle()
+        if self.pending or self.evicting:
+            await asyncio.to_thread(self.flush)
+
+    # ─── Background flusher ───
+    async def _run(self):
+        while True:
+            await asyncio.sleep(NETS_FLUSH_INTERVAL_MS / 1000)
+            try:
+                await self.tick()
+            except Exception:
+                pass  # batch was requeued; retried next tick
+
+    def start(self):
+        if self.enabled and self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.enabled:
+            await asyncio.to_thread(self.flush)
+
+
+store = process_local(NetsHotStore)
@@ -0,0 +1,251 @@
+import os
+import io
+import re
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import cProfile
+import marshal
+import threading
+import traceback
+from collections import Counter, deque
+from fastapi import Depends, HTTPException, Request
+from runtime import process_local
+
+# On-demand profiling of a worker, behind ADMIN_TOKEN (X-Admin-Token header;
+# the admin routes 403 while it is unset).
+#
+# Request profiling: for a limited time, a sample of requests whose path
+# matches a regex is profiled, either with cProfile (event-loop thread only,
+# one request at a time, downloadable as a .prof for pstats/snakeviz) or with
+# a statistical sampler (all threads, so sync handlers in the threadpool show
+# up too; downloadable as folded stacks for flamegraph tools).
+#
+# Loop monitor: a heartbeat task measures event-loop lag; a watchdog thread
+# captures the loop thread's stack whenever the heartbeat is late by more than
+# the threshold, which is what a blocking call inside an async handler looks
+# like (e.g. a sync Mongo query).
+#
+# Nothing runs until enabled: the middleware is a single check per request.
+# State is per worker; the admin routes report the pid of the worker that
+# answered, so repeat the call to reach the worker you profiled.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILE_MAX_STORED = int(os.environ.get("PROFILE_MAX_STORED", "50"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+LOOP_MONITOR_INTERVAL_MS = float(os.environ.get("LOOP_MONITOR_INTERVAL_MS", "50"))
+LOOP_STALLS_KEPT = 100
+
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "Admin routes are disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(401, "Invalid admin token")
+
+
+admin_only = Depends(require_admin)
+
+
+def _folded(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# ─── Request profiling ───
+class StackSampler(threading.Thread):
+    """Samples every thread's stack (but its own) until stopped; folded counts."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self.halt = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.halt.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self.counts[_folded(frame)] += 1
+
+    def stop(self) -> bytes:
+        self.halt.set()
+        self.join()
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common()).encode()
+
+
+class Profiler:
+    def __init__(self):
+        self.config = None
+        self.busy = False  # one cProfile at a time: profilers on a thread replace each other
+        self.profiles = deque(maxlen=PROFILE_MAX_STORED)
+
+    def start(self, pattern: str, mode: str, sample_rate: float, duration_seconds: float, max_profiles: int):
+        self.config = {
+            "pattern": re.compile(pattern), "mode": mode, "sample_rate": sample_rate,
+            "until": time.time() + duration_seconds, "remaining": max_profiles,
+        }
+
+    def stop(self):
+        self.config = None
+
+    def _take(self, path: str):
+        config = self.config
+        if config is None:
+            return None
+        if time.time() > config["until"] or config["remaining"] <= 0:
+            self.config = None
+            return None
+        if not config["pattern"].search(path) or random.random() >= config["sample_rate"]:
+            return None
+        if config["mode"] == "cprofile":
+            if self.busy:
+                return None
+            self.busy = True
+        config["remaining"] -= 1
+        return config["mode"]
+
+    async def run(self, app, scope, receive, send):
+        mode = self._take(scope["path"])
+        if mode is None:
+            return await app(scope, receive, send)
+        status = {}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await app(scope, receive, send_status)
+            finally:
+                profile.disable()
+                self.busy = False
+                profile.create_stats()
+                data, ext = marshal.dumps(profile.stats), "prof"
+        else:
+            sampler = StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                await app(scope, receive, send_status)
+            finally:
+                data, ext = sampler.stop(), "folded"
+        self.profiles.append({
+            "id": uuid.uuid4().hex[:12], "mode": mode, "format": ext,
+            "method": scope["method"], "path": scope["path"], "status": status.get("code"),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "at": time.time(), "data": data,
+        })
+
+    def listing(self) -> list:
+        return [{k: v for k, v in p.items() if k != "data"} for p in self.profiles]
+
+    def get(self, profile_id: str):
+        return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+    def status(self) -> dict:
+        c = self.config
+        if c is None:
+            return {"enabled": False}
+        return {"enabled": True, "pattern": c["pattern"].pattern, "mode": c["mode"], "sample_rate": c["sample_rate"],
+                "remaining": c["remaining"], "seconds_left": max(0, round(c["until"] - time.time()))}
+
+
+profiler = process_local(Profiler)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        prof = profiler()
+        if prof.config is None or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        await prof.run(self.app, scope, receive, send)
+
+
+# ─── Event-loop lag ───
+class LoopMonitor:
+    def __init__(self):
+        self.task = None
+        self.watchdog = None
+        self.threshold = 0.0
+        self.beat = 0.0
+        self.lags = deque(maxlen=1000)
+        self.stalls = deque(maxlen=LOOP_STALLS_KEPT)
+        self.loop_thread = None
+
+    async def _heartbeat(self):
+        interval = LOOP_MONITOR_INTERVAL_MS / 1000
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self.beat = now
+            self.lags.append(max(0.0, now - expected))
+
+    def _watch(self, halt: threading.Event):
+        captured_for = None  # one stack per stall
+        while not halt.wait(self.threshold / 4):
+            late = time.monotonic() - self.beat - LOOP_MONITOR_INTERVAL_MS / 1000
+            if late < self.threshold:
+                captured_for = None
+                continue
+            if captured_for == self.beat:
+                self.stalls[-1]["blocked_ms"] = round(late * 1000, 1)  # still blocked
+                continue
+            captured_for = self.beat
+            frame = sys._current_frames().get(self.loop_thread)
+            self.stalls.append({
+                "at": time.time(), "blocked_ms": round(late * 1000, 1),
+                "stack": "".join(traceback.format_stack(frame)) if frame else "",
+            })
+
+    def start(self, threshold_ms: float):
+        self.stop()
+        self.threshold = threshold_ms / 1000
+        self.beat = time.monotonic()
+        self.loop_thread = threading.get_ident()
+        self.task = asyncio.get_running_loop().create_task(self._heartbeat())
+        halt = threading.Event()
+        self.watchdog = (threading.Thread(target=self._watch, args=(halt,), daemon=True), halt)
+        self.watchdog[0].start()
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.watchdog:
+            self.watchdog[1].set()
+            self.watchdog = None
+
+    def stats(self) -> dict:
+        lags = sorted(self.lags)
+        pct = lambda q: round(lags[min(len(lags) - 1, int(len(lags) * q))] * 1000, 1) if lags else None
+        return {
+            "enabled": self.task is not None, "threshold_ms": round(self.threshold * 1000, 1),
+            "lag_ms": {"p50": pct(0.5), "p99": pct(0.99), "max": pct(1.0)},
+            "stalls": list(self.stalls),
+        }
+
+
+loop_monitor = process_local(LoopMonitor)
+
+
+def dump_stalls() -> bytes:
+    out = io.StringIO()
+    for s in loop_monitor().stalls:
+        out.write(f"# {time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(s['at']))}Z blocked {s['blocked_ms']}ms\n{s['stack']}\n")
+    return out.getvalue().encode()
@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+from db import LazyCollection, get_db
+import tenancy
+
+# Materialized org-health rollups. Team documents are recomputed from that
+# team's members only; case, goal and survey counters are adjusted with $inc
+# from the before/after state of each mutation, so nothing here rescans the
+# source collections on the read path.
+rollups_col = LazyCollection("org_rollups")
+users_col = LazyCollection("users")
+critical_cases_col = LazyCollection("critical_cases")
+coaching_goals_col = LazyCollection("coaching_goals")
+surveys_col = LazyCollection("surveys")
+
+SCORE_KEYS = ("overall", "project_delivery", "goal_completion", "communication")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def ensure_indexes():
+    if "key_1" in rollups_col.index_information():
+        rollups_col.drop_index("key_1")  # unique per org now, not globally
+    rollups_col.create_index([("org_id", 1), ("key", 1)], unique=True)
+
+
+# ─── Teams & Org ───
+def refresh_team(team: str):
+    members = list(users_col.find({"team": team}, {"_id": 0, "role": 1, "scores": 1, "trends": 1}))
+    if not members:
+        rollups_col.delete_one({"key": f"team:{team}"})
+        _refresh_org()
+        return
+    score_sums = {k: 0 for k in SCORE_KEYS}
+    scored = 0
+    trends = {}
+    for m in members:
+        if m.get("scores"):
+            scored += 1
+            for k in SCORE_KEYS:
+                score_sums[k] += m["scores"].get(k, 0)
+        for metric, direction in (m.get("trends") or {}).items():
+            trends.setdefault(metric, {}).setdefault(direction, 0)
+            trends[metric][direction] += 1
+    rollups_col.update_one({"key": f"team:{team}"}, {"$set": {
+        "team": team,
+        "headcount": len(members),
+        "employees": sum(1 for m in members if m.get("role") == "employee"),
+        "scored": scored,
+        "score_sums": score_sums,
+        "avg_scores": {k: round(v / scored, 1) if scored else None for k, v in score_sums.items()},
+        "trends": trends,
+        "updated_at": _now(),
+    }}, upsert=True)
+    _refresh_org()
+
+
+def _refresh_org():
+    teams = list(rollups_col.find({"key": {"$regex": "^team:"}}, {"_id": 0}))
+    scored = sum(t["scored"] for t in teams)
+    score_sums = {k: sum(t["score_sums"][k] for t in teams) for k in SCORE_KEYS}
+    trends = {}
+    for t in teams:
+        for metric, dist in t["trends"].items():
+            for direction, n in dist.items():
+                trends.setdefault(metric, {}).setdefault(direction, 0)
+                trends[metric][direction] += n
+    rollups_col.update_one({"key": "org"}, {"$set": {
+        "headcount": sum(t["headcount"] for t in teams),
+        "total_employees": sum(t["employees"] for t in teams),
+        "avg_scores": {k: round(v / scored, 1) if scored else None for k, v in score_sums.items()},
+        "trends": trends,
+        "updated_at": _now(),
+    }}, upsert=True)
+
+
+# ─── Incremental counters ───
+def _inc(key: str, inc: dict):
+    inc = {k: v for k, v in inc.items() if v}
+    if inc:
+        rollups_col.update_one({"key": key}, {"$inc": inc, "$set": {"updated_at": _now()}}, upsert=True)
+
+
+def _add(inc: dict, field: str, n: int):
+    inc[field] = inc.get(field, 0) + n
+
+
+def on_case_change(before, after):
+    inc = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc and doc.get("status") != "resolved":
+            _add(inc, f"open_by_level.{doc.get('current_level', 1)}", sign)
+            _add(inc, "open_total", sign)
+    _inc("cases", inc)
+
+
+def on_goal_change(before, after):
+    inc = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if not doc:
+            continue
+        _add(inc, "total", sign)
+        _add(inc, f"by_status.{doc.get('status')}", sign)
+        if doc.get("progress", 0) >= 100:
+            _add(inc, "completed", sign)
+        if doc.get("status") == "active":
+            _add(inc, "active_progress_sum", sign * doc.get("progress", 0))
+    _inc("goals", inc)
+
+
+def on_survey_change(before, after):
+    inc = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc:
+            _add(inc, f"by_status.{doc.get('status')}", sign)
+    _inc("surveys", inc)
+
+
+# ─── Rebuild & Read ───
+def rebuild():
+    rollups_col.delete_many({})
+    for team in users_col.distinct("team"):
+        refresh_team(team)
+    for case in critical_cases_col.find({}, {"_id": 0, "status": 1, "current_level": 1}):
+        on_case_change(None, case)
+    for goal in coaching_goals_col.find({}, {"_id": 0, "status": 1, "progress": 1}):
+        on_goal_change(None, goal)
+    for survey in surveys_col.find({}, {"_id": 0, "status": 1}):
+        on_survey_change(None, survey)
+
+
+def ensure_built():
+    # First worker to claim the marker builds; the rest serve what it wrote.
+    claim = get_db()["meta"].update_one({"_id": tenancy.marker("rollups")}, {"$setOnInsert": {"built_at": _now()}}, upsert=True)
+    if claim.upserted_id is not None:
+        rebuild()
+
+
+def get_rollups() -> dict:
+    docs = {d["key"]: d for d in rollups_col.find({}, {"_id": 0})}
+    goals = docs.get("goals", {})
+    by_status = goals.get("by_status", {})
+    total = goals.get("total", 0)
+    active = by_status.get("active", 0)
+    return {
+        "org": docs.get("org", {}),
+        "teams": sorted((d for k, d in docs.items() if k.startswith("team:")), key=lambda d: d["team"]),
+        "cases": {"open_total": docs.get("cases", {}).get("open_total", 0), "open_by_level": docs.get("cases", {}).get("open_by_level", {})},
+        "goals": {
+            "total": total,
+            "by_status": by_status,
+            "active": active,
+            "completion_rate": round(goals.get("completed", 0) / total, 3) if total else 0,
+            "avg_active_progress": round(goals.get("active_progress_sum", 0) / active, 1) if active else 0,
+        },
+        "surveys": docs.get("surveys", {}).get("by_status", {}),
+    }
@@ -0,0 +1,41 @@
+import os
+import threading
+
+# Per-process runtime state. Everything that holds sockets, pools or caches is
+# built lazily through process_local() so a pre-forked worker never inherits
+# (and shares) the parent's handles: the first access after fork rebuilds it.
+
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def worker_count() -> int:
+    return max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+
+def share_of(budget_env: str, default: int) -> int:
+    """Per-worker slice of a global budget, e.g. total Mongo connections."""
+    return max(1, int(os.environ.get(budget_env, default)) // worker_count())
+
+
+def process_local(factory):
+    state = {"pid": None, "value": None}
+
+    def get():
+        pid = os.getpid()
+        if state["pid"] != pid:
+            with _lock:
+                if state["pid"] != pid:
+                    state["value"] = factory()
+                    state["pid"] = pid
+        return state["value"]
+
+    return get
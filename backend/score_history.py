@@ -0,0 +1,130 @@
+import os
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from db import LazyCollection
+from rollups import SCORE_KEYS
+
+# Per-user score time series in array-backed buckets. Every score update
+# (PUT /api/users/{id}/scores) and every 1-on-1 analysis appends a point
+# {ts, source, scores}: effectiveness_score to the employee's series,
+# leadership_score (it rates the supervisor) to the supervisor's. A bucket holds up
+# to SCORE_HISTORY_BUCKET_SIZE points and carries its first/last timestamp, so
+# a window only reads the buckets that overlap it. Trends, moving averages
+# and slopes are computed over the window in one numpy pass per metric.
+SCORE_HISTORY_BUCKET_SIZE = int(os.environ.get("SCORE_HISTORY_BUCKET_SIZE", "100"))
+SCORE_TREND_DAYS = int(os.environ.get("SCORE_TREND_DAYS", "90"))
+SCORE_TREND_THRESHOLD = float(os.environ.get("SCORE_TREND_THRESHOLD", "1.0"))  # score points per 30 days
+ANALYSIS_KEYS = ("leadership_score", "effectiveness_score")
+
+score_history_col = LazyCollection("score_history")
+
+
+def ensure_indexes():
+    score_history_col.create_index([("org_id", 1), ("user_id", 1), ("end", -1)])
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def record(user_id: str, scores: dict, source: str, ts: str = None, ref: str = None):
+    """Append one observation; non-numeric values are dropped."""
+    values = {k: float(v) for k, v in scores.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    if not values:
+        return
+    ts = ts or _now()
+    point = {"ts": ts, "source": source, "scores": values}
+    if ref:
+        point["ref"] = ref
+    score_history_col.update_one(
+        {"user_id": user_id, "count": {"$lt": SCORE_HISTORY_BUCKET_SIZE}},
+        {"$push": {"points": point}, "$inc": {"count": 1}, "$min": {"start": ts}, "$max": {"end": ts}},
+        upsert=True,
+    )
+
+
+def points(user_id: str, since: str = None) -> list:
+    """Observations at or after since, oldest first."""
+    query = {"user_id": user_id}
+    if since:
+        query["end"] = {"$gte": since}
+    out = []
+    for bucket in score_history_col.find(query, {"_id": 0, "points": 1}).sort("start", 1):
+        out.extend(p for p in bucket.get("points", []) if not since or p["ts"] >= since)
+    out.sort(key=lambda p: p["ts"])
+    return out
+
+
+def ensure_baseline(user: dict):
+    """Record the pre-history snapshot of every score dimension that has no points yet.
+
+    Checked per dimension: analysis points may already have opened the series."""
+    scores = user.get("scores") or {}
+    missing = {k: v for k, v in scores.items() if k in SCORE_KEYS
+               and not score_history_col.find_one({"user_id": user["user_id"], f"points.scores.{k}": {"$exists": True}}, {"_id": 1})}
+    if missing:
+        record(user["user_id"], missing, "baseline")
+
+
+def record_analysis(analysis: dict, employee_id: str, supervisor_id: str = None, ref: str = None):
+    """A 1-on-1's scores: effectiveness to the employee, leadership to the supervisor (when known)."""
+    record(employee_id, {"effectiveness_score": analysis.get("effectiveness_score")}, "one_on_one", ref=ref)
+    if supervisor_id:
+        record(supervisor_id, {"leadership_score": analysis.get("leadership_score")}, "one_on_one", ref=ref)
+
+
+# ─── Windowed aggregation ───
+def _direction(per_30d, change: float) -> str:
+    """Slope when the series spans a day or more, else the raw change."""
+    delta = change if per_30d is None else per_30d
+    if abs(delta) < SCORE_TREND_THRESHOLD:
+        return "stable"
+    return "up" if delta > 0 else "down"
+
+
+def _series(obs: list, metric: str, window_days: int) -> dict:
+    rows = [(p["ts"], p["scores"][metric]) for p in obs if metric in p["scores"]]
+    if not rows:
+        return None
+    t = np.array([datetime.fromisoformat(ts).timestamp() / 86400 for ts, _ in rows])
+    v = np.array([val for _, val in rows])
+    # Trailing moving average over window_days, evaluated at each observation
+    lo = np.searchsorted(t, t - window_days, "right")
+    csum = np.concatenate(([0.0], np.cumsum(v)))
+    idx = np.arange(len(v))
+    moving = (csum[idx + 1] - csum[lo]) / (idx + 1 - lo)
+    per_30d = None
+    if len(v) >= 2 and np.ptp(t) >= 1:  # a slope over less than a day is noise
+        per_30d = float(np.polyfit(t - t[0], v, 1)[0] * 30)
+    return {
+        "points": len(v),
+        "first": float(v[0]),
+        "latest": float(v[-1]),
+        "change": round(float(v[-1] - v[0]), 2),
+        "mean": round(float(v.mean()), 2),
+        "min": float(v.min()),
+        "max": float(v.max()),
+        "per_30d": None if per_30d is None else round(per_30d, 2),
+        "direction": _direction(per_30d, float(v[-1] - v[0])),
+        "moving_average": [{"ts": ts, "value": round(float(m), 2)} for (ts, _), m in zip(rows, moving)],
+    }
+
+
+def trends(user_id: str, days: int = SCORE_TREND_DAYS, window_days: int = 7, metrics=None) -> dict:
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    obs = points(user_id, since)
+    metrics = metrics or [*SCORE_KEYS, *ANALYSIS_KEYS]
+    series = {m: s for m in metrics if (s := _series(obs, m, window_days))}
+    return {"user_id": user_id, "days": days, "window_days": window_days, "metrics": series}
+
+
+def directions(user_id: str) -> dict:
+    """users.trends: up/down/stable per score dimension over SCORE_TREND_DAYS."""
+    t = trends(user_id, metrics=SCORE_KEYS)["metrics"]
+    return {k: t[k]["direction"] for k in SCORE_KEYS if k in t}
+
+
+def prompt_summary(user_id: str) -> dict:
+    """Compact trend facts for prompts (no per-point series)."""
+    t = trends(user_id)["metrics"]
+    return {m: {k: s[k] for k in ("points", "first", "latest", "change", "per_30d", "direction")} for m, s in t.items()}
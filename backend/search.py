@@ -0,0 +1,139 @@
+import re
+from db import LazyCollection, replace_index
+from history import case_timeline
+
+# Full-text search over 1-on-1 sessions and critical cases, backed by one Mongo
+# text index per collection. Results from both collections are merged by text
+# score, filtered by what the caller's role may see, and returned with
+# highlighted snippets taken only from fields that role is allowed to read.
+# Case timelines live in history buckets with their own text index; matching
+# buckets are folded back into their case.
+MAX_WINDOW = 500
+SNIPPET_RADIUS = 80
+
+sessions_col = LazyCollection("one_on_one_sessions")
+critical_cases_col = LazyCollection("critical_cases")
+
+SESSION_FIELDS = {
+    "transcript": 3, "detailed_notes": 3, "expressed_aspirations": 1,
+    "analysis.supervisor_summary": 2, "analysis.employee_summary": 2,
+}
+CASE_FIELDS = {
+    "insight.summary": 3, "insight.reason_for_criticality": 2, "latest_timeline_entry.response": 2,
+}
+
+# Fields whose content each role may see in results and snippets
+VISIBLE = {
+    "employee": {
+        "sessions": ["transcript", "expressed_aspirations", "analysis.employee_summary"],
+        "cases": ["insight.summary", "latest_timeline_entry.response", "timeline.response"],
+    },
+}
+CASE_LEVELS = {"am": 3, "manager": 4}
+
+_WORD = re.compile(r"\w+")
+
+
+def ensure_indexes():
+    # Prefixed by org_id: every $text query carries the org equality (db.LazyCollection)
+    replace_index(sessions_col, [("org_id", 1)] + [(f, "text") for f in SESSION_FIELDS], "session_text", weights=SESSION_FIELDS)
+    replace_index(critical_cases_col, [("org_id", 1)] + [(f, "text") for f in CASE_FIELDS], "case_text", weights=CASE_FIELDS)
+
+
+def _scope(role: str, user_id: str, kind: str) -> dict:
+    if role == "employee":
+        return {"employee_id": user_id}
+    if kind == "cases" and role in CASE_LEVELS:
+        return {"current_level": {"$gte": CASE_LEVELS[role]}}
+    return {}
+
+
+def _values(doc, path: str) -> list:
+    values = [doc]
+    for part in path.split("."):
+        nxt = []
+        for v in values:
+            v = v.get(part) if isinstance(v, dict) else None
+            if isinstance(v, list):
+                nxt.extend(v)
+            elif v is not None:
+                nxt.append(v)
+        values = nxt
+    return [v for v in values if isinstance(v, str) and v]
+
+
+def highlight(doc: dict, fields: list, terms: list) -> list:
+    if not terms:
+        return []
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    snippets = []
+    for field in fields:
+        for text in _values(doc, field):
+            m = pattern.search(text)
+            if not m:
+                continue
+            start, end = max(0, m.start() - SNIPPET_RADIUS), min(len(text), m.end() + SNIPPET_RADIUS)
+            window = pattern.sub(lambda x: f"<mark>{x.group(0)}</mark>", text[start:end])
+            snippets.append({"field": field, "snippet": ("…" if start else "") + window + ("…" if end < len(text) else "")})
+            break
+    return snippets
+
+
+def _query(col, kind: str, q: str, scope: dict, window: int) -> list:
+    cursor = col.find({"$text": {"$search": q}, **scope}, {"_id": 0, "score": {"$meta": "textScore"}})
+    return [(kind, doc) for doc in cursor.sort([("score", {"$meta": "textScore"})]).limit(window)]
+
+
+def _query_timelines(q: str, scope: dict, window: int, cases: list) -> list:
+    """Fold timeline bucket matches into case hits (entries attached as "timeline")."""
+    buckets = case_timeline.col.find({"$text": {"$search": q}}, {"_id": 0, "parent_id": 1, "entries": 1, "score": {"$meta": "textScore"}})
+    matched = {}
+    for b in buckets.sort([("score", {"$meta": "textScore"})]).limit(window):
+        m = matched.setdefault(b["parent_id"], {"score": 0, "entries": []})
+        m["score"] = max(m["score"], b["score"])
+        m["entries"].extend(b.get("entries", []))
+    if not matched:
+        return cases
+    by_id = {doc["case_id"]: doc for _, doc in cases}
+    missing = [cid for cid in matched if cid not in by_id]
+    if missing:
+        for doc in critical_cases_col.find({"case_id": {"$in": missing}, **scope}, {"_id": 0}):
+            doc["score"] = 0
+            by_id[doc["case_id"]] = doc
+            cases.append(("cases", doc))
+    for cid, m in matched.items():
+        doc = by_id.get(cid)
+        if doc:
+            doc["timeline"] = m["entries"]
+            doc["score"] = max(doc.get("score", 0), m["score"])
+    return cases
+
+
+def search(q: str, role: str, user_id: str = "", types: list = None, page: int = 1, page_size: int = 20) -> dict:
+    types = types or ["sessions", "cases"]
+    page, page_size = max(1, page), max(1, min(page_size, 100))
+    window = min(page * page_size + 1, MAX_WINDOW)
+    terms = [t.lower() for t in _WORD.findall(q) if len(t) > 1]
+    visible = VISIBLE.get(role, {"sessions": list(SESSION_FIELDS), "cases": list(CASE_FIELDS) + ["timeline.response"]})
+
+    hits = []
+    if "sessions" in types:
+        hits += _query(sessions_col, "sessions", q, _scope(role, user_id, "sessions"), window)
+    if "cases" in types:
+        scope = _scope(role, user_id, "cases")
+        hits += _query_timelines(q, scope, window, _query(critical_cases_col, "cases", q, scope, window))
+
+    results = []
+    for kind, doc in hits:
+        snippets = highlight(doc, visible[kind], terms)
+        if not snippets:
+            continue  # matched only on fields this role can't see
+        result = {"type": kind, "score": round(doc.pop("score", 0), 4), "highlights": snippets}
+        if kind == "sessions":
+            result.update({k: doc.get(k) for k in ("session_id", "employee_id", "employee_name", "supervisor_name", "date", "status")})
+        else:
+            result.update({k: doc.get(k) for k in ("case_id", "session_id", "status", "current_level", "created_at")})
+        results.append(result)
+    results.sort(key=lambda r: r["score"], reverse=True)
+    start = (page - 1) * page_size
+    return {"query": q, "page": page, "page_size": page_size, "has_more": len(results) > start + page_size, "results": results[start:start + page_size]}
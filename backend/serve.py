@@ -0,0 +1,17 @@
+import os
+import uvicorn
+from dotenv import load_dotenv
+from runtime import worker_count
+
+load_dotenv()
+
+# Multi-worker entrypoint: WEB_CONCURRENCY processes each build their own Mongo
+# and LLM pools on first use, sized from MONGO_CONNECTION_BUDGET and
+# LLM_CONCURRENCY_BUDGET divided across workers.
+if __name__ == "__main__":
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8001")),
+        workers=worker_count(),
+    )
@@ -1,50 +1,99 @@
 import os
+import re
 import json
 import uuid
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional
-from pymongo import MongoClient
+from typing import Dict, Optional
+from pymongo import ReturnDocument
+from db import LazyCollection, get_db, backfill_org_ids
+import tenancy
+from access import ReadYourWritesMiddleware, read_policy
+from http_cache import CompressionMiddleware, etag
+import insights
+import rollups
+import analytics
+import similarity
+import search
+import model_routing
+import degradation
+import idempotency
+import profiling
+from admission import admission, controller as admission_controller
+from llm_scheduler import scheduler as llm_scheduler
+from singleflight import keyed_lock
+from nets_store import store as nets_store
+import survey_ingest
+import exports
+import history
+import score_history
+import archival
 
 load_dotenv()
 
 app = FastAPI(title="AccountabilityOS API")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
-
-client = MongoClient(os.environ.get("MONGO_URL"))
-db = client[os.environ.get("DB_NAME")]
-
-# Collections
-users_col = db["users"]
-sessions_col = db["one_on_one_sessions"]
-critical_cases_col = db["critical_cases"]
-coaching_goals_col = db["coaching_goals"]
-nets_sessions_col = db["nets_sessions"]
-surveys_col = db["surveys"]
-survey_responses_col = db["survey_responses"]
-messages_col = db["messages"]
-kpi_frameworks_col = db["kpi_frameworks"]
-nominations_col = db["nominations"]
-insights_col = db["insights"]
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(tenancy.OrgMiddleware)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["ETag", "Idempotent-Replayed"])
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Collections (resolved per worker process, see db.py)
+users_col = LazyCollection("users")
+sessions_col = LazyCollection("one_on_one_sessions")
+critical_cases_col = LazyCollection("critical_cases")
+coaching_goals_col = LazyCollection("coaching_goals")
+nets_sessions_col = LazyCollection("nets_sessions")
+surveys_col = LazyCollection("surveys")
+survey_responses_col = LazyCollection("survey_responses")
+messages_col = LazyCollection("messages")
+kpi_frameworks_col = LazyCollection("kpi_frameworks")
+nominations_col = LazyCollection("nominations")
+
+# Lookup keys, each indexed behind org_id (see tenancy.py)
+ORG_INDEXES = [
+    (users_col, "user_id"), (users_col, "team"), (sessions_col, "session_id"), (sessions_col, "employee_id"),
+    (critical_cases_col, "case_id"), (coaching_goals_col, "goal_id"), (coaching_goals_col, "user_id"),
+    (nets_sessions_col, "session_id"), (surveys_col, "survey_id"), (messages_col, "message_id"),
+    (kpi_frameworks_col, "framework_id"), (nominations_col, "nomination_id"),
+]
 
 # ─── AI Service ───
 from ai_service import (
     analyze_one_on_one, generate_briefing_packet, nets_simulate,
     nets_nudge, nets_scorecard, coaching_feedback, generate_survey_questions,
     analyze_survey, generate_scenario_suggestion, performance_chat,
-    generate_leadership_pulse, summarize_leadership_pulse
+    generate_leadership_pulse, summarize_leadership_pulse,
+    nets_annotate_window, nets_scorecard_chunked, SCORECARD_WINDOW,
+    analyze_one_on_one_stream, nets_scorecard_stream, nets_scorecard_chunked_stream, analyze_survey_stream
 )
 
+# single: one scorecard prompt; chunked: parallel windows at end;
+# incremental: windows annotated in the background as the session runs
+NETS_SCORECARD_MODE = os.environ.get("NETS_SCORECARD_MODE", "single")
+_background_tasks = set()
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 # ─── Pydantic Models ───
 class RoleUpdate(BaseModel):
     role: str
 
+class ScoreUpdateInput(BaseModel):
+    scores: Dict[str, float]
+
 class FeedbackSubmission(BaseModel):
     session_id: Optional[str] = None
+    supervisor_id: Optional[str] = None
+    supervisor_name: Optional[str] = None
     employee_id: str
     employee_name: str
     meeting_location: str = "office"
@@ -70,6 +119,22 @@ class NetsChatInput(BaseModel):
 class NetsNudgeInput(BaseModel):
     session_id: str
 
+class ProfilingInput(BaseModel):
+    pattern: str
+    mode: str = "sampler"
+    sample_rate: float = 0.1
+    duration_seconds: float = 300
+    max_profiles: int = 20
+
+class LoopMonitorInput(BaseModel):
+    threshold_ms: float = 100
+
+class ArchiveRunInput(BaseModel):
+    collections: Optional[list] = None
+    older_than_days: Optional[float] = Field(None, ge=0)
+    limit: Optional[int] = Field(None, ge=1)
+    dry_run: bool = False
+
 class CoachingGoalInput(BaseModel):
     title: str
     description: str
@@ -77,6 +142,7 @@ class CoachingGoalInput(BaseModel):
     start_date: str = ""
     target_end_date: str = ""
     resource: Optional[dict] = None
+    user_id: str = "tl-001"
 
 class GoalUpdateInput(BaseModel):
     progress: int
@@ -91,6 +157,9 @@ class SurveyResponseInput(BaseModel):
     survey_id: str
     responses: list = []
 
+class SurveyBulkResponseInput(BaseModel):
+    submissions: list = []
+
 class MessageActionInput(BaseModel):
     action: str
     response_text: str = ""
@@ -142,6 +211,10 @@ class AssignCoachingInput(BaseModel):
 def seed_database():
     if users_col.count_documents({}) > 0:
         return
+    # Workers start concurrently; only the one that claims the marker seeds.
+    claim = get_db()["meta"].update_one({"_id": tenancy.marker("seed")}, {"$setOnInsert": {"seeded_at": datetime.now(timezone.utc).isoformat()}}, upsert=True)
+    if claim.upserted_id is None:
+        return
     employees = [
         {"user_id": "emp-001", "name": "Alex Rivera", "role": "employee", "team": "Engineering", "scores": {"overall": 78, "project_delivery": 82, "goal_completion": 74, "communication": 80}, "trends": {"overall": "up", "project_delivery": "up", "goal_completion": "stable", "communication": "up"}},
         {"user_id": "emp-002", "name": "Jordan Kim", "role": "employee", "team": "Engineering", "scores": {"overall": 85, "project_delivery": 88, "goal_completion": 82, "communication": 85}, "trends": {"overall": "up", "project_delivery": "up", "goal_completion": "up", "communication": "stable"}},
@@ -164,47 +237,190 @@ def seed_database():
 
     # Seed coaching goals
     sample_goals = [
-        {"goal_id": str(uuid.uuid4()), "user_id": "tl-001", "title": "Improve Active Listening", "description": "Practice reflective listening in 1-on-1 meetings", "source": "ai", "status": "active", "progress": 35, "start_date": "2026-01-01", "target_end_date": "2026-03-01", "check_ins": [], "resource": {"type": "book", "title": "Just Listen", "author": "Mark Goulston"}, "created_at": datetime.now(timezone.utc).isoformat()},
-        {"goal_id": str(uuid.uuid4()), "user_id": "emp-001", "title": "Public Speaking Confidence", "description": "Present in at least 2 team meetings per month", "source": "custom", "status": "active", "progress": 50, "start_date": "2025-12-15", "target_end_date": "2026-02-28", "check_ins": [], "resource": None, "created_at": datetime.now(timezone.utc).isoformat()},
+        {"goal_id": str(uuid.uuid4()), "user_id": "tl-001", "title": "Improve Active Listening", "description": "Practice reflective listening in 1-on-1 meetings", "source": "ai", "status": "active", "progress": 35, "start_date": "2026-01-01", "target_end_date": "2026-03-01", "check_in_count": 0, "latest_check_in": None, "resource": {"type": "book", "title": "Just Listen", "author": "Mark Goulston"}, "created_at": datetime.now(timezone.utc).isoformat()},
+        {"goal_id": str(uuid.uuid4()), "user_id": "emp-001", "title": "Public Speaking Confidence", "description": "Present in at least 2 team meetings per month", "source": "custom", "status": "active", "progress": 50, "start_date": "2025-12-15", "target_end_date": "2026-02-28", "check_in_count": 0, "latest_check_in": None, "resource": None, "created_at": datetime.now(timezone.utc).isoformat()},
     ]
     coaching_goals_col.insert_many(sample_goals)
 
     # Seed some insights
-    sample_insights = [
-        {"user_id": "emp-001", "insight": "Your communication scores improved 12% this quarter - keep leveraging structured agendas.", "created_at": datetime.now(timezone.utc).isoformat()},
-        {"user_id": "emp-001", "insight": "Your supervisor noted strong problem-solving in the last sprint review.", "created_at": datetime.now(timezone.utc).isoformat()},
-        {"user_id": "emp-001", "insight": "Consider asking for more cross-functional project opportunities to boost visibility.", "created_at": datetime.now(timezone.utc).isoformat()},
-        {"user_id": "emp-002", "insight": "Consistent high performance in project delivery - you're in the top 15% of your team.", "created_at": datetime.now(timezone.utc).isoformat()},
-    ]
-    insights_col.insert_many(sample_insights)
-
-seed_database()
+    insights.add_insights("emp-001", [
+        "Your communication scores improved 12% this quarter - keep leveraging structured agendas.",
+        "Your supervisor noted strong problem-solving in the last sprint review.",
+        "Consider asking for more cross-functional project opportunities to boost visibility.",
+    ])
+    insights.add_insights("emp-002", ["Consistent high performance in project delivery - you're in the top 15% of your team."])
+
+@app.on_event("startup")
+def on_startup():
+    backfill_org_ids()
+    for org in tenancy.placements():
+        with tenancy.using(org):
+            for col, field in ORG_INDEXES:
+                col.create_index([("org_id", 1), (field, 1)])
+            insights.ensure_indexes()
+            rollups.ensure_indexes()
+            search.ensure_indexes()
+            survey_ingest.ensure_indexes()
+            history.ensure_indexes()
+            degradation.ensure_indexes()
+            idempotency.ensure_indexes()
+            score_history.ensure_indexes()
+            archival.ensure_indexes()
+    # One-off setup runs in every database, including a newly routed tenant's
+    for org in tenancy.placements():
+        with tenancy.using(org):
+            seed_database()
+            history.migrate_embedded()
+            rollups.ensure_built()
+
+@app.on_event("startup")
+async def start_background_workers():
+    nets_store().start()
+    degradation.retry_worker().start(_retry_feedback)
+    archival.archive_worker().start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    degradation.retry_worker().stop()
+    archival.archive_worker().stop()
+    profiling.loop_monitor().stop()
+    await nets_store().stop()
+    await survey_ingest.buffer().drain()
 
 # ─── Health ───
 @app.get("/api/health")
 def health():
     return {"status": "ok", "service": "AccountabilityOS"}
 
+@app.get("/api/admin/admission", dependencies=[profiling.admin_only])
+def admission_stats():
+    return admission_controller().stats()
+
+@app.get("/api/admin/llm-scheduler", dependencies=[profiling.admin_only])
+def llm_scheduler_stats():
+    return llm_scheduler().stats()
+
+@app.get("/api/admin/llm-models", dependencies=[profiling.admin_only])
+def llm_model_stats():
+    return {"models": model_routing.metrics().stats(), "routes": model_routing.ROUTES}
+
+@app.get("/api/admin/degradation", dependencies=[profiling.admin_only])
+def degradation_stats():
+    return degradation.stats()
+
+@app.get("/api/admin/archive", dependencies=[profiling.admin_only])
+def archive_stats():
+    return archival.stats()
+
+@app.post("/api/admin/archive", dependencies=[profiling.admin_only])
+def run_archive(data: ArchiveRunInput):
+    unknown = set(data.collections or []) - set(archival.TIERS)
+    if unknown:
+        raise HTTPException(400, f"Not archivable: {', '.join(sorted(unknown))}")
+    return {"archived": archival.run(data.collections, data.older_than_days, data.limit, data.dry_run), "dry_run": data.dry_run}
+
+# ─── Profiling (ADMIN_TOKEN) ───
+@app.get("/api/admin/profiling", dependencies=[profiling.admin_only])
+def profiling_status():
+    return {
+        "pid": os.getpid(),
+        "requests": profiling.profiler().status(),
+        "profiles": profiling.profiler().listing(),
+        "loop": profiling.loop_monitor().stats(),
+    }
+
+@app.post("/api/admin/profiling/requests", dependencies=[profiling.admin_only])
+def start_request_profiling(data: ProfilingInput):
+    if data.mode not in ("cprofile", "sampler"):
+        raise HTTPException(400, "mode must be cprofile or sampler")
+    if not 0 < data.sample_rate <= 1:
+        raise HTTPException(400, "sample_rate must be in (0, 1]")
+    try:
+        profiling.profiler().start(data.pattern, data.mode, data.sample_rate, data.duration_seconds, data.max_profiles)
+    except re.error as e:
+        raise HTTPException(400, f"Invalid pattern: {e}")
+    return {"pid": os.getpid(), **profiling.profiler().status()}
+
+@app.delete("/api/admin/profiling/requests", dependencies=[profiling.admin_only])
+def stop_request_profiling():
+    profiling.profiler().stop()
+    return {"pid": os.getpid(), **profiling.profiler().status()}
+
+@app.get("/api/admin/profiling/profiles/{profile_id}", dependencies=[profiling.admin_only])
+def download_profile(profile_id: str):
+    p = profiling.profiler().get(profile_id)
+    if not p:
+        raise HTTPException(404, f"Profile not found on worker {os.getpid()}")
+    return Response(p["data"], media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{p["id"]}.{p["format"]}"'})
+
+@app.post("/api/admin/profiling/loop", dependencies=[profiling.admin_only])
+async def start_loop_monitor(data: LoopMonitorInput):
+    if data.threshold_ms < 10:
+        raise HTTPException(400, "threshold_ms must be at least 10")
+    profiling.loop_monitor().start(data.threshold_ms)
+    return {"pid": os.getpid(), **profiling.loop_monitor().stats()}
+
+@app.delete("/api/admin/profiling/loop", dependencies=[profiling.admin_only])
+def stop_loop_monitor():
+    profiling.loop_monitor().stop()
+    return {"pid": os.getpid(), "enabled": False}
+
+@app.get("/api/admin/profiling/loop/stalls", dependencies=[profiling.admin_only])
+def download_loop_stalls():
+    return PlainTextResponse(profiling.dump_stalls(), headers={"Content-Disposition": f'attachment; filename="loop-stalls-{os.getpid()}.txt"'})
+
 # ─── Users & Roles ───
-@app.get("/api/users")
+@app.get("/api/users", dependencies=[read_policy("analytical")])
 def get_users():
     return list(users_col.find({}, {"_id": 0}))
 
-@app.get("/api/users/{user_id}")
+@app.get("/api/users/{user_id}", dependencies=[etag("users")])
 def get_user(user_id: str):
     user = users_col.find_one({"user_id": user_id}, {"_id": 0})
     if not user:
         raise HTTPException(404, "User not found")
     return user
 
+@app.put("/api/users/{user_id}/scores")
+def update_user_scores(user_id: str, data: ScoreUpdateInput):
+    unknown = sorted(set(data.scores) - set(rollups.SCORE_KEYS))
+    if unknown or not data.scores:
+        raise HTTPException(400, f"Scores must be among {', '.join(rollups.SCORE_KEYS)}")
+    if any(not 0 <= v <= 100 for v in data.scores.values()):
+        raise HTTPException(400, "Scores must be between 0 and 100")
+    user = users_col.find_one({"user_id": user_id}, {"_id": 0})
+    if not user:
+        raise HTTPException(404, "User not found")
+    score_history.ensure_baseline(user)
+    score_history.record(user_id, data.scores, "update")
+    trends = {**(user.get("trends") or {}), **score_history.directions(user_id)}
+    users_col.update_one({"user_id": user_id}, {"$set": {**{f"scores.{k}": v for k, v in data.scores.items()}, "trends": trends}})
+    if user.get("team"):
+        rollups.refresh_team(user["team"])
+    analytics.invalidate()
+    return users_col.find_one({"user_id": user_id}, {"_id": 0})
+
+@app.get("/api/users/{user_id}/scores/history", dependencies=[read_policy("analytical"), etag("score_history")])
+def get_user_score_history(user_id: str, days: int = score_history.SCORE_TREND_DAYS):
+    since = (datetime.now(timezone.utc) - timedelta(days=max(1, min(days, 3650)))).isoformat()
+    return {"user_id": user_id, "days": days, "points": score_history.points(user_id, since)}
+
+@app.get("/api/users/{user_id}/scores/trends", dependencies=[read_policy("analytical"), etag("score_history")])
+def get_user_score_trends(user_id: str, days: int = score_history.SCORE_TREND_DAYS, window_days: int = 7, metrics: str = ""):
+    return score_history.trends(user_id, max(1, min(days, 3650)), max(1, window_days), [m for m in metrics.split(",") if m] or None)
+
 # ─── Dashboard Data ───
-@app.get("/api/dashboard/{role}")
-def get_dashboard(role: str):
+DASHBOARD_COLLECTIONS = ("users", "one_on_one_sessions", "insights", "critical_cases", "coaching_goals", "org_rollups", "kpi_frameworks", "nominations", "surveys")
+
+@app.get("/api/dashboard/{role}", dependencies=[read_policy("analytical"), etag(*DASHBOARD_COLLECTIONS)])
+def get_dashboard(role: str, user_id: str = ""):
     data = {"role": role}
     if role == "employee":
-        data["employees"] = list(users_col.find({"role": "employee"}, {"_id": 0}))
-        data["upcoming_meetings"] = list(sessions_col.find({"status": "upcoming"}, {"_id": 0}).limit(5))
-        data["insights"] = list(insights_col.find({}, {"_id": 0}).limit(10))
+        # Employees only see their own feed and meetings
+        data["employees"] = list(users_col.find({"user_id": user_id, "role": "employee"}, {"_id": 0}).limit(1)) if user_id else []
+        data["upcoming_meetings"] = list(sessions_col.find({"status": "upcoming", "employee_id": user_id}, {"_id": 0}).limit(5)) if user_id else []
+        data["insights"] = insights.get_feed(user_id) if user_id else []
     elif role == "team_lead":
         data["team_members"] = list(users_col.find({"role": "employee"}, {"_id": 0}))
         data["upcoming_meetings"] = list(sessions_col.find({"status": "upcoming"}, {"_id": 0}))
@@ -216,6 +432,7 @@ def get_dashboard(role: str):
         data["pending_reviews"] = list(coaching_goals_col.find({"status": "pending_am_review"}, {"_id": 0}))
     elif role == "manager":
         data["all_users"] = list(users_col.find({}, {"_id": 0}))
+        data["org_health"] = rollups.get_rollups()
         data["pending_cases"] = list(critical_cases_col.find({"current_level": {"$gte": 4}}, {"_id": 0}))
         data["frameworks"] = list(kpi_frameworks_col.find({}, {"_id": 0}))
         data["nominations"] = list(nominations_col.find({}, {"_id": 0}))
@@ -223,20 +440,51 @@ def get_dashboard(role: str):
         data["all_users"] = list(users_col.find({}, {"_id": 0}))
         data["surveys"] = list(surveys_col.find({}, {"_id": 0}))
         data["pending_cases"] = list(critical_cases_col.find({"current_level": 5}, {"_id": 0}))
-        data["org_health"] = {"total_employees": users_col.count_documents({"role": "employee"}), "active_surveys": surveys_col.count_documents({"status": "active"})}
+        org_health = rollups.get_rollups()
+        data["org_health"] = {**org_health, "total_employees": org_health["org"].get("total_employees", 0), "active_surveys": org_health["surveys"].get("active", 0)}
     return data
 
+# ─── Org Health Rollups ───
+@app.get("/api/org-health/rollups", dependencies=[read_policy("analytical")])
+def get_org_rollups():
+    return rollups.get_rollups()
+
+@app.post("/api/org-health/rollups/rebuild")
+def rebuild_org_rollups():
+    rollups.rebuild()
+    return rollups.get_rollups()
+
+# ─── Score Analytics ───
+@app.get("/api/analytics/scores", dependencies=[read_policy("analytical")])
+def get_score_analytics():
+    return analytics.summary()
+
+@app.get("/api/analytics/cohorts", dependencies=[read_policy("analytical")])
+def get_score_cohorts(by: str = "team"):
+    if by not in ("team", "role"):
+        raise HTTPException(400, "Cohorts can be grouped by team or role")
+    return analytics.cohorts(by)
+
+@app.get("/api/analytics/users/{user_id}", dependencies=[read_policy("analytical")])
+def get_user_score_facts(user_id: str):
+    facts = analytics.user_facts(user_id)
+    if not facts:
+        raise HTTPException(404, "No scores for user")
+    return facts
+
 # ─── 1-on-1 Sessions ───
-@app.get("/api/one-on-one/sessions")
-def get_sessions():
-    return list(sessions_col.find({}, {"_id": 0}))
+DEFAULT_SUPERVISOR = {"supervisor_id": "tl-001", "supervisor_name": "Taylor Chen"}
+
+@app.get("/api/one-on-one/sessions", dependencies=[read_policy("analytical"), etag("one_on_one_sessions")])
+def get_sessions(include_archived: bool = False):
+    return list(sessions_col.find(archival.live(include_archived), {"_id": 0}))
 
 @app.post("/api/one-on-one/sessions")
 def create_session(data: dict):
     session = {
         "session_id": str(uuid.uuid4()),
-        "supervisor_id": data.get("supervisor_id", "tl-001"),
-        "supervisor_name": data.get("supervisor_name", "Taylor Chen"),
+        "supervisor_id": data.get("supervisor_id", DEFAULT_SUPERVISOR["supervisor_id"]),
+        "supervisor_name": data.get("supervisor_name", DEFAULT_SUPERVISOR["supervisor_name"]),
         "employee_id": data.get("employee_id"),
         "employee_name": data.get("employee_name"),
         "date": data.get("date"),
@@ -248,16 +496,62 @@ def create_session(data: dict):
     session.pop("_id", None)
     return session
 
-@app.get("/api/one-on-one/sessions/{session_id}")
-def get_session(session_id: str):
+def _export_response(name: str, fmt: str, gzip: bool, columns: list, rows):
+    if fmt not in exports.FORMATS:
+        raise HTTPException(400, "Format must be csv or ndjson")
+    filename = f"{name}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exports.encode(fmt, columns, rows, gzip),
+        media_type="application/gzip" if gzip else exports.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/api/one-on-one/sessions/export", dependencies=[read_policy("analytical")])
+def export_session_analyses(format: str = "csv", gzip: bool = False):
+    columns, rows = exports.session_analysis_rows()
+    return _export_response("session-analyses", format, gzip, columns, rows)
+
+@app.get("/api/one-on-one/sessions/{session_id}", dependencies=[etag("one_on_one_sessions")])
+def get_session(session_id: str, include_archived: bool = False):
     s = sessions_col.find_one({"session_id": session_id}, {"_id": 0})
     if not s:
         raise HTTPException(404, "Session not found")
-    return s
+    return archival.restore("one_on_one_sessions", s) if include_archived else s
 
 # ─── Feedback & Analysis ───
-@app.post("/api/one-on-one/feedback")
-async def submit_feedback(data: FeedbackSubmission):
+def _ndjson(run):
+    """Stream the events run(emit) emits as NDJSON, then {"done": <its return value>}.
+
+    run keeps going in the background if the client disconnects, so whatever it
+    persists section by section still completes."""
+    queue = asyncio.Queue()
+
+    async def main():
+        try:
+            queue.put_nowait({"done": await run(queue.put_nowait)})
+        except HTTPException as e:
+            queue.put_nowait({"error": e.detail, "status": e.status_code})
+        except Exception as e:
+            queue.put_nowait({"error": str(e)})
+        queue.put_nowait(None)
+
+    async def body():
+        _spawn(main())
+        while (event := await queue.get()) is not None:
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@app.post("/api/one-on-one/feedback", dependencies=[admission("one_on_one_feedback")])
+async def submit_feedback(data: FeedbackSubmission, request: Request, response: Response):
+    return await idempotency.once(request, response, "one_on_one_feedback", data, lambda: _run_feedback(data))
+
+@app.post("/api/one-on-one/feedback/stream", dependencies=[admission("one_on_one_feedback")])
+async def submit_feedback_stream(data: FeedbackSubmission):
+    """Same as /feedback, streaming each analysis section as soon as the model closes it."""
+    return _ndjson(lambda emit: _run_feedback(data, emit))
+
+async def _run_feedback(data: FeedbackSubmission, emit=None, retry: bool = False):
     sid = data.session_id or str(uuid.uuid4())
     session_data = {
         "session_id": sid,
@@ -273,43 +567,75 @@ async def submit_feedback(data: FeedbackSubmission):
         "detailed_notes": data.detailed_notes,
         "transcript": data.transcript,
         "daily_recording_url": data.daily_recording_url,
+        **{k: v for k, v in (("supervisor_id", data.supervisor_id), ("supervisor_name", data.supervisor_name)) if v},
         "status": "analyzing",
         "submitted_at": datetime.now(timezone.utc).isoformat(),
     }
-    sessions_col.update_one({"session_id": sid}, {"$set": session_data}, upsert=True)
+    if retry:
+        session_data.pop("submitted_at")
+    # A session first created by this submission gets the same supervisor default as create_session
+    sessions_col.update_one({"session_id": sid}, {
+        "$set": {**session_data, "analysis": {}} if emit else session_data,
+        "$setOnInsert": {k: v for k, v in DEFAULT_SUPERVISOR.items() if k not in session_data},
+    }, upsert=True)
+    supervisor_id = (sessions_col.find_one({"session_id": sid}, {"_id": 0, "supervisor_id": 1}) or {}).get("supervisor_id")
 
     # Get employee data for context
     employee = users_col.find_one({"user_id": data.employee_id}, {"_id": 0})
     goals = list(coaching_goals_col.find({"user_id": data.employee_id}, {"_id": 0}))
 
     try:
-        analysis = await analyze_one_on_one(session_data, employee, goals)
-        sessions_col.update_one({"session_id": sid}, {"$set": {"analysis": analysis, "status": "completed"}})
+        score_facts = analytics.user_facts(data.employee_id)
+        score_trends = score_history.prompt_summary(data.employee_id)
+        why = degradation.reason()
+        if why is None:
+            try:
+                if emit is None:
+                    analysis = await analyze_one_on_one(session_data, employee, goals, score_facts, score_trends)
+                else:
+                    analysis = await _stream_into(analyze_one_on_one_stream(session_data, employee, goals, score_facts, score_trends), emit,
+                                                  lambda key, value: sessions_col.update_one({"session_id": sid}, {"$set": {f"analysis.{key}": value}}))
+            except Exception:
+                why = "upstream_error"
+        if why is not None:
+            return _defer_feedback(sid, data, why)
+        sessions_col.update_one({"session_id": sid}, {"$set": {"analysis": analysis, "status": "completed"}, "$unset": {"degraded": ""}})
+        degradation.done(sid)
+        score_history.record_analysis(analysis, data.employee_id, supervisor_id, ref=sid)
 
         # Save employee insights
         if analysis.get("employee_insights"):
-            for insight_text in analysis["employee_insights"]:
-                insights_col.insert_one({"user_id": data.employee_id, "insight": insight_text, "created_at": datetime.now(timezone.utc).isoformat()})
+            insights.add_insights(data.employee_id, similarity.novel_insights(data.employee_id, analysis["employee_insights"]))
+        similarity.note_session({**session_data, "analysis": analysis})
 
         # Create critical case if needed
         if analysis.get("critical_coaching_insight"):
+            detected = {"timestamp": datetime.now(timezone.utc).isoformat(), "actor": "system", "action": "Critical insight detected by AI"}
             case = {
                 "case_id": str(uuid.uuid4()),
                 "session_id": sid,
+                "employee_id": data.employee_id,
                 "insight": analysis["critical_coaching_insight"],
                 "status": "pending_supervisor",
                 "current_level": 1,
-                "timeline": [{"timestamp": datetime.now(timezone.utc).isoformat(), "actor": "system", "action": "Critical insight detected by AI"}],
+                "latest_timeline_entry": detected,
+                "timeline_count": 1,
                 "created_at": datetime.now(timezone.utc).isoformat(),
             }
             critical_cases_col.insert_one(case)
+            history.case_timeline.append(case["case_id"], [detected])
+            rollups.on_case_change(None, case)
 
-        # Create coaching recommendations
-        if analysis.get("coaching_recommendations"):
+        # Create coaching recommendations for the supervisor, folding near-duplicates into their open goals
+        if supervisor_id and analysis.get("coaching_recommendations"):
             for rec in analysis["coaching_recommendations"]:
+                existing = similarity.match_goal(supervisor_id, rec.get("title", ""), rec.get("description", ""))
+                if existing:
+                    similarity.merge_recommendation(existing, sid, rec)
+                    continue
                 goal = {
                     "goal_id": str(uuid.uuid4()),
-                    "user_id": "tl-001",
+                    "user_id": supervisor_id,
                     "title": rec.get("title", ""),
                     "description": rec.get("description", ""),
                     "source": "ai",
@@ -317,36 +643,76 @@ async def submit_feedback(data: FeedbackSubmission):
                     "progress": 0,
                     "start_date": "",
                     "target_end_date": "",
-                    "check_ins": [],
+                    "check_in_count": 0,
+                    "latest_check_in": None,
                     "resource": rec.get("recommended_resource"),
                     "created_at": datetime.now(timezone.utc).isoformat(),
                 }
                 coaching_goals_col.insert_one(goal)
+                rollups.on_goal_change(None, goal)
+                similarity.note_goal(goal)
 
         return {"session_id": sid, "status": "completed", "analysis": analysis}
     except Exception as e:
+        degradation.done(sid)
         sessions_col.update_one({"session_id": sid}, {"$set": {"status": "error", "error": str(e)}})
         return {"session_id": sid, "status": "error", "error": str(e)}
 
-@app.post("/api/one-on-one/briefing-packet")
+def _defer_feedback(sid: str, data: FeedbackSubmission, why: str) -> dict:
+    """Queue the analysis for the retry worker instead of failing the session."""
+    if not degradation.defer(sid, {**data.dict(), "session_id": sid}, why):
+        error = f"Analysis failed after {degradation.ANALYSIS_RETRY_MAX_ATTEMPTS} attempts"
+        sessions_col.update_one({"session_id": sid}, {"$set": {"status": "error", "error": error}, "$unset": {"degraded": ""}})
+        return {"session_id": sid, "status": "error", "error": error}
+    degraded = {"reason": why, "source": "retry_queue"}
+    sessions_col.update_one({"session_id": sid}, {"$set": {"status": "deferred", "degraded": degraded}})
+    return {"session_id": sid, "status": "deferred", "degraded": degraded}
+
+async def _retry_feedback(payload: dict):
+    await _run_feedback(FeedbackSubmission(**payload), retry=True)
+
+async def _stream_into(events, emit, persist) -> dict:
+    """Persist and emit each closed section; emit the final validation and return the result."""
+    async for event in events:
+        if "section" in event:
+            await asyncio.to_thread(persist, event["section"], event["value"])
+            emit(event)
+        else:
+            emit({"validation": event["validation"]})
+            return event["result"]
+
+@app.post("/api/one-on-one/briefing-packet", dependencies=[admission("briefing_packet")])
 async def get_briefing_packet(data: BriefingPacketInput):
-    sessions = list(sessions_col.find({"employee_id": data.employee_id}, {"_id": 0}).sort("date", -1).limit(10))
     employee = users_col.find_one({"user_id": data.employee_id}, {"_id": 0})
     goals = list(coaching_goals_col.find({"user_id": data.employee_id}, {"_id": 0}))
-    packet = await generate_briefing_packet(sessions, employee, goals)
-    return packet
+    # Latest session plus the past sessions closest to the employee's current goals
+    focus = " ".join(f"{g.get('title', '')} {g.get('description', '')}" for g in goals if g.get("status") == "active")
+    sessions = similarity.relevant_sessions(data.employee_id, focus, k=3)
+    packet, degraded = await degradation.guarded(
+        "generate_briefing_packet", lambda: generate_briefing_packet(sessions, employee, goals, analytics.user_facts(data.employee_id)),
+        key=data.employee_id)
+    return degradation.flagged(packet, degraded)
+
+# ─── Search ───
+@app.get("/api/search", dependencies=[read_policy("analytical")])
+def search_content(q: str, role: str, user_id: str = "", types: str = "sessions,cases", page: int = 1, page_size: int = 20):
+    if not q.strip():
+        raise HTTPException(400, "Query is required")
+    if role == "employee" and not user_id:
+        raise HTTPException(400, "user_id is required for employee search")
+    return search.search(q, role, user_id, [t for t in types.split(",") if t], page, page_size)
 
 # ─── Critical Cases ───
-@app.get("/api/critical-cases")
-def get_critical_cases():
-    return list(critical_cases_col.find({}, {"_id": 0}))
+@app.get("/api/critical-cases", dependencies=[read_policy("analytical")])
+def get_critical_cases(include_archived: bool = False):
+    return list(critical_cases_col.find(archival.live(include_archived), {"_id": 0}))
 
-@app.get("/api/critical-cases/{case_id}")
-def get_critical_case(case_id: str):
+@app.get("/api/critical-cases/{case_id}", dependencies=[etag("critical_cases")])
+def get_critical_case(case_id: str, include_archived: bool = False):
     c = critical_cases_col.find_one({"case_id": case_id}, {"_id": 0})
     if not c:
         raise HTTPException(404, "Case not found")
-    return c
+    return archival.restore("critical_cases", c) if include_archived else c
 
 @app.post("/api/critical-cases/{case_id}/action")
 def critical_case_action(case_id: str, data: CriticalCaseActionInput):
@@ -371,10 +737,21 @@ def critical_case_action(case_id: str, data: CriticalCaseActionInput):
     level_map = {"pending_supervisor": 1, "pending_employee": 2, "pending_am": 3, "pending_manager": 4, "pending_hr": 5}
     new_level = level_map.get(new_status, case.get("current_level", 1))
     
-    critical_cases_col.update_one({"case_id": case_id}, {"$set": {"status": new_status, "current_level": new_level}, "$push": {"timeline": timeline_entry}})
+    critical_cases_col.update_one({"case_id": case_id}, {"$set": {"status": new_status, "current_level": new_level, "latest_timeline_entry": timeline_entry}, "$inc": {"timeline_count": 1}})
+    history.case_timeline.append(case_id, [timeline_entry])
+    rollups.on_case_change(case, {"status": new_status, "current_level": new_level})
     updated = critical_cases_col.find_one({"case_id": case_id}, {"_id": 0})
     return updated
 
+@app.get("/api/critical-cases/{case_id}/timeline", dependencies=[etag("critical_cases", "critical_case_timeline")])
+def get_case_timeline(case_id: str, offset: int = 0, limit: int = 20):
+    case = critical_cases_col.find_one({"case_id": case_id}, {"_id": 0, "case_id": 1, "archived": 1, "archived_at": 1})
+    if not case:
+        raise HTTPException(404, "Case not found")
+    if case.get("archived"):
+        return archival.history_page("critical_cases", case, offset, limit)
+    return history.case_timeline.page(case_id, offset, limit)
+
 # ─── Nets Practice Arena ───
 @app.post("/api/nets/start")
 def start_nets_session(data: NetsStartInput):
@@ -383,57 +760,117 @@ def start_nets_session(data: NetsStartInput):
         "scenario": data.scenario,
         "persona": data.persona,
         "difficulty": data.difficulty,
-        "messages": [],
+        "message_count": 0,
+        "last_message": None,
         "status": "active",
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
     nets_sessions_col.insert_one(session)
     session.pop("_id", None)
+    session["messages"] = []
+    nets_store().put(session)
     return session
 
-@app.post("/api/nets/chat")
+@app.post("/api/nets/chat", dependencies=[admission("nets_chat")])
 async def nets_chat(data: NetsChatInput):
-    session = nets_sessions_col.find_one({"session_id": data.session_id})
+    session = nets_store().get(data.session_id)
     if not session:
         raise HTTPException(404, "Session not found")
     
-    session["messages"].append({"role": "user", "content": data.message, "timestamp": datetime.now(timezone.utc).isoformat()})
+    user_msg = {"role": "user", "content": data.message, "timestamp": datetime.now(timezone.utc).isoformat()}
     
-    ai_response = await nets_simulate(session["scenario"], session["persona"], session["difficulty"], session["messages"])
-    session["messages"].append({"role": "ai", "content": ai_response, "timestamp": datetime.now(timezone.utc).isoformat()})
+    ai_response, _ = await degradation.guarded(
+        "nets_simulate", lambda: nets_simulate(session["scenario"], session["persona"], session["difficulty"], session["messages"] + [user_msg]))
+    ai_msg = {"role": "ai", "content": ai_response, "timestamp": datetime.now(timezone.utc).isoformat()}
     
-    nets_sessions_col.update_one({"session_id": data.session_id}, {"$set": {"messages": session["messages"]}})
+    nets_store().append(data.session_id, [user_msg, ai_msg])
+    session = nets_store().get(data.session_id)
+    if NETS_SCORECARD_MODE == "incremental":
+        n = len(session["messages"])
+        for start in range(0, n, SCORECARD_WINDOW):
+            if n - 2 < start + SCORECARD_WINDOW <= n:
+                _spawn(_annotate_nets_window(data.session_id, list(session["messages"]), start, session["scenario"], session["persona"]))
     return {"response": ai_response, "messages": session["messages"]}
 
-@app.post("/api/nets/nudge")
+async def _annotate_nets_window(session_id: str, messages: list, start: int, scenario: str, persona: str):
+    try:
+        turns = await nets_annotate_window(messages, start, scenario, persona)
+    except Exception:
+        return  # /api/nets/end annotates any window still missing
+    nets_store().set_fields(session_id, {f"annotations.{start}": turns})
+
+@app.post("/api/nets/nudge", dependencies=[admission("nets_nudge")])
 async def get_nets_nudge(data: NetsNudgeInput):
-    session = nets_sessions_col.find_one({"session_id": data.session_id})
+    session = nets_store().get(data.session_id)
     if not session:
         raise HTTPException(404, "Session not found")
-    nudge = await nets_nudge(session["messages"], session["scenario"])
-    return nudge
-
-@app.post("/api/nets/end")
-async def end_nets_session(data: NetsNudgeInput):
-    session = nets_sessions_col.find_one({"session_id": data.session_id})
+    nudge, degraded = await degradation.guarded(
+        "nets_nudge", lambda: nets_nudge(session["messages"], session["scenario"]),
+        key=(data.session_id, len(session["messages"])),
+        fallback=lambda: degradation.nudge_template(session["messages"], session["scenario"]))
+    return degradation.flagged(nudge, degraded)
+
+@app.post("/api/nets/end", dependencies=[admission("nets_end")])
+async def end_nets_session(data: NetsNudgeInput, request: Request, response: Response):
+    return await idempotency.once(request, response, "nets_end", data, lambda: _end_nets_session(data))
+
+async def _end_nets_session(data: NetsNudgeInput):
+    session = nets_store().get(data.session_id)
     if not session:
         raise HTTPException(404, "Session not found")
-    scorecard = await nets_scorecard(session["messages"], session["scenario"], session["persona"])
-    nets_sessions_col.update_one({"session_id": data.session_id}, {"$set": {"status": "completed", "scorecard": scorecard}})
+    if NETS_SCORECARD_MODE == "single":
+        scorecard = await nets_scorecard(session["messages"], session["scenario"], session["persona"])
+    else:
+        scorecard = await nets_scorecard_chunked(session["messages"], session["scenario"], session["persona"], session.get("annotations"))
+    nets_store().set_fields(data.session_id, {"status": "completed", "scorecard": scorecard})
+    await nets_store().close_session(data.session_id)
     return scorecard
 
-@app.post("/api/nets/suggest-scenario")
+@app.post("/api/nets/end/stream", dependencies=[admission("nets_end")])
+async def end_nets_session_stream(data: NetsNudgeInput):
+    session = nets_store().get(data.session_id)
+    if not session:
+        raise HTTPException(404, "Session not found")
+    if NETS_SCORECARD_MODE == "single":
+        events = nets_scorecard_stream(session["messages"], session["scenario"], session["persona"])
+    else:
+        events = nets_scorecard_chunked_stream(session["messages"], session["scenario"], session["persona"], session.get("annotations"))
+
+    async def run(emit):
+        scorecard = await _stream_into(events, emit, lambda key, value: nets_store().set_fields(data.session_id, {f"scorecard.{key}": value}))
+        nets_store().set_fields(data.session_id, {"status": "completed", "scorecard": scorecard})
+        await nets_store().close_session(data.session_id)
+        return scorecard
+    return _ndjson(run)
+
+@app.post("/api/nets/suggest-scenario", dependencies=[admission("suggest_scenario")])
 async def suggest_scenario(data: ScenarioSuggestionInput):
     sessions = list(sessions_col.find({}, {"_id": 0}).sort("date", -1).limit(5))
-    suggestion = await generate_scenario_suggestion(data.user_role, sessions)
-    return suggestion
+    suggestion, degraded = await degradation.guarded(
+        "generate_scenario_suggestion", lambda: generate_scenario_suggestion(data.user_role, sessions), key=data.user_role)
+    return degradation.flagged(suggestion, degraded)
 
-@app.get("/api/nets/sessions")
-def get_nets_sessions():
-    return list(nets_sessions_col.find({}, {"_id": 0}).sort("created_at", -1))
+@app.get("/api/nets/sessions", dependencies=[read_policy("analytical")])
+def get_nets_sessions(include_archived: bool = False):
+    return list(nets_sessions_col.find(archival.live(include_archived), {"_id": 0}).sort("created_at", -1))
+
+@app.get("/api/nets/sessions/{session_id}/messages", dependencies=[etag("nets_sessions", "nets_session_messages")])
+def get_nets_messages(session_id: str, offset: int = 0, limit: int = 20):
+    session = nets_sessions_col.find_one({"session_id": session_id}, {"_id": 0, "session_id": 1, "archived": 1, "archived_at": 1})
+    if not session:
+        raise HTTPException(404, "Session not found")
+    if session.get("archived"):
+        return archival.history_page("nets_sessions", session, offset, limit)
+    return history.nets_messages.page(session_id, offset, limit)
 
 # ─── Coaching & Development ───
-@app.get("/api/coaching/goals")
+def _update_goal(goal_id: str, update: dict):
+    before = coaching_goals_col.find_one_and_update({"goal_id": goal_id}, update, projection={"_id": 0, "status": 1, "progress": 1}, return_document=ReturnDocument.BEFORE)
+    if before:
+        rollups.on_goal_change(before, {**before, **update.get("$set", {})})
+    return coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 0})
+
+@app.get("/api/coaching/goals", dependencies=[read_policy("analytical"), etag("coaching_goals")])
 def get_coaching_goals(user_id: str = ""):
     query = {"user_id": user_id} if user_id else {}
     return list(coaching_goals_col.find(query, {"_id": 0}))
@@ -442,7 +879,7 @@ def get_coaching_goals(user_id: str = ""):
 def create_coaching_goal(data: CoachingGoalInput):
     goal = {
         "goal_id": str(uuid.uuid4()),
-        "user_id": "tl-001",
+        "user_id": data.user_id,
         "title": data.title,
         "description": data.description,
         "source": data.source,
@@ -450,46 +887,55 @@ def create_coaching_goal(data: CoachingGoalInput):
         "progress": 0,
         "start_date": data.start_date,
         "target_end_date": data.target_end_date,
-        "check_ins": [],
+        "check_in_count": 0,
+        "latest_check_in": None,
         "resource": data.resource,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
     coaching_goals_col.insert_one(goal)
+    rollups.on_goal_change(None, goal)
     goal.pop("_id", None)
     return goal
 
 @app.put("/api/coaching/goals/{goal_id}/accept")
 def accept_goal(goal_id: str, data: dict):
-    coaching_goals_col.update_one({"goal_id": goal_id}, {"$set": {"status": "active", "start_date": data.get("start_date", ""), "target_end_date": data.get("target_end_date", "")}})
-    return coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 0})
+    return _update_goal(goal_id, {"$set": {"status": "active", "start_date": data.get("start_date", ""), "target_end_date": data.get("target_end_date", "")}})
 
 @app.put("/api/coaching/goals/{goal_id}/decline")
 def decline_goal(goal_id: str, data: CoachingDeclineInput):
-    coaching_goals_col.update_one({"goal_id": goal_id}, {"$set": {"status": "pending_am_review", "decline_reason": data.reason}})
-    return coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 0})
+    return _update_goal(goal_id, {"$set": {"status": "pending_am_review", "decline_reason": data.reason}})
 
 @app.put("/api/coaching/goals/{goal_id}/update")
 def update_goal_progress(goal_id: str, data: GoalUpdateInput):
     check_in = {"timestamp": datetime.now(timezone.utc).isoformat(), "progress": data.progress, "notes": data.notes}
-    coaching_goals_col.update_one({"goal_id": goal_id}, {"$set": {"progress": data.progress}, "$push": {"check_ins": check_in}})
-    return coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 0})
+    goal = _update_goal(goal_id, {"$set": {"progress": data.progress, "latest_check_in": check_in}, "$inc": {"check_in_count": 1}})
+    if goal:
+        history.goal_check_ins.append(goal_id, [check_in])
+    return goal
 
-@app.post("/api/coaching/feedback")
+@app.get("/api/coaching/goals/{goal_id}/check-ins", dependencies=[etag("coaching_goals", "coaching_goal_check_ins")])
+def get_goal_check_ins(goal_id: str, offset: int = 0, limit: int = 20):
+    if not coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 1}):
+        raise HTTPException(404, "Goal not found")
+    return history.goal_check_ins.page(goal_id, offset, limit)
+
+@app.post("/api/coaching/feedback", dependencies=[admission("coaching_feedback")])
 async def get_coaching_feedback(data: dict):
-    fb = await coaching_feedback(data.get("goal_description", ""), data.get("situation", ""), data.get("check_ins", []))
+    check_ins = data.get("check_ins")
+    if check_ins is None and data.get("goal_id"):
+        check_ins = list(reversed(history.goal_check_ins.page(data["goal_id"], 0, 10)["items"]))
+    fb = await coaching_feedback(data.get("goal_description", ""), data.get("situation", ""), check_ins or [])
     return fb
 
 @app.put("/api/coaching/goals/{goal_id}/am-review")
 def am_review_goal(goal_id: str, data: dict):
     action = data.get("action", "approve_decline")
     if action == "uphold_ai":
-        coaching_goals_col.update_one({"goal_id": goal_id}, {"$set": {"status": "active", "upheld_by_am": True}})
-    else:
-        coaching_goals_col.update_one({"goal_id": goal_id}, {"$set": {"status": "declined"}})
-    return coaching_goals_col.find_one({"goal_id": goal_id}, {"_id": 0})
+        return _update_goal(goal_id, {"$set": {"status": "active", "upheld_by_am": True}})
+    return _update_goal(goal_id, {"$set": {"status": "declined"}})
 
 # ─── Goals & KPI Framework ───
-@app.get("/api/kpi/frameworks")
+@app.get("/api/kpi/frameworks", dependencies=[read_policy("analytical")])
 def get_frameworks():
     return list(kpi_frameworks_col.find({}, {"_id": 0}))
 
@@ -509,7 +955,7 @@ def create_framework(data: KPIFrameworkInput):
     return fw
 
 # ─── Manager's Lab ───
-@app.get("/api/nominations")
+@app.get("/api/nominations", dependencies=[read_policy("analytical")])
 def get_nominations():
     return list(nominations_col.find({}, {"_id": 0}))
 
@@ -532,14 +978,19 @@ def create_nomination(data: NominationInput):
     return nom
 
 # ─── Org Health & Surveys ───
-@app.get("/api/surveys")
+@app.get("/api/surveys", dependencies=[read_policy("analytical"), etag("surveys")])
 def get_surveys():
     return list(surveys_col.find({}, {"_id": 0}))
 
 @app.post("/api/surveys")
-async def create_survey(data: SurveyCreateInput):
-    questions = await generate_survey_questions(data.objective)
-    survey = {
+async def create_survey(data: SurveyCreateInput, request: Request, response: Response):
+    return await idempotency.once(request, response, "create_survey", data, lambda: _create_survey(data))
+
+async def _create_survey(data: SurveyCreateInput):
+    questions, degraded = await degradation.guarded(
+        "generate_survey_questions", lambda: generate_survey_questions(data.objective),
+        key=data.objective.strip().lower(), fallback=lambda: degradation.survey_question_template(data.objective))
+    survey = degradation.flagged({
         "survey_id": str(uuid.uuid4()),
         "objective": data.objective,
         "target_audience": data.target_audience,
@@ -547,8 +998,9 @@ async def create_survey(data: SurveyCreateInput):
         "questions": questions,
         "status": "draft",
         "created_at": datetime.now(timezone.utc).isoformat(),
-    }
+    }, degraded)
     surveys_col.insert_one(survey)
+    rollups.on_survey_change(None, survey)
     survey.pop("_id", None)
     return survey
 
@@ -558,37 +1010,89 @@ def deploy_survey(survey_id: str, data: dict = {}):
     update = {"status": "active"}
     if selected:
         update["questions"] = selected
-    surveys_col.update_one({"survey_id": survey_id}, {"$set": update})
+    before = surveys_col.find_one_and_update({"survey_id": survey_id}, {"$set": update}, projection={"_id": 0, "status": 1}, return_document=ReturnDocument.BEFORE)
+    survey_ingest.forget(survey_id)
+    if before:
+        rollups.on_survey_change(before, {"status": "active"})
     return surveys_col.find_one({"survey_id": survey_id}, {"_id": 0})
 
+async def _ingest_responses(survey_id: str, submissions: list) -> list:
+    try:
+        survey_ingest.validate(survey_id, submissions)
+        return await survey_ingest.buffer().submit([survey_ingest.build_response(survey_id, r) for r in submissions])
+    except survey_ingest.InvalidResponse as e:
+        raise HTTPException(422, {"message": "Invalid survey response", "errors": e.errors})
+    except survey_ingest.BufferFull:
+        raise HTTPException(503, "Survey ingestion is busy, retry shortly", headers={"Retry-After": "1"})
+
 @app.post("/api/surveys/{survey_id}/respond")
-def respond_to_survey(survey_id: str, data: SurveyResponseInput):
-    response = {
-        "response_id": str(uuid.uuid4()),
-        "survey_id": survey_id,
-        "responses": data.responses,
-        "submitted_at": datetime.now(timezone.utc).isoformat(),
-    }
-    survey_responses_col.insert_one(response)
-    response.pop("_id", None)
-    return response
+async def respond_to_survey(survey_id: str, data: SurveyResponseInput):
+    return (await _ingest_responses(survey_id, [data.responses]))[0]
+
+@app.post("/api/surveys/{survey_id}/respond/bulk")
+async def respond_to_survey_bulk(survey_id: str, data: SurveyBulkResponseInput):
+    stored = await _ingest_responses(survey_id, data.submissions)
+    return {"accepted": len(stored), "response_ids": [r["response_id"] for r in stored]}
+
+async def _survey_result(survey_id: str, field: str, compute):
+    # One writer per survey+field: waiters in this worker reuse the result that
+    # finished while they queued; across workers the revision check keeps the
+    # first stored result instead of letting a racing duplicate overwrite it.
+    rev_field = f"revs.{field}"
+    seen = (surveys_col.find_one({"survey_id": survey_id}, {"_id": 0, "revs": 1}) or {}).get("revs", {}).get(field, 0)
+    async with keyed_lock(f"survey:{survey_id}:{field}"):
+        survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0})
+        if not survey:
+            raise HTTPException(404, "Survey not found")
+        rev = survey.get("revs", {}).get(field, 0)
+        if rev > seen and survey.get(field) is not None:
+            return survey[field]
+        result = await compute(survey)
+        written = surveys_col.update_one(
+            {"survey_id": survey_id, rev_field: rev if rev else {"$in": [0, None]}},
+            {"$set": {field: result}, "$inc": {rev_field: 1}},
+        )
+        if written.modified_count == 0:
+            return surveys_col.find_one({"survey_id": survey_id}, {"_id": 0, field: 1}).get(field, result)
+        return result
+
+@app.get("/api/surveys/{survey_id}/responses/export", dependencies=[read_policy("analytical")])
+def export_survey_responses(survey_id: str, format: str = "csv", gzip: bool = False):
+    survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0, "survey_id": 1, "questions": 1})
+    if not survey:
+        raise HTTPException(404, "Survey not found")
+    columns, rows = exports.survey_response_rows(survey)
+    return _export_response(f"survey-{survey_id}-responses", format, gzip, columns, rows)
 
 @app.post("/api/surveys/{survey_id}/analyze")
 async def analyze_survey_results(survey_id: str):
-    responses = list(survey_responses_col.find({"survey_id": survey_id}, {"_id": 0}))
-    survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0})
-    result = await analyze_survey(survey, responses)
-    surveys_col.update_one({"survey_id": survey_id}, {"$set": {"analysis": result}})
-    return result
+    async def compute(survey):
+        responses = list(survey_responses_col.find({"survey_id": survey_id}, {"_id": 0}))
+        return await analyze_survey(survey, responses)
+    return await _survey_result(survey_id, "analysis", compute)
+
+@app.post("/api/surveys/{survey_id}/analyze/stream")
+async def analyze_survey_results_stream(survey_id: str):
+    if not surveys_col.find_one({"survey_id": survey_id}, {"_id": 1}):
+        raise HTTPException(404, "Survey not found")
+
+    async def run(emit):
+        async def compute(survey):
+            # Sections land in analysis_partial; "analysis" itself is only written by _survey_result
+            surveys_col.update_one({"survey_id": survey_id}, {"$unset": {"analysis_partial": ""}})
+            responses = list(survey_responses_col.find({"survey_id": survey_id}, {"_id": 0}))
+            return await _stream_into(analyze_survey_stream(survey, responses), emit,
+                                      lambda key, value: surveys_col.update_one({"survey_id": survey_id}, {"$set": {f"analysis_partial.{key}": value}}))
+        return await _survey_result(survey_id, "analysis", compute)
+    return _ndjson(run)
 
 @app.post("/api/surveys/{survey_id}/leadership-pulse")
 async def gen_leadership_pulse(survey_id: str):
-    survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0})
-    if not survey or not survey.get("analysis"):
-        raise HTTPException(400, "Survey must be analyzed first")
-    pulse = await generate_leadership_pulse(survey["analysis"])
-    surveys_col.update_one({"survey_id": survey_id}, {"$set": {"leadership_pulse": pulse}})
-    return pulse
+    async def compute(survey):
+        if not survey.get("analysis"):
+            raise HTTPException(400, "Survey must be analyzed first")
+        return await generate_leadership_pulse(survey["analysis"])
+    return await _survey_result(survey_id, "leadership_pulse", compute)
 
 @app.post("/api/surveys/{survey_id}/send-pulse")
 def send_pulse(survey_id: str, data: PulseQuestionInput):
@@ -609,17 +1113,16 @@ def send_pulse(survey_id: str, data: PulseQuestionInput):
 
 @app.post("/api/surveys/{survey_id}/final-analysis")
 async def final_survey_analysis(survey_id: str):
-    survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0})
-    pulse_responses = list(messages_col.find({"survey_id": survey_id, "status": "responded"}, {"_id": 0}))
-    result = await summarize_leadership_pulse(survey.get("analysis", {}), pulse_responses)
-    surveys_col.update_one({"survey_id": survey_id}, {"$set": {"final_analysis": result}})
-    return result
+    async def compute(survey):
+        pulse_responses = archival.hydrate("messages", list(messages_col.find({"survey_id": survey_id, "status": "responded"}, {"_id": 0})))
+        return await summarize_leadership_pulse(survey.get("analysis", {}), pulse_responses)
+    return await _survey_result(survey_id, "final_analysis", compute)
 
 # ─── Messages ───
-@app.get("/api/messages")
-def get_messages(role: str = ""):
+@app.get("/api/messages", dependencies=[read_policy("analytical")])
+def get_messages(role: str = "", include_archived: bool = False):
     query = {"target_role": role} if role else {}
-    return list(messages_col.find(query, {"_id": 0}))
+    return list(messages_col.find({**query, **archival.live(include_archived)}, {"_id": 0}))
 
 @app.put("/api/messages/{message_id}/respond")
 def respond_to_message(message_id: str, data: MessageActionInput):
@@ -627,15 +1130,14 @@ def respond_to_message(message_id: str, data: MessageActionInput):
     return messages_col.find_one({"message_id": message_id}, {"_id": 0})
 
 # ─── Insights ───
-@app.get("/api/insights")
-def get_insights(user_id: str = ""):
-    query = {"user_id": user_id} if user_id else {}
-    return list(insights_col.find(query, {"_id": 0}).sort("created_at", -1).limit(10))
+@app.get("/api/insights", dependencies=[read_policy("analytical")])
+def get_insights(user_id: str = "", limit: int = 10):
+    return insights.get_feed(user_id, limit)
 
 # ─── Performance Chat ───
-@app.post("/api/performance-chat")
+@app.post("/api/performance-chat", dependencies=[admission("performance_chat")])
 async def perf_chat(data: PerformanceChatInput):
-    result = await performance_chat(data.message, data.context)
+    result, _ = await degradation.guarded("performance_chat", lambda: performance_chat(data.message, data.context))
     return result
 
 # ─── Coaching Assignment ───
@@ -651,10 +1153,12 @@ def assign_coaching(data: AssignCoachingInput):
         "progress": 0,
         "start_date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
         "target_end_date": "",
-        "check_ins": [],
+        "check_in_count": 0,
+        "latest_check_in": None,
         "resource": None,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
     coaching_goals_col.insert_one(goal)
+    rollups.on_goal_change(None, goal)
     goal.pop("_id", None)
     return goal
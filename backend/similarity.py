@@ -0,0 +1,185 @@
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+import numpy as np
+from db import LazyCollection
+from runtime import process_local
+import tenancy
+
+# In-process similarity over goals, insights and past sessions using hashed
+# TF-IDF vectors (unigrams + bigrams hashed into SIMILARITY_DIM buckets). Each
+# worker keeps its own small per-user indexes, loaded lazily from Mongo and
+# reloaded after SIMILARITY_REFRESH_SECONDS to pick up other workers' writes.
+SIMILARITY_DIM = int(os.environ.get("SIMILARITY_DIM", "4096"))
+SIMILARITY_REFRESH_SECONDS = float(os.environ.get("SIMILARITY_REFRESH_SECONDS", "60"))
+SIMILARITY_MAX_SCOPES = int(os.environ.get("SIMILARITY_MAX_SCOPES", "256"))
+GOAL_DEDUP_THRESHOLD = float(os.environ.get("GOAL_DEDUP_THRESHOLD", "0.55"))
+INSIGHT_DEDUP_THRESHOLD = float(os.environ.get("INSIGHT_DEDUP_THRESHOLD", "0.8"))
+SESSION_CANDIDATES = int(os.environ.get("SIMILARITY_SESSION_CANDIDATES", "50"))
+
+OPEN_GOAL_STATUSES = ["pending", "active", "pending_am_review"]
+
+coaching_goals_col = LazyCollection("coaching_goals")
+insights_col = LazyCollection("insights")
+sessions_col = LazyCollection("one_on_one_sessions")
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("a an and are as at be by for from has have in is it its of on or that the this to was were will with your you their our".split())
+
+
+def _terms(text: str) -> list:
+    words = [w for w in _TOKEN.findall((text or "").lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashedTfidfIndex:
+    def __init__(self, dim: int = SIMILARITY_DIM):
+        self.dim = dim
+        self.df = np.zeros(dim)
+        self.docs = {}
+
+    def _tf(self, text: str):
+        terms = _terms(text)
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        buckets = np.fromiter((zlib.crc32(t.encode()) % self.dim for t in terms), dtype=np.int64, count=len(terms))
+        idx, counts = np.unique(buckets, return_counts=True)
+        return idx, 1.0 + np.log(counts)
+
+    def add(self, doc_id: str, text: str, meta: dict = None):
+        self.remove(doc_id)
+        idx, tf = self._tf(text)
+        self.df[idx] += 1
+        self.docs[doc_id] = (idx, tf, meta or {})
+
+    def remove(self, doc_id: str):
+        old = self.docs.pop(doc_id, None)
+        if old is not None:
+            self.df[old[0]] -= 1
+
+    def _weights(self, idx, tf):
+        idf = np.log((1 + len(self.docs)) / (1 + self.df[idx])) + 1.0
+        w = tf * idf
+        norm = np.linalg.norm(w)
+        return w / norm if norm else w
+
+    def query(self, text: str, k: int = 5, where=None) -> list:
+        qidx, qtf = self._tf(text)
+        if not len(qidx) or not self.docs:
+            return []
+        dense = np.zeros(self.dim)
+        dense[qidx] = self._weights(qidx, qtf)
+        ids, parts, offsets = [], [], []
+        for doc_id, (idx, tf, meta) in self.docs.items():
+            if not len(idx) or (where and not where(meta)):
+                continue
+            ids.append(doc_id)
+            offsets.append(sum(len(p) for p in parts))
+            parts.append(dense[idx] * self._weights(idx, tf))
+        if not ids:
+            return []
+        scores = np.add.reduceat(np.concatenate(parts), offsets)
+        top = np.argsort(-scores)[:k]
+        return [(ids[i], float(scores[i]), self.docs[ids[i]][2]) for i in top]
+
+
+# ─── Per-user scopes ───
+_scopes = process_local(OrderedDict)
+
+
+def _scope(kind: str, key: str, loader) -> HashedTfidfIndex:
+    scopes, scope_key = _scopes(), (tenancy.org_id(), kind, key)
+    entry = scopes.get(scope_key)
+    if entry is None or time.monotonic() - entry[1] > SIMILARITY_REFRESH_SECONDS:
+        index = HashedTfidfIndex()
+        for doc_id, text, meta in loader(key):
+            index.add(doc_id, text, meta)
+        entry = (index, time.monotonic())
+        scopes[scope_key] = entry
+        while len(scopes) > SIMILARITY_MAX_SCOPES:
+            scopes.popitem(last=False)
+    scopes.move_to_end(scope_key)
+    return entry[0]
+
+
+def _goal_text(goal: dict) -> str:
+    # Titles are short; repeat them so they outweigh boilerplate descriptions.
+    return f"{goal.get('title', '')}. {goal.get('title', '')}. {goal.get('description', '')}"
+
+
+def _load_goals(user_id: str):
+    for g in coaching_goals_col.find({"user_id": user_id, "status": {"$in": OPEN_GOAL_STATUSES}}, {"_id": 0, "goal_id": 1, "title": 1, "description": 1, "status": 1}):
+        yield g["goal_id"], _goal_text(g), {"status": g["status"]}
+
+
+def _load_insights(user_id: str):
+    for i in insights_col.find({"user_id": user_id}, {"_id": 1, "insight": 1}):
+        yield str(i["_id"]), i.get("insight", ""), {}
+
+
+def _session_text(s: dict) -> str:
+    analysis = s.get("analysis") or {}
+    return " ".join(str(x) for x in (
+        s.get("detailed_notes", ""), s.get("transcript", ""), s.get("expressed_aspirations", ""),
+        " ".join(s.get("stress_signs") or []), analysis.get("supervisor_summary", ""), analysis.get("employee_summary", ""),
+    ) if x)
+
+
+_SESSION_TEXT_FIELDS = {"_id": 0, "session_id": 1, "date": 1, "submitted_at": 1, "detailed_notes": 1, "transcript": 1, "expressed_aspirations": 1, "stress_signs": 1, "analysis.supervisor_summary": 1, "analysis.employee_summary": 1}
+
+
+def _load_sessions(employee_id: str):
+    cursor = sessions_col.find({"employee_id": employee_id, "status": {"$ne": "upcoming"}, "archived": {"$ne": True}}, _SESSION_TEXT_FIELDS).sort("date", -1).limit(SESSION_CANDIDATES)
+    for s in cursor:
+        yield s["session_id"], _session_text(s), {"date": s.get("date") or s.get("submitted_at") or ""}
+
+
+# ─── Goals ───
+def match_goal(user_id: str, title: str, description: str = ""):
+    """goal_id of an open goal for the user that is a near-duplicate, else None."""
+    hits = _scope("goals", user_id, _load_goals).query(_goal_text({"title": title, "description": description}), k=1)
+    return hits[0][0] if hits and hits[0][1] >= GOAL_DEDUP_THRESHOLD else None
+
+
+def note_goal(goal: dict):
+    _scope("goals", goal["user_id"], _load_goals).add(goal["goal_id"], _goal_text(goal), {"status": goal.get("status")})
+
+
+def merge_recommendation(goal_id: str, session_id: str, rec: dict):
+    coaching_goals_col.update_one({"goal_id": goal_id}, {
+        "$inc": {"recommendation_count": 1},
+        "$set": {"last_recommended_at": datetime.now(timezone.utc).isoformat(), "last_session_id": session_id},
+        "$addToSet": {"recommended_titles": rec.get("title", "")},
+    })
+
+
+# ─── Insights ───
+def novel_insights(user_id: str, texts: list) -> list:
+    index = _scope("insights", user_id, _load_insights)
+    fresh = []
+    for i, text in enumerate(texts):
+        hits = index.query(text, k=1)
+        if hits and hits[0][1] >= INSIGHT_DEDUP_THRESHOLD:
+            continue
+        index.add(f"pending-{time.monotonic()}-{i}", text)
+        fresh.append(text)
+    return fresh
+
+
+# ─── Sessions ───
+def relevant_sessions(employee_id: str, query_text: str, k: int = 3) -> list:
+    """Most recent session plus the k-1 past sessions most similar to query_text."""
+    index = _scope("sessions", employee_id, _load_sessions)
+    if not index.docs:
+        return []
+    latest = max(index.docs, key=lambda sid: index.docs[sid][2]["date"])
+    picked = [latest] + [sid for sid, _, _ in index.query(query_text, k=k) if sid != latest][: k - 1]
+    docs = {s["session_id"]: s for s in sessions_col.find({"session_id": {"$in": picked}}, {"_id": 0})}
+    return [docs[sid] for sid in picked if sid in docs]
+
+
+def note_session(session: dict):
+    _scope("sessions", session["employee_id"], _load_sessions).add(session["session_id"], _session_text(session), {"date": session.get("date") or session.get("submitted_at") or ""})
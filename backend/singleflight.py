@@ -0,0 +1,83 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import weakref
+from runtime import process_local
+
+# Coalesces identical in-flight coroutine calls within a worker: the first
+# caller runs the upstream request, later callers with the same key await the
+# same future. Every caller, the leader included, gets its own copy of the
+# result, so one caller editing what it got can't change another's. If the leader is
+# cancelled (its client went away) the waiters don't see it: they start over
+# and one of them leads. If the leader fails, each waiter runs the call once
+# itself (coalescing again among themselves) before giving up with the error.
+_inflight = process_local(dict)
+_locks = process_local(weakref.WeakValueDictionary)
+
+
+class _LeaderGone(Exception):
+    pass
+
+
+def _without(value, ignore):
+    return {k: v for k, v in value.items() if k not in ignore} if isinstance(value, dict) else value
+
+
+def call_key(name: str, args: tuple, kwargs: dict, ignore: tuple = ()) -> str:
+    """ignore: keys dropped from dict arguments (timestamps, ids) so they don't split the key."""
+    if ignore:
+        args = tuple(_without(a, ignore) for a in args)
+        kwargs = {k: _without(v, ignore) for k, v in kwargs.items()}
+    payload = json.dumps([name, args, kwargs], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def do(key: str, factory):
+    calls = _inflight()
+    retried = False
+    while (fut := calls.get(key)) is not None:
+        try:
+            return copy.deepcopy(await asyncio.shield(fut))
+        except _LeaderGone:
+            continue
+        except Exception:
+            if retried:
+                raise
+            retried = True
+    fut = asyncio.get_running_loop().create_future()
+    calls[key] = fut
+    try:
+        result = await factory()
+    except asyncio.CancelledError:
+        fut.set_exception(_LeaderGone())
+        fut.exception()  # mark retrieved when nobody else was waiting
+        raise
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()
+        raise
+    else:
+        fut.set_result(result)
+        return copy.deepcopy(result)
+    finally:
+        calls.pop(key, None)
+
+
+def coalesced(fn=None, *, ignore: tuple = ()):
+    """@coalesced, or @coalesced(ignore=(...)) to leave volatile fields out of the key."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await do(call_key(fn.__name__, args, kwargs, ignore), lambda: fn(*args, **kwargs))
+        return wrapper
+    return wrap(fn) if fn is not None else wrap
+
+
+def keyed_lock(key: str) -> asyncio.Lock:
+    locks = _locks()
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
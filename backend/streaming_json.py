@@ -0,0 +1,70 @@
+import json
+
+# Incremental parsing of a streamed JSON object. SectionParser is fed the
+# completion text as it arrives and returns each top-level member of the root
+# object as soon as its value closes, so long analyses can be persisted and
+# pushed section by section. Leading prose or ``` fences before the root "{"
+# are skipped; a member that doesn't parse on its own is dropped here and left
+# to the final whole-document parse.
+
+
+class SectionParser:
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+        self.done = False
+        self.sections = {}
+
+    def feed(self, chunk: str) -> list:
+        """[(key, value)] for every member that closed within this chunk."""
+        self.buf += chunk
+        closed = []
+        while self.pos < len(self.buf) and not self.done:
+            ch = self.buf[self.pos]
+            if self.member_start is None:
+                if ch == "{":
+                    self.depth, self.member_start = 1, self.pos + 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    closed += self._member(self.buf[self.member_start:self.pos])
+                    self.done = True
+            elif ch == "," and self.depth == 1:
+                closed += self._member(self.buf[self.member_start:self.pos])
+                self.member_start = self.pos + 1
+            self.pos += 1
+        return closed
+
+    def _member(self, text: str) -> list:
+        if not text.strip():
+            return []
+        try:
+            member = json.loads("{" + text + "}")
+        except ValueError:
+            return []
+        self.sections.update(member)
+        return list(member.items())
+
+
+def check_sections(result, schema: dict) -> dict:
+    """Missing keys and keys whose value has the wrong type, per schema {key: type or tuple of types}."""
+    if not isinstance(result, dict):
+        return {"missing": sorted(schema), "invalid": []}
+    missing = [k for k in schema if k not in result]
+    invalid = [k for k, types in schema.items() if k in result and not isinstance(result[k], types)]
+    return {"missing": missing, "invalid": invalid}
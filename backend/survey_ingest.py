@@ -0,0 +1,173 @@
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from pymongo.errors import BulkWriteError
+from db import LazyCollection
+from runtime import process_local
+import tenancy
+
+# Group-commit ingestion for survey responses. Submissions are validated
+# against the survey's question list, buffered, and written with one
+# insert_many every INGEST_FLUSH_MS or INGEST_MAX_BATCH documents; callers wait
+# for the batch holding their documents to commit. When INGEST_BUFFER_MAX
+# documents are already waiting, new submissions are refused (back-pressure).
+INGEST_MAX_BATCH = int(os.environ.get("INGEST_MAX_BATCH", "500"))
+INGEST_FLUSH_MS = float(os.environ.get("INGEST_FLUSH_MS", "5"))
+INGEST_BUFFER_MAX = int(os.environ.get("INGEST_BUFFER_MAX", "5000"))
+SURVEY_CACHE_SECONDS = float(os.environ.get("INGEST_SURVEY_CACHE_SECONDS", "10"))
+
+surveys_col = LazyCollection("surveys")
+survey_responses_col = LazyCollection("survey_responses")
+
+
+class BufferFull(Exception):
+    pass
+
+
+class InvalidResponse(Exception):
+    def __init__(self, errors: list):
+        self.errors = errors
+
+
+def ensure_indexes():
+    survey_responses_col.create_index([("org_id", 1), ("survey_id", 1), ("submitted_at", 1)])
+
+
+# ─── Validation ───
+_surveys = process_local(dict)
+
+
+def _survey(survey_id: str):
+    # Only active surveys are cached, so a draft starts accepting responses as
+    # soon as it is deployed. Changes made on another worker reach this one
+    # after SURVEY_CACHE_SECONDS.
+    cache, key = _surveys(), (tenancy.org_id(), survey_id)
+    hit = cache.get(key)
+    if hit and hit[1] > time.monotonic():
+        return hit[0]
+    survey = surveys_col.find_one({"survey_id": survey_id}, {"_id": 0, "status": 1, "questions": 1})
+    if survey and survey.get("status") == "active":
+        cache[key] = (survey, time.monotonic() + SURVEY_CACHE_SECONDS)
+    else:
+        cache.pop(key, None)
+    return survey
+
+
+def forget(survey_id: str):
+    """Drop a survey from this worker's validation cache after changing it."""
+    _surveys().pop((tenancy.org_id(), survey_id), None)
+
+
+def _question_text(q) -> str:
+    return q.get("question", "") if isinstance(q, dict) else str(q)
+
+
+def validate(survey_id: str, submissions: list) -> list:
+    """Raise InvalidResponse unless every submission answers known questions of an active survey."""
+    survey = _survey(survey_id)
+    if not survey:
+        raise InvalidResponse([{"error": "survey not found"}])
+    if survey.get("status") != "active":
+        raise InvalidResponse([{"error": "survey is not accepting responses"}])
+    questions = [_question_text(q) for q in survey.get("questions", [])]
+    known = set(questions)
+    errors = []
+    for i, responses in enumerate(submissions):
+        if not isinstance(responses, list) or not responses:
+            errors.append({"submission": i, "error": "responses must be a non-empty list"})
+            continue
+        for j, r in enumerate(responses):
+            idx = r.get("question_index") if isinstance(r, dict) else None
+            if not isinstance(r, dict) or "answer" not in r:
+                errors.append({"submission": i, "response": j, "error": "missing answer"})
+            elif isinstance(idx, int) and not 0 <= idx < len(questions):
+                errors.append({"submission": i, "response": j, "error": "question_index out of range"})
+            elif idx is None and r.get("question") not in known:
+                errors.append({"submission": i, "response": j, "error": "unknown question"})
+    if errors:
+        raise InvalidResponse(errors)
+    return submissions
+
+
+# ─── Group commit ───
+class IngestBuffer:
+    def __init__(self):
+        self.buffer = []
+        self.has_items = asyncio.Event()
+        self.full = asyncio.Event()
+        self.task = None
+
+    async def submit(self, docs: list) -> list:
+        if len(self.buffer) + len(docs) > INGEST_BUFFER_MAX:
+            raise BufferFull()
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        loop = asyncio.get_running_loop()
+        futs = [loop.create_future() for _ in docs]
+        self.buffer.extend(zip(docs, futs))
+        self.has_items.set()
+        if len(self.buffer) >= INGEST_MAX_BATCH:
+            self.full.set()
+        return await asyncio.gather(*futs)
+
+    async def _run(self):
+        while True:
+            await self.has_items.wait()
+            try:
+                await asyncio.wait_for(self.full.wait(), INGEST_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            await self._commit()
+
+    async def _commit(self):
+        batch = self.buffer[:INGEST_MAX_BATCH]
+        del self.buffer[:INGEST_MAX_BATCH]
+        if len(self.buffer) < INGEST_MAX_BATCH:
+            self.full.clear()
+        if not self.buffer:
+            self.has_items.clear()
+        if not batch:
+            return
+        # One insert per org: orgs may live in different databases
+        by_org = {}
+        for doc, fut in batch:
+            by_org.setdefault(doc["org_id"], []).append((doc, fut))
+        for org, items in by_org.items():
+            with tenancy.using(org):
+                await self._insert(items)
+
+    async def _insert(self, batch: list):
+        failed = {}
+        try:
+            await asyncio.to_thread(survey_responses_col.insert_many, [d for d, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: e for err in e.details.get("writeErrors", [])}
+        except Exception as e:
+            failed = {i: e for i in range(len(batch))}
+        for i, (doc, fut) in enumerate(batch):
+            if fut.done():
+                continue
+            if i in failed:
+                fut.set_exception(failed[i])
+            else:
+                doc.pop("_id", None)
+                fut.set_result(doc)
+
+    async def drain(self):
+        while self.buffer:
+            await self._commit()
+
+
+buffer = process_local(IngestBuffer)
+
+
+def build_response(survey_id: str, responses: list) -> dict:
+    return {
+        "response_id": str(uuid.uuid4()),
+        "org_id": tenancy.org_id(),
+        "survey_id": survey_id,
+        "responses": responses,
+        "submitted_at": datetime.now(timezone.utc).isoformat(),
+    }
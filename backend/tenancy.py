@@ -0,0 +1,92 @@
+import os
+import re
+import json
+import contextvars
+from contextlib import contextmanager
+from urllib.parse import parse_qs
+from starlette.responses import JSONResponse
+
+# Organization (tenant) partitioning. Every document carries an org_id and
+# every query made through db.LazyCollection is scoped to the org of the
+# current request (X-Org-Id header, or ?org_id= for plain download links;
+# DEFAULT_ORG_ID when absent).
+#
+# The org is taken as given: this service does not authenticate it, so the
+# header is routing, not an isolation boundary. In a multi-tenant deployment it
+# must be set by an authenticating proxy in front of the app, which overwrites
+# any X-Org-Id (and strips any org_id parameter) sent by the client with the
+# org of the authenticated user.
+#
+# TENANT_ROUTES maps orgs to their own database, so large customers can be
+# moved to another database or cluster without touching query code:
+#   TENANT_ROUTES='{"acme": "laddrr_acme", "globex": "mongodb://shard-b:27017/laddrr_globex"}'
+# A value is either a database name on the default cluster or a full URI whose
+# path names the database. Unrouted orgs share MONGO_URL/DB_NAME.
+DEFAULT_ORG = os.environ.get("DEFAULT_ORG_ID", "default")
+ORG_HEADER = "X-Org-Id"
+TENANT_ROUTES = json.loads(os.environ.get("TENANT_ROUTES", "{}"))
+
+_ORG_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_current = contextvars.ContextVar("org_id", default=DEFAULT_ORG)
+
+
+def valid(org: str) -> bool:
+    return bool(_ORG_ID.match(org or ""))
+
+
+def org_id() -> str:
+    return _current.get()
+
+
+@contextmanager
+def using(org: str):
+    """Run a block (including background work) as the given org."""
+    token = _current.set(org)
+    try:
+        yield org
+    finally:
+        _current.reset(token)
+
+
+def route(org: str) -> tuple:
+    """(mongo url or None for the default cluster, database name) for an org."""
+    target = TENANT_ROUTES.get(org)
+    if not target:
+        return None, os.environ.get("DB_NAME")
+    if "://" not in target:
+        return None, target
+    return target, target.rpartition("/")[2].split("?")[0]
+
+
+def placements() -> list:
+    """One org per distinct database, for per-database setup like indexes."""
+    seen, orgs = set(), []
+    for org in [DEFAULT_ORG, *TENANT_ROUTES]:
+        if route(org) not in seen:
+            seen.add(route(org))
+            orgs.append(org)
+    return orgs
+
+
+def marker(name: str) -> str:
+    """Per-org id for one-off markers in the meta collection."""
+    org = org_id()
+    return name if org == DEFAULT_ORG else f"{name}:{org}"
+
+
+class OrgMiddleware:
+    """Bind the request's org (X-Org-Id) for everything the request runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        org = dict(scope["headers"]).get(ORG_HEADER.lower().encode(), b"").decode()
+        if not org:
+            org = parse_qs(scope.get("query_string", b"").decode()).get("org_id", [DEFAULT_ORG])[0]
+        if not valid(org):
+            return await JSONResponse({"detail": f"Invalid {ORG_HEADER}"}, status_code=400)(scope, receive, send)
+        with using(org):
+            await self.app(scope, receive, send)
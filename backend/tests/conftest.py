@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+import mongomock
+import pytest
+import db
+
+
+@pytest.fixture(autouse=True)
+def mongo(monkeypatch):
+    """Fresh in-memory Mongo per test; every get_db() resolves against it."""
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db, "get_client", lambda: client)
+    return client[os.environ["DB_NAME"]]
+
+
+@pytest.fixture
+def client():
+    """TestClient for the full app, with startup (indexes, seed data) run."""
+    pytest.importorskip("emergentintegrations")
+    from fastapi.testclient import TestClient
+    import server
+    with TestClient(server.app) as c:
+        yield c
@@ -0,0 +1,107 @@
+import os
+import time
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pymongo import ReadPreference
+import access
+from access import RYW_COOKIE, ReadYourWritesMiddleware, options, read_policy
+import db
+from db import LazyCollection
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    def seen():
+        pref = LazyCollection("goals").raw().read_preference
+        return {"mode": pref.mongos_mode, "max_staleness": pref.max_staleness}
+
+    @app.get("/list", dependencies=[read_policy("analytical")])
+    def listing():
+        return seen()
+
+    @app.get("/detail")
+    def detail():
+        return seen()
+
+    @app.post("/write")
+    def write():
+        return {}
+
+    @app.post("/fail")
+    def fail():
+        raise HTTPException(400)
+    return app
+
+
+def test_policy_resolution():
+    assert options() == {}
+    analytical = access.POLICIES["analytical"]["read_preference"]
+    assert analytical.mongos_mode == "secondaryPreferred" and analytical.max_staleness == access.DATA_MAX_STALENESS_SECONDS
+    assert access.POLICIES["detail"]["read_preference"] == ReadPreference.PRIMARY
+    wc = access.POLICIES["fire_and_forget"]["write_concern"]
+    assert wc.document == {"w": 1, "j": False}
+    assert access._read_preference("primary") == ReadPreference.PRIMARY
+    assert access._read_preference("nearest").max_staleness >= 90
+
+
+def test_handle_policy_combines_with_route_policy():
+    token = access._read_policy.set("analytical")
+    try:
+        opts = options("fire_and_forget")
+        assert opts["read_preference"].mongos_mode == "secondaryPreferred"
+        assert opts["write_concern"].document == {"w": 1, "j": False}
+        pinned = access._pinned.set(True)
+        assert options("fire_and_forget")["read_preference"] == ReadPreference.PRIMARY
+        access._pinned.reset(pinned)
+    finally:
+        access._read_policy.reset(token)
+
+
+def test_analytical_route_reads_secondary_detail_reads_primary(app):
+    c = TestClient(app)
+    assert c.get("/list").json() == {"mode": "secondaryPreferred", "max_staleness": access.DATA_MAX_STALENESS_SECONDS}
+    assert c.get("/detail").json()["mode"] == "primary"
+
+
+def test_write_sets_cookie_that_pins_reads_to_primary(app):
+    c = TestClient(app)
+    assert RYW_COOKIE not in c.get("/list").cookies
+    c.post("/fail")
+    assert RYW_COOKIE not in c.cookies  # failed writes don't pin
+    c.post("/write")
+    until = float(c.cookies[RYW_COOKIE])
+    assert time.time() < until <= time.time() + access.READ_YOUR_WRITES_SECONDS + 1
+    assert c.get("/list").json()["mode"] == "primary"
+
+
+def test_expired_or_garbled_cookie_does_not_pin(app):
+    c = TestClient(app)
+    for value in (str(time.time() - 1), "junk"):
+        c.cookies.set(RYW_COOKIE, value)
+        assert c.get("/list").json()["mode"] == "secondaryPreferred"
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_REPLICA_SET_URL"), reason="set TEST_REPLICA_SET_URL to a replica set with a secondary")
+def test_replica_set_routing(monkeypatch):
+    from pymongo import MongoClient
+    client = MongoClient(os.environ["TEST_REPLICA_SET_URL"])
+    monkeypatch.setattr(db, "get_client", lambda: client)
+    col = LazyCollection("access_test")
+    col.delete_many({})
+    col.insert_one({"n": 1})
+
+    def served_by(pinned: bool):
+        policy, pin = access._read_policy.set("analytical"), access._pinned.set(pinned)
+        try:
+            cursor = col.find({})
+            list(cursor)
+            return cursor.address
+        finally:
+            access._read_policy.reset(policy)
+            access._pinned.reset(pin)
+    assert served_by(pinned=False) in client.secondaries
+    assert served_by(pinned=True) == client.primary
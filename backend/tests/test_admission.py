@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+import admission
+from admission import AdmissionController, FairShareGate, Rejected, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(60, 2)
+    for _ in range(2):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() > 0
+
+
+def test_route_limit_rejects_before_user_limit(monkeypatch):
+    monkeypatch.setitem(admission.ROUTE_LIMITS, "r", (60, 1))
+    ctl = AdmissionController()
+
+    async def go():
+        await ctl.enter("u", "r")
+        ctl.leave()
+        with pytest.raises(Rejected) as e:
+            await ctl.enter("u", "r")
+        assert e.value.reason == "rate_limited"
+        await ctl.enter("other", "r")  # buckets are per caller
+        ctl.leave()
+    asyncio.run(go())
+    assert ctl.stats()["routes"]["r"] == {"admitted": 2, "rejected_rate_limited": 1}
+
+
+def test_gate_releases_waiters_round_robin():
+    async def go():
+        gate = FairShareGate(1)
+        await gate.acquire("holder")
+        order = []
+
+        async def wait(user):
+            await gate.acquire(user)
+            order.append(user)
+        tasks = [asyncio.create_task(wait(u)) for u in ("a", "a", "a", "b")]
+        await asyncio.sleep(0)
+        for _ in tasks:
+            gate.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+    assert asyncio.run(go()) == ["a", "b", "a", "a"]
+
+
+def test_gate_rejects_past_per_user_queue(monkeypatch):
+    monkeypatch.setattr(admission, "QUEUE_PER_USER", 1)
+
+    async def go():
+        gate = FairShareGate(1)
+        await gate.acquire("u")
+        waiter = asyncio.create_task(gate.acquire("u"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as e:
+            await gate.acquire("u")
+        assert e.value.reason == "queue_full"
+        gate.release()
+        await waiter
+    asyncio.run(go())
+
+
+def test_gate_times_out_queued_caller(monkeypatch):
+    monkeypatch.setattr(admission, "QUEUE_TIMEOUT", 0.01)
+
+    async def go():
+        gate = FairShareGate(1)
+        await gate.acquire("u")
+        with pytest.raises(Rejected) as e:
+            await gate.acquire("v")
+        assert e.value.reason == "queue_timeout"
+        assert gate.queued == 0 and not gate.waiting
+    asyncio.run(go())
@@ -0,0 +1,49 @@
+import analytics
+from analytics import cohorts, invalidate, summary, user_facts
+
+KEYS = ("overall", "project_delivery", "goal_completion", "communication")
+
+
+def _user(uid, team, value, role="employee"):
+    analytics.users_col.insert_one({"user_id": uid, "team": team, "role": role, "scores": {k: value for k in KEYS}})
+
+
+def _seed():
+    for uid, team, value in (("a", "red", 60), ("b", "red", 80), ("c", "blue", 70), ("d", "blue", 70)):
+        _user(uid, team, value)
+    invalidate()
+
+
+def test_percentiles_and_z_scores():
+    _seed()
+    a, c = user_facts("a"), user_facts("c")
+    assert a["org_percentile"]["overall"] == 12.5 and a["team_percentile"]["overall"] == 25.0
+    assert a["team_z_score"]["overall"] == -1.0 and a["team_size"] == 2
+    assert c["org_percentile"]["overall"] == 50.0 and c["team_z_score"]["overall"] == 0.0
+    assert user_facts("nobody") is None
+
+
+def test_summary_and_cohorts():
+    _seed()
+    s = summary()
+    assert s["population"] == 4 and s["org"]["overall"]["mean"] == 70.0 and s["correlation"]["overall"]["communication"] == 1.0
+    by_team = {c["team"]: c for c in cohorts()["cohorts"]}
+    assert by_team["red"]["size"] == 2 and by_team["blue"]["delta_vs_org"]["overall"] == 0.0
+    assert [c["role"] for c in cohorts("role")["cohorts"]] == ["employee"]
+
+
+def test_partial_scores_skipped_and_cache_invalidated():
+    _seed()
+    analytics.users_col.insert_one({"user_id": "e", "team": "red", "scores": {"overall": 10}})
+    invalidate()
+    assert summary()["population"] == 4
+    _user("f", "red", 90)
+    assert summary()["population"] == 4  # cached
+    invalidate()
+    assert summary()["population"] == 5
+
+
+def test_empty_population():
+    invalidate()
+    assert summary() == {"population": 0, "dimensions": list(KEYS), "org": {k: None for k in KEYS}, "correlation": None}
+    assert cohorts()["cohorts"] == []
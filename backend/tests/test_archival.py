@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+import archival
+import history
+from archival import hydrate, restore, run
+from db import LazyCollection
+
+OLD = "2024-01-01T00:00:00+00:00"
+sessions = LazyCollection("one_on_one_sessions")
+cases = LazyCollection("critical_cases")
+messages = LazyCollection("messages")
+
+
+def _recent() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def test_undated_session_ages_by_submission():
+    sessions.insert_one({"session_id": "dated", "status": "completed", "date": OLD})
+    sessions.insert_one({"session_id": "undated", "status": "completed", "submitted_at": OLD, "transcript": "t"})
+    sessions.insert_one({"session_id": "fresh", "status": "completed", "submitted_at": _recent()})
+    sessions.insert_one({"session_id": "upcoming", "status": "upcoming", "date": OLD})
+    assert run(["one_on_one_sessions"])["one_on_one_sessions"] == 2
+    archived = {s["session_id"] for s in sessions.find({"archived": True})}
+    assert archived == {"dated", "undated"}
+
+
+def test_scheduled_date_takes_precedence_over_submission():
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    sessions.insert_one({"session_id": "s", "status": "completed", "date": future, "submitted_at": OLD})
+    assert run(["one_on_one_sessions"])["one_on_one_sessions"] == 0
+
+
+def test_case_moves_with_its_timeline_and_restores():
+    cases.insert_one({"case_id": "c1", "status": "resolved", "current_level": 2, "insight": "long text",
+                      "latest_timeline_entry": {"timestamp": OLD}, "timeline_count": 2})
+    history.case_timeline.append("c1", [{"action": "a"}, {"action": "b"}])
+    run(["critical_cases"])
+    stub = cases.find_one({"case_id": "c1"}, {"_id": 0})
+    assert stub["archived"] and stub["current_level"] == 2 and "insight" not in stub
+    assert history.case_timeline.all("c1") == []
+    full = restore("critical_cases", stub)
+    assert full["insight"] == "long text" and [e["action"] for e in full["timeline"]] == ["a", "b"]
+    page = archival.history_page("critical_cases", stub, 0, 1)
+    assert page["total"] == 2 and page["items"] == [{"action": "b"}]
+
+
+def test_rerun_and_dry_run_are_harmless():
+    messages.insert_one({"message_id": "m1", "status": "responded", "response": "r", "created_at": OLD})
+    assert run(dry_run=True)["messages"] == 1
+    assert messages.find_one({"message_id": "m1"})["response"] == "r"
+    assert run()["messages"] == 1 and run()["messages"] == 0
+    docs = hydrate("messages", list(messages.find({}, {"_id": 0})))
+    assert docs[0]["response"] == "r" and docs[0]["archived"]
+
+
+def test_session_export_includes_archived_sessions(monkeypatch):
+    import exports
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    for i in range(3):
+        sessions.insert_one({"session_id": f"old{i}", "status": "completed", "date": OLD, "analysis": {"leadership_score": i}})
+    sessions.insert_one({"session_id": "recent", "status": "completed", "date": _recent(), "analysis": {"leadership_score": 9}})
+    sessions.insert_one({"session_id": "no-analysis", "status": "completed", "date": OLD, "analysis": None})
+    run(["one_on_one_sessions"])
+    assert sessions.count_documents({"archived": True}) == 4
+    columns, rows = exports.session_analysis_rows()
+    exported = {r[0]: dict(zip(columns, r))["leadership_score"] for r in rows}
+    assert exported == {"old0": 0, "old1": 1, "old2": 2, "recent": 9}
+
+
+def test_stats_report_sizes():
+    sessions.insert_one({"session_id": "s", "status": "completed", "date": OLD, "transcript": "x" * 5000})
+    run()
+    tier = archival.stats()["collections"]["one_on_one_sessions"]
+    assert tier["archived"] == 1 and tier["live"] == 0 and tier["stored_bytes"] < tier["raw_bytes"]
+
+
+def test_one_worker_claims_the_run(mongo):
+    assert archival._claim(mongo) and not archival._claim(mongo)
+
+
+def test_routes_hide_stubs_unless_asked(client):
+    sessions.insert_one({"session_id": "undated", "employee_id": "emp-001", "status": "completed", "submitted_at": OLD, "transcript": "t"})
+    archival.run(["one_on_one_sessions"], older_than_days=0)
+    listed = {s["session_id"] for s in client.get("/api/one-on-one/sessions").json()}
+    assert "undated" not in listed
+    assert "undated" in {s["session_id"] for s in client.get("/api/one-on-one/sessions?include_archived=true").json()}
+    assert "transcript" not in client.get("/api/one-on-one/sessions/undated").json()
+    assert client.get("/api/one-on-one/sessions/undated?include_archived=true").json()["transcript"] == "t"
@@ -0,0 +1,9 @@
+def test_employee_dashboard_returns_only_own_record(client):
+    data = client.get("/api/dashboard/employee?user_id=emp-002").json()
+    assert [u["user_id"] for u in data["employees"]] == ["emp-002"]
+    assert all(m["employee_id"] == "emp-002" for m in data["upcoming_meetings"])
+
+
+def test_employee_dashboard_without_user_is_empty(client):
+    data = client.get("/api/dashboard/employee").json()
+    assert data["employees"] == [] and data["insights"] == []
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+import degradation
+import profiling
+from degradation import CircuitBreaker, ResultCache, analysis_retry_col, guarded
+
+
+@pytest.fixture(autouse=True)
+def healthy(monkeypatch):
+    b, c = CircuitBreaker(), ResultCache()
+    monkeypatch.setattr(degradation, "breaker", lambda: b)
+    monkeypatch.setattr(degradation, "cache", lambda: c)
+    return b
+
+
+def _open(b):
+    for _ in range(degradation.LLM_BREAKER_FAILURES):
+        b.failure()
+
+
+async def _ok():
+    return {"v": 1}
+
+
+async def _boom():
+    raise RuntimeError("upstream")
+
+
+def test_breaker_opens_after_consecutive_failures(healthy):
+    for _ in range(degradation.LLM_BREAKER_FAILURES - 1):
+        healthy.failure()
+    healthy.success()
+    healthy.failure()
+    assert not healthy.is_open()
+    _open(healthy)
+    assert healthy.is_open() and degradation.reason() == "breaker_open"
+
+
+def test_guarded_serves_last_good_result_then_template(healthy):
+    assert asyncio.run(guarded("f", _ok, key="k")) == ({"v": 1}, None)
+    _open(healthy)
+    assert asyncio.run(guarded("f", _ok, key="k")) == ({"v": 1}, {"reason": "breaker_open", "source": "cache"})
+    result, flag = asyncio.run(guarded("f", _ok, key="other", fallback=lambda: {"t": 1}))
+    assert result == {"t": 1} and flag == {"reason": "breaker_open", "source": "template"}
+
+
+def test_upstream_error_falls_back_when_it_can():
+    result, flag = asyncio.run(guarded("f", _boom, fallback=lambda: {"t": 1}))
+    assert flag["reason"] == "upstream_error" and result == {"t": 1}
+    with pytest.raises(RuntimeError):
+        asyncio.run(guarded("f", _boom))
+
+
+def test_open_breaker_without_fallback_is_503(healthy):
+    _open(healthy)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(guarded("f", _ok))
+    assert e.value.status_code == 503 and int(e.value.headers["Retry-After"]) >= 1
+
+
+def test_cached_results_are_copies():
+    c = ResultCache()
+    c.put(("k",), {"v": [1]})
+    c.get(("k",))["v"].append(2)
+    assert c.get(("k",)) == {"v": [1]}
+
+
+def test_defer_backs_off_and_gives_up(monkeypatch):
+    monkeypatch.setattr(degradation, "ANALYSIS_RETRY_MAX_ATTEMPTS", 2)
+    assert degradation.defer("s1", {"p": 1}, "breaker_open")
+    first = analysis_retry_col.find_one({"session_id": "s1"})["next_attempt_at"]
+    assert degradation.defer("s1", {"p": 1}, "breaker_open")
+    second = analysis_retry_col.find_one({"session_id": "s1"})["next_attempt_at"]
+    assert second - first >= timedelta(seconds=degradation.ANALYSIS_RETRY_INTERVAL_SECONDS * 0.9)
+    assert not degradation.defer("s1", {"p": 1}, "breaker_open")
+    assert analysis_retry_col.count_documents({}) == 0
+
+
+def test_claim_due_leases_one_job():
+    degradation.defer("s1", {"p": 1}, "x")
+    assert degradation._claim_due() is None
+    analysis_retry_col.update_one({"session_id": "s1"}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    job = degradation._claim_due()
+    assert job["payload"] == {"p": 1} and degradation._claim_due() is None
+    degradation.done("s1")
+    assert analysis_retry_col.count_documents({}) == 0
+
+
+def test_nudge_template_reacts_to_last_user_turn():
+    assert "always" in degradation.nudge_template([{"role": "user", "content": "You always do this"}], "s")["nudge"]
+    assert "question" in degradation.nudge_template([{"role": "user", "content": "I think the report was late and it hurt the launch plan badly"}], "s")["nudge"]
+
+
+def test_admin_routes_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "s3cret")
+    routes = [(m, r.path) for r in client.app.routes if r.path.startswith("/api/admin") for m in r.methods]
+    assert ("GET", "/api/admin/degradation") in routes
+    for method, path in routes:
+        assert client.request(method, path.replace("{profile_id}", "x")).status_code == 401, path
+    assert client.get("/api/admin/degradation", headers={"X-Admin-Token": "s3cret"}).status_code == 200
@@ -0,0 +1,49 @@
+import csv
+import gzip
+import io
+import json
+import exports
+from exports import encode, session_analysis_rows, survey_response_rows
+
+SURVEY = {"survey_id": "sv", "questions": [{"question": "Mood?"}, "Workload?"]}
+
+
+def test_survey_rows_map_answers_by_index_or_text():
+    exports.survey_responses_col.insert_many([
+        {"survey_id": "sv", "response_id": "r2", "submitted_at": "2026-02", "responses": [{"question": "Workload?", "answer": "high"}, "junk"]},
+        {"survey_id": "sv", "response_id": "r1", "submitted_at": "2026-01", "responses": [{"question_index": 0, "answer": "good"}, {"question_index": 9, "answer": "x"}]},
+        {"survey_id": "other", "response_id": "r3", "submitted_at": "2026-01"},
+    ])
+    columns, rows = survey_response_rows(SURVEY)
+    assert columns == ["response_id", "submitted_at", "q1: Mood?", "q2: Workload?"]
+    assert list(rows) == [["r1", "2026-01", "good", ""], ["r2", "2026-02", "", "high"]]
+
+
+def test_session_rows_flatten_analysis():
+    exports.sessions_col.insert_many([
+        {"session_id": "s1", "employee_id": "e", "analysis": {"leadership_score": 7, "action_items": ["a"], "supervisor_summary": "ok"}},
+        {"session_id": "s2", "employee_id": "e", "analysis": None},
+    ])
+    columns, rows = session_analysis_rows()
+    [row] = list(rows)
+    record = dict(zip(columns, row))
+    assert record["session_id"] == "s1" and record["leadership_score"] == 7 and record["effectiveness_score"] == ""
+    assert record["action_items"] == '["a"]' and record["swot_analysis"] == ""
+
+
+def test_chunked_csv_and_ndjson(monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 2)
+    rows = [[i, f"v{i}"] for i in range(5)]
+    chunks = list(encode("csv", ["n", "v"], iter(rows)))
+    assert len(chunks) == 3
+    assert list(csv.reader(io.StringIO(b"".join(chunks).decode()))) == [["n", "v"]] + [[str(i), f"v{i}"] for i in range(5)]
+    lines = b"".join(encode("ndjson", ["n", "v"], iter(rows))).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{"n": i, "v": f"v{i}"} for i in range(5)]
+    assert list(encode("ndjson", ["n"], iter([]))) == []
+
+
+def test_gzip_framing_is_a_valid_stream():
+    rows = [[i, "x" * 50] for i in range(1000)]
+    body = b"".join(encode("csv", ["n", "v"], iter(rows), gzip=True))
+    text = gzip.decompress(body).decode()
+    assert text.splitlines()[0] == "n,v" and len(text.splitlines()) == 1001 and len(body) < len(text) // 10
@@ -0,0 +1,36 @@
+import pytest
+from history import BucketedHistory
+
+
+@pytest.fixture
+def hist():
+    return BucketedHistory("test_history", bucket_size=3)
+
+
+def test_varying_chunks_stay_in_order(hist):
+    hist.append("p", [1, 2])
+    hist.append("p", [3, 4])  # doesn't fit, opens a second bucket
+    hist.append("p", [5])     # must not backfill the first
+    hist.append("p", [6, 7, 8, 9])
+    assert [e for e in hist.all("p")] == list(range(1, 10))
+    assert hist.page("p", 0, 4)["items"] == [9, 8, 7, 6]
+
+
+def test_page_reads_only_needed_buckets(hist):
+    hist.append("p", list(range(10)))
+    page = hist.page("p", offset=2, limit=4)
+    assert page["total"] == 10 and page["items"] == [7, 6, 5, 4]
+    assert hist.page("p", offset=9, limit=5)["items"] == [0]
+    assert hist.page("other")["total"] == 0
+
+
+def test_large_append_fills_buckets(hist):
+    hist.append("p", list(range(7)))
+    assert [b["count"] for b in hist.col.find({"parent_id": "p"}).sort("_id", 1)] == [3, 3, 1]
+
+
+def test_delete_drops_parent_buckets_only(hist):
+    hist.append("p", [1])
+    hist.append("q", [2])
+    hist.delete("p")
+    assert hist.all("p") == [] and hist.all("q") == [2]
@@ -0,0 +1,78 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from db import LazyCollection
+from http_cache import CompressionMiddleware, etag
+
+BIG = "x" * 4096
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    notes = LazyCollection("notes")
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BIG, BIG]), media_type="text/plain")
+
+    @app.get("/export")
+    def export():
+        return Response(gzip.compress(BIG.encode()), media_type="application/gzip")
+
+    @app.get("/notes", dependencies=[etag("notes")])
+    def get_notes():
+        return list(notes.find({}, {"_id": 0}))
+
+    @app.post("/notes")
+    def add_note():
+        notes.insert_one({"n": 1})
+    return TestClient(app)
+
+
+def test_gzip_above_threshold_only(client):
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and r.text == BIG and "Accept-Encoding" in r.headers["vary"]
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_brotli_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    r = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br" and r.text == BIG
+
+
+def test_streamed_body_is_compressed_per_chunk(client):
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and "content-length" not in r.headers and r.text == BIG * 2
+
+
+def test_precompressed_passes_through(client):
+    r = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert gzip.decompress(r.content) == BIG.encode()
+
+
+def test_etag_304_until_collection_changes(client):
+    tag = client.get("/notes").headers["etag"]
+    assert client.get("/notes", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/notes", headers={"If-None-Match": f'"other", {tag}'}).status_code == 304
+    client.post("/notes")
+    fresh = client.get("/notes", headers={"If-None-Match": tag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != tag
+
+
+def test_etag_varies_with_query(client):
+    assert client.get("/notes?page=1").headers["etag"] != client.get("/notes?page=2").headers["etag"]
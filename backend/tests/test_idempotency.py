@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+import idempotency
+from idempotency import idempotency_col, once
+
+
+def _request(key=None):
+    headers = [(b"idempotency-key", key.encode())] if key else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+def _counter():
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"n": len(calls)}
+    return calls, run
+
+
+@pytest.fixture(autouse=True)
+def indexes(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_POLL_SECONDS", 0.01)
+    idempotency.ensure_indexes()
+
+
+def test_without_key_always_runs():
+    calls, run = _counter()
+    asyncio.run(once(_request(), Response(), "r", {"a": 1}, run))
+    asyncio.run(once(_request(), Response(), "r", {"a": 1}, run))
+    assert len(calls) == 2
+
+
+def test_concurrent_retries_run_once_and_replay():
+    calls, run = _counter()
+    responses = [Response() for _ in range(3)]
+
+    async def go():
+        return await asyncio.gather(*(once(_request("k"), r, "r", {"a": 1}, run) for r in responses))
+    assert asyncio.run(go()) == [{"n": 1}] * 3
+    assert len(calls) == 1
+    assert sorted(r.headers.get("Idempotent-Replayed", "") for r in responses) == ["", "true", "true"]
+
+
+def test_same_key_different_body_is_422():
+    calls, run = _counter()
+    asyncio.run(once(_request("k"), Response(), "r", {"a": 1}, run))
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(once(_request("k"), Response(), "r", {"a": 2}, run))
+    assert e.value.status_code == 422
+    asyncio.run(once(_request("k"), Response(), "other", {"a": 2}, run))  # keys are per route
+    assert len(calls) == 2
+
+
+def test_failed_run_releases_key():
+    async def fail():
+        raise RuntimeError("upstream")
+    with pytest.raises(RuntimeError):
+        asyncio.run(once(_request("k"), Response(), "r", {}, fail))
+    calls, run = _counter()
+    assert asyncio.run(once(_request("k"), Response(), "r", {}, run)) == {"n": 1}
+
+
+def test_in_flight_wait_gives_up_with_409(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT_SECONDS", 0.03)
+    idempotency._claim("r", "k", idempotency._fingerprint({}), "other-worker")
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(once(_request("k"), Response(), "r", {}, _counter()[1]))
+    assert e.value.status_code == 409
+
+
+def test_lapsed_lease_is_taken_over():
+    idempotency._claim("r", "k", idempotency._fingerprint({}), "other-worker")
+    idempotency_col.update_one({"key": "k"}, {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    calls, run = _counter()
+    assert asyncio.run(once(_request("k"), Response(), "r", {}, run)) == {"n": 1}
+
+
+def test_lease_is_renewed_during_a_long_run(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_LEASE_SECONDS", 0.06)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return {"n": len(calls)}
+
+    async def go():
+        first = asyncio.create_task(once(_request("k"), Response(), "r", {}, slow))
+        await asyncio.sleep(0.15)  # well past the original lease
+        return await asyncio.gather(first, once(_request("k"), Response(), "r", {}, slow))
+    assert asyncio.run(go()) == [{"n": 1}, {"n": 1}]
+    assert len(calls) == 1
+
+
+def test_stalled_owner_cannot_release_the_takers_claim(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_LEASE_SECONDS", 0.03)
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_RENEW_FRACTION", 100)  # a worker too stalled to renew
+
+    async def stalled_then_fails():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("upstream")
+
+    async def taker():
+        await asyncio.sleep(0.2)
+        return {"by": "taker"}
+
+    async def go():
+        first = asyncio.create_task(once(_request("k"), Response(), "r", {}, stalled_then_fails))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(once(_request("k"), Response(), "r", {}, taker))
+        with pytest.raises(RuntimeError):
+            await first
+        assert idempotency_col.find_one({"key": "k"})["status"] == "in_flight"
+        return await second
+    assert asyncio.run(go()) == {"by": "taker"}
+    replay = Response()
+    assert asyncio.run(once(_request("k"), replay, "r", {}, taker)) == {"by": "taker"}
+    assert replay.headers["Idempotent-Replayed"] == "true"
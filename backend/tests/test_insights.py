@@ -0,0 +1,20 @@
+import time
+import insights
+from insights import add_insights, get_feed
+
+
+def test_feed_keeps_latest_and_archives_the_rest(monkeypatch):
+    monkeypatch.setattr(insights, "INSIGHT_FEED_SIZE", 3)
+    add_insights("u", ["a", "b"])
+    time.sleep(0.01)  # batches are ordered by millisecond timestamps
+    add_insights("u", ["c", "d", "e"])
+    time.sleep(0.01)
+    add_insights("v", ["x"])
+    assert [i["insight"] for i in get_feed("u", limit=10)] == ["e", "d", "c"]
+    assert sorted(d["insight"] for d in insights.insights_archive_col.find({"user_id": "u"})) == ["a", "b"]
+    assert [i["insight"] for i in get_feed(limit=2)] == ["x", "e"]
+
+
+def test_empty_batch_writes_nothing():
+    add_insights("u", [])
+    assert get_feed("u") == []
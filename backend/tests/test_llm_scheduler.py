@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+import llm_scheduler
+from llm_scheduler import PriorityScheduler, priority
+
+
+def test_batch_cannot_take_reserved_slots():
+    async def go():
+        s = PriorityScheduler(4)  # one slot reserved for interactive
+        for _ in range(3):
+            await s.acquire("batch")
+        queued = asyncio.create_task(s.acquire("batch"))
+        await asyncio.sleep(0)
+        assert not queued.done()
+        await s.acquire("interactive")  # takes the reserved slot immediately
+        s.release("batch")
+        await queued
+        return s.stats()["classes"]
+    classes = asyncio.run(go())
+    assert classes["batch"]["running"] == 3 and classes["interactive"]["running"] == 1
+
+
+def test_interactive_goes_first_then_aged_batch(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_BATCH_MAX_WAIT_SECONDS", 0.05)
+
+    async def go():
+        s, order = PriorityScheduler(1), []
+        await s.acquire("batch")
+
+        async def run(cls, name):
+            await s.acquire(cls)
+            order.append(name)
+        batch = asyncio.create_task(run("batch", "b"))
+        await asyncio.sleep(0)
+        inter = asyncio.create_task(run("interactive", "i1"))
+        await asyncio.sleep(0)
+        s.release("batch")  # interactive wins while the batch call is fresh
+        await inter
+        await asyncio.sleep(0.06)
+        late = asyncio.create_task(run("interactive", "i2"))
+        await asyncio.sleep(0)
+        s.release("interactive")  # the aged batch call now goes ahead
+        await batch
+        s.release("batch")
+        await late
+        return order, s.stats()["classes"]["batch"]["aged"]
+    order, aged = asyncio.run(go())
+    assert order == ["i1", "b", "i2"] and aged == 1
+
+
+def test_cancelled_waiter_is_skipped():
+    async def go():
+        s = PriorityScheduler(1)
+        await s.acquire("interactive")
+        gone = asyncio.create_task(s.acquire("interactive"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        s.release("interactive")
+        await asyncio.wait_for(s.acquire("batch"), 1)
+        return s.stats()["classes"]
+    classes = asyncio.run(go())
+    assert classes["interactive"]["cancelled"] == 1 and classes["batch"]["running"] == 1
+
+
+def test_priority_decorator_sets_class_for_slot():
+    seen = []
+
+    async def go():
+        s = PriorityScheduler(2)
+
+        @priority("interactive")
+        async def chat():
+            async with s.slot():
+                seen.append(dict(s.running))
+        await chat()
+        async with s.slot():
+            seen.append(dict(s.running))
+    asyncio.run(go())
+    assert seen == [{"interactive": 1, "batch": 0}, {"interactive": 0, "batch": 1}]
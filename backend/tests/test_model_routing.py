@@ -0,0 +1,84 @@
+import asyncio
+import types
+import pytest
+
+pytest.importorskip("emergentintegrations")
+import model_routing
+from model_routing import FLASH, FLASH_LITE, MINI, ModelMetrics, RoutedChat, candidates
+
+MSG = types.SimpleNamespace(text="hello")
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    m = ModelMetrics()
+    monkeypatch.setattr(model_routing, "metrics", lambda: m)
+    return m
+
+
+class FakeChat:
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+
+    async def send_message(self, msg):
+        if self.behaviour == "slow":
+            await asyncio.sleep(1)
+        if self.behaviour == "error":
+            raise RuntimeError("boom")
+        return self.behaviour
+
+
+def _routed(monkeypatch, behaviours: dict, route="nets_nudge"):
+    monkeypatch.setitem(model_routing.ROUTES, route, {**model_routing.ROUTES[route], "timeout": 0.05})
+    chat = RoutedChat(route, "system", "s")
+    monkeypatch.setattr(chat, "_chat", lambda model: FakeChat(behaviours[model]))
+    return chat
+
+
+def test_candidates_drop_oversized_and_demote_slow(monkeypatch, fresh_metrics):
+    monkeypatch.setitem(model_routing.MODEL_LIMITS, FLASH_LITE, 10)
+    assert candidates("nets_nudge", 100) == [FLASH, MINI]
+    for _ in range(model_routing.LATENCY_MIN_SAMPLES):
+        fresh_metrics.record(FLASH_LITE, "ok", 10)
+    assert candidates("nets_nudge", 5) == [FLASH, MINI, FLASH_LITE]
+
+
+def test_falls_back_on_timeout_and_error(monkeypatch, fresh_metrics):
+    chat = _routed(monkeypatch, {FLASH_LITE: "slow", FLASH: "error", MINI: "mini says hi"})
+    assert asyncio.run(chat.send_message(MSG)) == "mini says hi"
+    stats = fresh_metrics.stats()
+    assert stats[FLASH_LITE]["timeouts"] == 1 and stats[FLASH]["errors"] == 1 and stats[MINI]["ok"] == 1
+    assert stats[FLASH_LITE]["fallbacks"] == stats[FLASH]["fallbacks"] == 1
+
+
+def test_last_candidate_error_is_raised(monkeypatch):
+    chat = _routed(monkeypatch, {FLASH_LITE: "error", FLASH: "error", MINI: "error"})
+    with pytest.raises(RuntimeError):
+        asyncio.run(chat.send_message(MSG))
+
+
+class FakeStream(FakeChat):
+    def stream_message(self, msg):
+        async def gen():
+            if self.behaviour == "error":
+                raise RuntimeError("no first chunk")
+            yield "a"
+            if self.behaviour == "midway":
+                raise RuntimeError("cut off")
+            yield "b"
+        return gen()
+
+
+def _collect(chat):
+    async def go():
+        return [c async for c in chat.stream_message(MSG)]
+    return asyncio.run(go())
+
+
+def test_stream_falls_back_only_before_first_chunk(monkeypatch):
+    chat = _routed(monkeypatch, {FLASH_LITE: "error", FLASH: "ok", MINI: "ok"})
+    monkeypatch.setattr(chat, "_chat", lambda model: FakeStream({FLASH_LITE: "error", FLASH: "ok", MINI: "ok"}[model]))
+    assert _collect(chat) == ["a", "b"]
+    monkeypatch.setattr(chat, "_chat", lambda model: FakeStream("midway"))
+    with pytest.raises(RuntimeError, match="cut off"):
+        _collect(chat)
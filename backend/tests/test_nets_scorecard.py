@@ -0,0 +1,71 @@
+import asyncio
+import json
+import re
+import pytest
+
+pytest.importorskip("emergentintegrations")
+import ai_service
+
+SCORES = {"scores": {"clarity": 7, "empathy": 8, "assertiveness": 6, "overall": 7},
+          "strengths": ["listens"], "gaps": ["vague asks"], "key_takeaways": ["be direct"], "practice_recommendations": ["role-play"]}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake upstream: windows annotate their numbered turns; the reduce returns SCORES."""
+    calls = {"windows": [], "reduce": []}
+
+    async def send(chat, msg):
+        turns = [int(n) for n in re.findall(r"^Turn (\d+) - ", msg.text, re.M)]
+        calls["windows"].append(turns)
+        return json.dumps([{"turn": n, "speaker": "user", "message": "", "feedback": {"type": "positive", "comment": f"t{n}"}} for n in turns])
+
+    async def stream(chat, msg):
+        calls["reduce"].append(msg.text)
+        await asyncio.sleep(0.01)
+        yield json.dumps(SCORES)
+
+    monkeypatch.setattr(ai_service, "SCORECARD_WINDOW", 3)
+    monkeypatch.setattr(ai_service, "_make_chat", lambda *a: None)
+    monkeypatch.setattr(ai_service, "_send", send)
+    monkeypatch.setattr(ai_service, "_stream", stream)
+    return calls
+
+
+def _messages(n):
+    return [{"role": "user" if i % 2 == 0 else "ai", "content": f"m{i}"} for i in range(n)]
+
+
+def test_windows_cover_every_turn_in_order(llm):
+    card = asyncio.run(ai_service.nets_scorecard_chunked(_messages(7), "raise", "boss"))
+    assert sorted(llm["windows"]) == [[1, 2, 3], [4, 5, 6], [7]]
+    assert [t["turn"] for t in card["annotated_conversation"]] == list(range(1, 8))
+    assert card["scores"] == SCORES["scores"] and '"comment": "t7"' in llm["reduce"][0]
+
+
+def test_stored_annotations_are_not_redone(llm):
+    stored = {"0": [{"turn": 1, "feedback": None}, {"turn": 2, "feedback": None}, {"turn": 3, "feedback": None}]}
+    card = asyncio.run(ai_service.nets_scorecard_chunked(_messages(5), "raise", "boss", stored))
+    assert llm["windows"] == [[4, 5]]
+    assert [t["turn"] for t in card["annotated_conversation"]] == [1, 2, 3, 4, 5]
+
+
+def test_stream_leads_with_annotations_and_validates(llm):
+    async def collect():
+        return [e async for e in ai_service.nets_scorecard_chunked_stream(_messages(2), "raise", "boss")]
+    events = asyncio.run(collect())
+    assert events[0]["section"] == "annotated_conversation" and len(events[0]["value"]) == 2
+    final = events[-1]
+    assert final["result"]["annotated_conversation"] == events[0]["value"] and final["validation"]["missing"] == []
+
+
+def test_concurrent_scorecards_do_not_share_annotations(llm):
+    async def go():
+        return await asyncio.gather(
+            ai_service.nets_scorecard_chunked(_messages(2), "raise", "boss", {"0": [{"turn": 1, "feedback": None}]}),
+            ai_service.nets_scorecard_chunked(_messages(2), "raise", "boss", {"0": [{"turn": 1, "feedback": None}]}),
+        )
+    first, second = asyncio.run(go())
+    assert len(llm["reduce"]) == 1 and first == second and first is not second
+    first["annotated_conversation"].append("edit")
+    assert second["annotated_conversation"] == [{"turn": 1, "feedback": None}]
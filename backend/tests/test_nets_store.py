@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+import nets_store
+from history import nets_messages
+from nets_store import NetsHotStore, nets_sessions_col
+
+
+def _start(store, sid="n1"):
+    doc = {"session_id": sid, "status": "active", "message_count": 0, "last_message": None}
+    nets_sessions_col.insert_one(dict(doc))
+    store.put({**doc, "org_id": "default", "messages": []})
+
+
+def test_turns_are_buffered_until_flush():
+    store = NetsHotStore(enabled=True)
+    _start(store)
+    store.append("n1", [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}])
+    assert store.get("n1")["messages"][-1]["content"] == "b"
+    assert nets_messages.all("n1") == []
+    store.flush()
+    assert [m["content"] for m in nets_messages.all("n1")] == ["a", "b"]
+    doc = nets_sessions_col.find_one({"session_id": "n1"})
+    assert doc["message_count"] == 2 and doc["last_message"]["content"] == "b"
+
+
+def test_nested_sets_collapse_into_parent():
+    store = NetsHotStore(enabled=True)
+    _start(store)
+    store.set_fields("n1", {"scorecard.a": 1})
+    store.set_fields("n1", {"scorecard": {"a": 1}})
+    store.set_fields("n1", {"scorecard.b": 2})
+    store.flush()
+    assert nets_sessions_col.find_one({"session_id": "n1"})["scorecard"] == {"a": 1, "b": 2}
+
+
+def test_failed_flush_requeues_ahead_of_newer_turns():
+    store = NetsHotStore(enabled=True)
+    _start(store)
+    store.append("n1", [{"content": "1"}])
+    store._write = lambda items: (_ for _ in ()).throw(RuntimeError("down"))
+    with pytest.raises(RuntimeError):
+        store.flush()
+    del store._write
+    store.append("n1", [{"content": "2"}])
+    store.flush()
+    assert [m["content"] for m in nets_messages.all("n1")] == ["1", "2"]
+
+
+def test_lru_eviction_is_flushed_by_the_write_behind_tick(monkeypatch):
+    monkeypatch.setattr(nets_store, "NETS_HOT_MAX_SESSIONS", 1)
+    store = NetsHotStore(enabled=True)
+    _start(store, "n1")
+    store.append("n1", [{"content": "x"}])
+    _start(store, "n2")  # no Mongo write on the caller's thread
+    assert list(store.sessions) == ["n2"] and list(store.evicting) == ["n1"]
+    assert nets_messages.all("n1") == []
+    asyncio.run(store.tick())
+    assert store.evicting == {} and [m["content"] for m in nets_messages.all("n1")] == ["x"]
+
+
+def test_evicted_session_is_served_until_its_turns_land(monkeypatch):
+    monkeypatch.setattr(nets_store, "NETS_HOT_IDLE_SECONDS", -1)
+    store = NetsHotStore(enabled=True)
+    _start(store)
+    store.append("n1", [{"content": "1"}])
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(items):
+        writing.set()
+        release.wait(2)
+        write(items)
+    store._write = slow_write
+
+    async def go():
+        tick = asyncio.create_task(store.tick())
+        await asyncio.to_thread(writing.wait, 2)
+        # Mid-flush: the session is still served from memory, with its unflushed turn
+        store.append("n1", [{"content": "2"}])
+        release.set()
+        await tick
+    asyncio.run(go())
+    del store._write
+    assert [m["content"] for m in store.get("n1")["messages"]] == ["1", "2"]
+    store.flush()
+    assert [m["content"] for m in nets_messages.all("n1")] == ["1", "2"]
+    assert nets_sessions_col.find_one({"session_id": "n1"})["message_count"] == 2
+
+
+def test_write_through_when_disabled():
+    store = NetsHotStore(enabled=False)
+    _start(store)
+    store.append("n1", [{"content": "x"}])
+    assert nets_sessions_col.find_one({"session_id": "n1"})["message_count"] == 1
@@ -0,0 +1,87 @@
+import asyncio
+import marshal
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import profiling
+from profiling import LoopMonitor, Profiler, ProfilingMiddleware, admin_only
+
+
+@pytest.fixture
+def prof(monkeypatch):
+    p = Profiler()
+    monkeypatch.setattr(profiling, "profiler", lambda: p)
+    return p
+
+
+@pytest.fixture
+def client(prof):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/api/work")
+    async def work():
+        return {"ok": sum(range(1000))}
+
+    @app.get("/api/other")
+    def other():
+        time.sleep(0.03)
+        return {}
+
+    @app.get("/admin", dependencies=[admin_only])
+    def admin():
+        return {"pid": 1}
+
+    return TestClient(app)
+
+
+def test_admin_token(client, monkeypatch):
+    assert client.get("/admin").status_code == 403
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin", headers={"X-Admin-Token": "nope"}).status_code == 401
+    assert client.get("/admin", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_cprofile_matching_requests_up_to_the_limit(client, prof):
+    prof.start("^/api/work", "cprofile", 1.0, 60, 2)
+    for path in ("/api/other", "/api/work", "/api/work", "/api/work"):
+        assert client.get(path).status_code == 200
+    listed = prof.listing()
+    assert [(p["path"], p["status"], p["format"]) for p in listed] == [("/api/work", 200, "prof")] * 2
+    stats = marshal.loads(prof.get(listed[0]["id"])["data"])
+    assert any(name == "work" for (_, _, name) in stats)
+    assert prof.status() == {"enabled": False} and not prof.busy
+
+
+def test_sampler_sees_threadpool_handlers(client, prof):
+    prof.start("/api/other", "sample", 1.0, 60, 1)
+    client.get("/api/other")
+    [p] = prof.listing()
+    assert p["format"] == "folded" and b"other (test_profiling.py" in prof.get(p["id"])["data"]
+
+
+def test_expired_window_stops_profiling(client, prof):
+    prof.start(".*", "sample", 1.0, -1, 10)
+    client.get("/api/work")
+    assert prof.listing() == [] and prof.config is None
+
+
+def test_loop_monitor_captures_blocking_call(monkeypatch):
+    monkeypatch.setattr(profiling, "LOOP_MONITOR_INTERVAL_MS", 10)
+    monitor = LoopMonitor()
+
+    def blocking_handler():
+        time.sleep(0.2)
+
+    async def scenario():
+        monitor.start(threshold_ms=50)
+        await asyncio.sleep(0.05)
+        blocking_handler()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(scenario())
+    stats = monitor.stats()
+    assert len(stats["stalls"]) == 1 and "blocking_handler" in stats["stalls"][0]["stack"]
+    assert stats["stalls"][0]["blocked_ms"] >= 50 and stats["lag_ms"]["max"] >= 100 and not stats["enabled"]
@@ -0,0 +1,62 @@
+import rollups
+from rollups import get_rollups, on_case_change, on_goal_change, rebuild, refresh_team
+
+users = rollups.users_col
+
+
+def _user(uid, team, overall, role="employee", trends=None):
+    users.insert_one({"user_id": uid, "team": team, "role": role, "scores": {"overall": overall}, "trends": trends or {}})
+
+
+def test_team_and_org_averages():
+    _user("a", "red", 80, trends={"overall": "up"})
+    _user("b", "red", 60, role="supervisor")
+    _user("c", "blue", 70, trends={"overall": "up"})
+    refresh_team("red")
+    refresh_team("blue")
+    r = get_rollups()
+    assert [t["team"] for t in r["teams"]] == ["blue", "red"]
+    assert r["teams"][1]["avg_scores"]["overall"] == 70.0 and r["teams"][1]["employees"] == 1
+    assert r["org"]["headcount"] == 3 and r["org"]["avg_scores"]["overall"] == 70.0
+    assert r["org"]["trends"] == {"overall": {"up": 2}}
+    users.delete_many({"team": "blue"})
+    refresh_team("blue")
+    assert [t["team"] for t in get_rollups()["teams"]] == ["red"] and get_rollups()["org"]["headcount"] == 2
+
+
+def test_counters_follow_transitions():
+    case = {"status": "open", "current_level": 1}
+    on_case_change(None, case)
+    escalated = {**case, "current_level": 2}
+    on_case_change(case, escalated)
+    on_case_change(None, {"status": "open", "current_level": 1})
+    on_case_change(escalated, {**escalated, "status": "resolved"})
+    assert get_rollups()["cases"] == {"open_total": 1, "open_by_level": {"1": 1, "2": 0}}
+    goal = {"status": "active", "progress": 40}
+    on_goal_change(None, goal)
+    on_goal_change(None, {"status": "active", "progress": 100})
+    on_goal_change(goal, {"status": "completed", "progress": 100})
+    goals = get_rollups()["goals"]
+    assert goals["total"] == 2 and goals["active"] == 1 and goals["completion_rate"] == 1.0 and goals["avg_active_progress"] == 100.0
+
+
+def test_rebuild_matches_incremental():
+    _user("a", "red", 90)
+    rollups.critical_cases_col.insert_many([{"status": "open", "current_level": 3}, {"status": "resolved", "current_level": 1}])
+    rollups.coaching_goals_col.insert_one({"status": "active", "progress": 50})
+    rollups.surveys_col.insert_many([{"status": "active"}, {"status": "draft"}])
+    rebuild()
+    r = get_rollups()
+    assert r["cases"]["open_total"] == 1 and r["goals"]["avg_active_progress"] == 50.0
+    assert r["surveys"] == {"active": 1, "draft": 1} and r["org"]["avg_scores"]["overall"] == 90.0
+    rebuild()
+    again = get_rollups()
+    assert (again["cases"], again["goals"], again["surveys"]) == (r["cases"], r["goals"], r["surveys"])
+
+
+def test_built_once_per_org(mongo):
+    _user("a", "red", 90)
+    rollups.ensure_built()
+    users.delete_many({})
+    rollups.ensure_built()
+    assert get_rollups()["org"]["headcount"] == 1
@@ -0,0 +1,19 @@
+import os
+import runtime
+from runtime import process_local, share_of
+
+
+def test_process_local_builds_once_per_process(monkeypatch):
+    made = []
+    get = process_local(lambda: made.append(1) or object())
+    assert get() is get() and len(made) == 1
+    monkeypatch.setattr(os, "getpid", lambda: -1)  # as if forked
+    assert len({id(get()), id(get())}) == 1 and len(made) == 2
+
+
+def test_budget_split_across_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("MONGO_POOL_BUDGET", "100")
+    assert runtime.worker_count() == 4 and share_of("MONGO_POOL_BUDGET", 10) == 25
+    monkeypatch.setenv("WEB_CONCURRENCY", "0")
+    assert runtime.worker_count() == 1 and share_of("UNSET_BUDGET_XYZ", 3) == 3
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+import score_history
+from score_history import directions, ensure_baseline, points, record, record_analysis, trends
+
+USER = {"user_id": "emp-001", "scores": {"overall": 78, "communication": 80}}
+
+
+def _ago(days: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+def test_baseline_recorded_even_after_analysis_points():
+    record_analysis({"leadership_score": 7, "effectiveness_score": 8}, "emp-001", "tl-001")
+    ensure_baseline(USER)
+    record("emp-001", {"overall": 90}, "update")
+    assert [p["source"] for p in points("emp-001")] == ["one_on_one", "baseline", "update"]
+    assert directions("emp-001") == {"overall": "up", "communication": "stable"}
+
+
+def test_baseline_only_fills_missing_dimensions():
+    record("emp-001", {"overall": 70}, "update")
+    ensure_baseline(USER)
+    baseline = [p for p in points("emp-001") if p["source"] == "baseline"]
+    assert [b["scores"] for b in baseline] == [{"communication": 80.0}]
+    ensure_baseline(USER)
+    assert len(points("emp-001")) == 2
+
+
+def test_analysis_scores_go_to_the_right_person():
+    record_analysis({"leadership_score": 6, "effectiveness_score": 9}, "emp-001", "tl-001", ref="s1")
+    assert [p["scores"] for p in points("emp-001")] == [{"effectiveness_score": 9.0}]
+    assert [p["scores"] for p in points("tl-001")] == [{"leadership_score": 6.0}]
+    record_analysis({"leadership_score": 6, "effectiveness_score": 9}, "emp-002")
+    assert all("leadership_score" not in p["scores"] for p in points("emp-002"))
+
+
+def test_slope_and_window(monkeypatch):
+    monkeypatch.setattr(score_history, "SCORE_HISTORY_BUCKET_SIZE", 2)
+    for days, value in ((200, 10), (60, 70), (30, 75), (0, 80)):
+        record("u", {"overall": value}, "update", ts=_ago(days))
+    overall = trends("u", days=90)["metrics"]["overall"]
+    assert overall["points"] == 3 and overall["first"] == 70 and overall["per_30d"] == 5.0 and overall["direction"] == "up"
+    assert len(points("u")) == 4 and len(points("u", since=_ago(45))) == 2
+
+
+def test_non_numeric_values_are_dropped():
+    record("u", {"overall": None, "flag": True, "x": "7"}, "update")
+    assert points("u") == []
+
+
+def test_feedback_then_update_trends_up(client, monkeypatch):
+    import server
+
+    async def fake_analysis(*args, **kwargs):
+        return {"supervisor_summary": "s", "leadership_score": 7, "effectiveness_score": 8}
+    monkeypatch.setattr(server, "analyze_one_on_one", fake_analysis)
+    assert client.post("/api/one-on-one/feedback", json={"employee_id": "emp-001", "employee_name": "Alex"}).json()["status"] == "completed"
+    user = client.put("/api/users/emp-001/scores", json={"scores": {"overall": 90}}).json()
+    assert user["trends"]["overall"] == "up"
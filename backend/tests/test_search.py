@@ -0,0 +1,66 @@
+import os
+import pytest
+import db
+import history
+import search
+from search import highlight, search as run_search
+
+SESSION = {"session_id": "s1", "employee_id": "e1", "score": 2.0,
+           "detailed_notes": "Raised burnout privately", "transcript": "We talked about workload and burnout."}
+CASE = {"case_id": "c1", "employee_id": "e1", "current_level": 4, "score": 1.0,
+        "insight": {"summary": "Burnout risk", "reason_for_criticality": "burnout plus attrition"},
+        "timeline": [{"response": "Escalated burnout case"}]}
+
+
+@pytest.fixture
+def canned(monkeypatch):
+    monkeypatch.setattr(search, "_query", lambda col, kind, q, scope, window: [(kind, dict(SESSION if kind == "sessions" else CASE))])
+    monkeypatch.setattr(search, "_query_timelines", lambda q, scope, window, cases: cases)
+
+
+def test_highlight_marks_terms_and_trims():
+    long = "x " * 100 + "burnout detected early" + " y" * 100
+    [s] = highlight({"notes": long, "other": "nothing"}, ["other", "notes"], ["burn"])
+    assert s["field"] == "notes" and "<mark>burnout</mark>" in s["snippet"]
+    assert s["snippet"].startswith("…") and s["snippet"].endswith("…")
+    assert highlight({"a": {"b": [{"c": "Burnout"}]}}, ["a.b.c"], ["burnout"])[0]["snippet"] == "<mark>Burnout</mark>"
+    assert highlight({"notes": long}, ["notes"], []) == []
+
+
+def test_scope_by_role():
+    assert search._scope("employee", "e1", "sessions") == {"employee_id": "e1"}
+    assert search._scope("am", "a1", "cases") == {"current_level": {"$gte": 3}}
+    assert search._scope("am", "a1", "sessions") == {} and search._scope("admin", "x", "cases") == {}
+
+
+def test_employee_sees_only_their_fields(canned):
+    results = run_search("burnout", "employee", "e1")["results"]
+    by_type = {r["type"]: r for r in results}
+    assert [h["field"] for h in by_type["sessions"]["highlights"]] == ["transcript"]
+    assert [h["field"] for h in by_type["cases"]["highlights"]] == ["insight.summary", "timeline.response"]
+    assert [r["type"] for r in results] == ["sessions", "cases"]
+    assert run_search("privately", "employee", "e1")["results"] == []
+    assert [r["type"] for r in run_search("privately", "supervisor", "s")["results"]] == ["sessions"]
+
+
+def test_paging(canned):
+    first = run_search("burnout", "admin", page_size=1)
+    assert first["has_more"] and [r["type"] for r in first["results"]] == ["sessions"]
+    second = run_search("burnout", "admin", page=2, page_size=1)
+    assert not second["has_more"] and [r["case_id"] for r in second["results"]] == ["c1"]
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="set TEST_MONGO_URL for $text queries")
+def test_text_search_against_mongo(monkeypatch):
+    from pymongo import MongoClient
+    client = MongoClient(os.environ["TEST_MONGO_URL"])
+    client.drop_database(os.environ["DB_NAME"])
+    monkeypatch.setattr(db, "get_client", lambda: client)
+    search.ensure_indexes()
+    history.ensure_indexes()
+    search.sessions_col.insert_one({"session_id": "s1", "employee_id": "e1", "transcript": "burnout and workload"})
+    search.critical_cases_col.insert_one({"case_id": "c1", "employee_id": "e1", "current_level": 1, "insight": {"summary": "calm"}})
+    search.case_timeline.append("c1", [{"response": "burnout follow-up"}])
+    results = run_search("burnout", "employee", "e1")["results"]
+    assert {r["type"] for r in results} == {"sessions", "cases"}
+    assert run_search("burnout", "employee", "e2")["results"] == []
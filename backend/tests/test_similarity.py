@@ -0,0 +1,74 @@
+import pytest
+import similarity
+from similarity import HashedTfidfIndex, match_goal, note_goal, novel_insights, relevant_sessions
+
+
+@pytest.fixture(autouse=True)
+def fresh_scopes():
+    similarity._scopes().clear()
+
+
+def test_index_ranks_by_overlap_and_filters():
+    index = HashedTfidfIndex(dim=1024)
+    index.add("a", "improve presentation skills for client meetings", {"team": "red"})
+    index.add("b", "reduce code review turnaround time", {"team": "blue"})
+    index.add("c", "presentation skills", {"team": "blue"})
+    hits = index.query("presentation skills", k=2)
+    assert [h[0] for h in hits] == ["c", "a"] and hits[0][1] == pytest.approx(1.0)
+    assert [h[0] for h in index.query("presentation skills", where=lambda m: m["team"] == "red")] == ["a"]
+    index.remove("c")
+    assert index.query("the and of") == [] and "c" not in {h[0] for h in index.query("presentation")}
+
+
+def test_goal_dedup_sees_open_goals_and_new_notes():
+    similarity.coaching_goals_col.insert_many([
+        {"goal_id": "g1", "user_id": "u", "title": "Improve stakeholder communication", "status": "active"},
+        {"goal_id": "g2", "user_id": "u", "title": "Learn Kubernetes", "status": "completed"},
+    ])
+    assert match_goal("u", "Improve stakeholder communication") == "g1"
+    assert match_goal("u", "Learn Kubernetes") is None
+    assert match_goal("u", "Ship the billing migration") is None
+    note_goal({"goal_id": "g3", "user_id": "u", "title": "Ship the billing migration", "status": "pending"})
+    assert match_goal("u", "Ship the billing migration") == "g3"
+
+
+def test_novel_insights_drop_repeats_within_and_across_batches():
+    similarity.insights_col.insert_one({"user_id": "u", "insight": "Schedule regular feedback with your team"})
+    fresh = novel_insights("u", ["Schedule regular feedback with your team", "Delegate code reviews", "Delegate code reviews"])
+    assert fresh == ["Delegate code reviews"]
+
+
+def test_relevant_sessions_keep_latest_first():
+    similarity.sessions_col.insert_many([
+        {"session_id": "s1", "employee_id": "e", "status": "completed", "date": "2026-01-01", "detailed_notes": "burnout and workload concerns"},
+        {"session_id": "s2", "employee_id": "e", "status": "completed", "date": "2026-02-01", "detailed_notes": "promotion path discussion"},
+        {"session_id": "s3", "employee_id": "e", "status": "completed", "date": "2026-03-01", "detailed_notes": "sprint planning"},
+        {"session_id": "s4", "employee_id": "e", "status": "upcoming", "date": "2026-04-01", "detailed_notes": "workload"},
+    ])
+    assert [s["session_id"] for s in relevant_sessions("e", "workload burnout", k=2)] == ["s3", "s1"]
+    assert relevant_sessions("nobody", "x") == []
+
+
+def test_feedback_recommendations_go_to_the_sessions_supervisor(client, monkeypatch):
+    import server
+    rec = {"title": "Run structured retrospectives", "description": "Hold a retro every sprint"}
+
+    async def fake_analysis(*args, **kwargs):
+        return {"supervisor_summary": "s", "coaching_recommendations": [rec]}
+    monkeypatch.setattr(server, "analyze_one_on_one", fake_analysis)
+    as_tl2 = {"X-User-Id": "tl-002"}  # admission buckets are per user and per process
+    sid = client.post("/api/one-on-one/sessions", json={"supervisor_id": "tl-002", "supervisor_name": "Riley", "employee_id": "emp-002"}).json()["session_id"]
+    similarity.coaching_goals_col.insert_one({"goal_id": "tl1-retro", "user_id": "tl-001", "title": rec["title"], "status": "active"})
+
+    client.post("/api/one-on-one/feedback", json={"session_id": sid, "employee_id": "emp-002", "employee_name": "Jordan"}, headers=as_tl2)
+    [goal] = similarity.coaching_goals_col.find({"title": rec["title"], "user_id": "tl-002"})
+    assert goal["status"] == "pending"
+    assert similarity.coaching_goals_col.find_one({"goal_id": "tl1-retro"}).get("recommendation_count") is None
+
+    client.post("/api/one-on-one/feedback", json={"session_id": sid, "employee_id": "emp-002", "employee_name": "Jordan"}, headers=as_tl2)
+    assert similarity.coaching_goals_col.count_documents({"title": rec["title"], "user_id": "tl-002"}) == 1
+    assert similarity.coaching_goals_col.find_one({"goal_id": goal["goal_id"]})["recommendation_count"] == 1
+
+    adhoc = client.post("/api/one-on-one/feedback", json={"employee_id": "emp-003", "employee_name": "Sam"},
+                        headers={"X-User-Id": "tl-003"}).json()["session_id"]
+    assert client.get(f"/api/one-on-one/sessions/{adhoc}").json()["supervisor_id"] == "tl-001"
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from singleflight import call_key, coalesced, do
+
+
+def test_identical_calls_share_one_run():
+    runs = []
+
+    @coalesced
+    async def fetch(x):
+        runs.append(x)
+        await asyncio.sleep(0.01)
+        return {"x": x}
+
+    async def go():
+        return await asyncio.gather(fetch(1), fetch(1), fetch(2))
+    a, b, c = asyncio.run(go())
+    assert a == b == {"x": 1} and c == {"x": 2} and a is not b
+    assert sorted(runs) == [1, 2]
+
+
+def test_leader_edits_do_not_reach_waiters():
+    @coalesced
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return {"items": [1]}
+
+    async def leader():
+        result = await fetch()
+        result["items"].append("leader")
+        result["extra"] = True
+        return result
+
+    async def waiter():
+        await asyncio.sleep(0)
+        result = await fetch()
+        await asyncio.sleep(0)
+        return result
+
+    async def go():
+        return await asyncio.gather(leader(), waiter())
+    led, waited = asyncio.run(go())
+    assert led == {"items": [1, "leader"], "extra": True} and waited == {"items": [1]}
+
+
+def test_ignored_fields_do_not_split_the_key():
+    one = call_key("f", ({"text": "t", "submitted_at": "1"},), {}, ("submitted_at",))
+    two = call_key("f", ({"text": "t", "submitted_at": "2"},), {}, ("submitted_at",))
+    assert one == two
+    assert call_key("f", ({"text": "t", "submitted_at": "1"},), {}) != call_key("f", ({"text": "t", "submitted_at": "2"},), {})
+
+
+def test_cancelled_leader_hands_over_to_waiters():
+    runs = []
+
+    async def factory():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def go():
+        leader = asyncio.create_task(do("k", factory))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(do("k", factory)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+    assert asyncio.run(go()) == ["ok"] * 3
+    assert len(runs) == 2  # the cancelled leader and one successor
+
+
+def test_leader_error_is_retried_once_by_waiters():
+    outcomes = iter([RuntimeError("first"), "ok"])
+
+    async def factory():
+        await asyncio.sleep(0.01)
+        out = next(outcomes)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    async def go():
+        leader = asyncio.create_task(do("k", factory))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(do("k", factory)) for _ in range(2)]
+        results = await asyncio.gather(leader, *waiters, return_exceptions=True)
+        return [type(r).__name__ if isinstance(r, Exception) else r for r in results]
+    assert asyncio.run(go()) == ["RuntimeError", "ok", "ok"]
+
+
+def test_waiters_give_up_after_second_failure():
+    async def factory():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def go():
+        leader = asyncio.create_task(do("k", factory))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(do("k", factory))
+        return await asyncio.gather(leader, waiter, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(go()))
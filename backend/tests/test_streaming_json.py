@@ -0,0 +1,36 @@
+import json
+from streaming_json import SectionParser, check_sections
+
+DOC = {"summary": 'a "quoted", {brace} [x]', "scores": {"x": [1, 2]}, "items": [{"k": "v"}], "n": 3}
+
+
+def _feed(text: str, size: int) -> list:
+    parser, out = SectionParser(), []
+    for i in range(0, len(text), size):
+        out += parser.feed(text[i:i + size])
+    return out
+
+
+def test_sections_close_in_order_for_any_chunking():
+    text = "Sure, here it is:\n```json\n" + json.dumps(DOC) + "\n```"
+    for size in (1, 3, 7, len(text)):
+        assert _feed(text, size) == list(DOC.items())
+
+
+def test_section_emitted_as_soon_as_it_closes():
+    parser = SectionParser()
+    assert parser.feed('{"a": [1, 2') == []
+    assert parser.feed('], "b": ') == [("a", [1, 2])]
+    assert parser.feed('"x"}') == [("b", "x")]
+    assert parser.done and parser.feed(', "c": 1}') == []
+
+
+def test_unparseable_member_is_dropped():
+    parser = SectionParser()
+    assert parser.feed('{"a": nope, "b": 2}') == [("b", 2)]
+
+
+def test_check_sections():
+    schema = {"summary": str, "score": (int, float), "items": list}
+    assert check_sections({"summary": "s", "score": "7"}, schema) == {"missing": ["items"], "invalid": ["score"]}
+    assert check_sections(None, schema) == {"missing": ["items", "score", "summary"], "invalid": []}
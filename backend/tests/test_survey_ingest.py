@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+import survey_ingest
+from survey_ingest import IngestBuffer, InvalidResponse, build_response, surveys_col, survey_responses_col, validate
+
+ANSWER = [[{"question_index": 0, "answer": 4}]]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    survey_ingest._surveys().clear()
+
+
+def _survey(status="active"):
+    surveys_col.insert_one({"survey_id": "s1", "status": status, "questions": [{"question": "How are you?"}]})
+
+
+def test_validate_rejects_unknown_and_out_of_range():
+    _survey()
+    with pytest.raises(InvalidResponse) as e:
+        validate("s1", [[{"question_index": 3, "answer": 1}], [{"question": "nope", "answer": 1}], []])
+    assert [err["error"] for err in e.value.errors] == ["question_index out of range", "unknown question", "responses must be a non-empty list"]
+    assert validate("s1", [[{"question": "How are you?", "answer": 5}]])
+
+
+def test_draft_is_not_cached_so_deploy_takes_effect():
+    _survey("draft")
+    with pytest.raises(InvalidResponse):
+        validate("s1", ANSWER)
+    surveys_col.update_one({"survey_id": "s1"}, {"$set": {"status": "active"}})
+    assert validate("s1", ANSWER)
+
+
+def test_forget_evicts_active_survey():
+    _survey()
+    validate("s1", ANSWER)
+    surveys_col.update_one({"survey_id": "s1"}, {"$set": {"status": "closed"}})
+    validate("s1", ANSWER)  # still cached
+    survey_ingest.forget("s1")
+    with pytest.raises(InvalidResponse):
+        validate("s1", ANSWER)
+
+
+def test_concurrent_submissions_commit_together(monkeypatch):
+    monkeypatch.setattr(survey_ingest, "INGEST_FLUSH_MS", 20)
+    calls = []
+    insert_many = survey_responses_col.insert_many
+
+    def counting(docs, **kwargs):
+        calls.append(len(docs))
+        return insert_many(docs, **kwargs)
+    monkeypatch.setattr(survey_responses_col, "insert_many", counting, raising=False)
+
+    async def go():
+        buf = IngestBuffer()
+        return await asyncio.gather(*(buf.submit([build_response("s1", a)]) for a in ANSWER * 5))
+    results = asyncio.run(go())
+    assert len(results) == 5 and calls == [5]
+    assert survey_responses_col.count_documents({"survey_id": "s1"}) == 5
+
+
+def test_buffer_refuses_past_limit(monkeypatch):
+    monkeypatch.setattr(survey_ingest, "INGEST_BUFFER_MAX", 1)
+
+    async def go():
+        with pytest.raises(survey_ingest.BufferFull):
+            await IngestBuffer().submit([build_response("s1", a) for a in ANSWER * 2])
+    asyncio.run(go())
+
+
+def test_respond_right_after_deploy(client):
+    _survey("draft")
+    body = {"survey_id": "s1", "responses": [{"question_index": 0, "answer": 3}]}
+    refused = client.post("/api/surveys/s1/respond", json=body)
+    assert refused.status_code == 422 and refused.json()["detail"]["errors"] == [{"error": "survey is not accepting responses"}]
+    client.put("/api/surveys/s1/deploy", json={})
+    assert client.post("/api/surveys/s1/respond", json=body).status_code == 200
+    assert client.post("/api/surveys/s1/respond/bulk", json={"submissions": [body["responses"]]}).json()["accepted"] == 1
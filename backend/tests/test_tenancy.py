@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import db
+import tenancy
+from db import LazyCollection, backfill_org_ids, get_db
+from tenancy import OrgMiddleware, using
+
+ROUTES = {"acme": "laddrr_acme", "globex": "mongodb://shard-b:27017/laddrr_globex?w=majority", "initech": "laddrr_acme"}
+col = LazyCollection("things")
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_ROUTES", ROUTES)
+
+
+def test_route_and_placements(routes):
+    assert tenancy.route("other") == (None, "test_database")
+    assert tenancy.route("acme") == (None, "laddrr_acme")
+    assert tenancy.route("globex") == ("mongodb://shard-b:27017/laddrr_globex?w=majority", "laddrr_globex")
+    assert tenancy.placements() == ["default", "acme", "globex"]
+
+
+def test_orgs_are_isolated_within_a_database():
+    with using("a"):
+        col.insert_one({"n": 1})
+        col.insert_many([{"n": 2}])
+    with using("b"):
+        col.insert_one({"n": 3})
+        assert [d["n"] for d in col.find()] == [3]
+        assert col.delete_many({}).deleted_count == 1
+        assert list(col.aggregate([{"$project": {"_id": 0, "n": 1}}])) == []
+    with using("a"):
+        assert col.count_documents({}) == 2 and col.distinct("n") == [1, 2]
+        assert tenancy.marker("rollups") == "rollups:a"
+    assert tenancy.marker("rollups") == "rollups"
+
+
+def test_routed_org_lands_in_its_database(routes, mongo):
+    with using("acme"):
+        col.insert_one({"n": 1})
+        assert get_db().name == "laddrr_acme"
+    assert mongo["things"].count_documents({}) == 0
+    assert db.get_client()["laddrr_acme"]["things"].count_documents({"org_id": "acme"}) == 1
+
+
+def test_backfill_stamps_default_org_once(mongo):
+    mongo["things"].insert_one({"n": 1})
+    backfill_org_ids()
+    assert col.count_documents({"n": 1}) == 1
+    mongo["things"].insert_one({"n": 2})
+    backfill_org_ids()
+    assert col.count_documents({}) == 1
+
+
+def test_middleware_binds_org():
+    app = FastAPI()
+    app.add_middleware(OrgMiddleware)
+
+    @app.get("/org")
+    async def current():
+        await asyncio.sleep(0)
+        return {"org": tenancy.org_id()}
+
+    client = TestClient(app)
+    assert client.get("/org").json() == {"org": "default"}
+    assert client.get("/org", headers={"X-Org-Id": "acme"}).json() == {"org": "acme"}
+    assert client.get("/org?org_id=globex").json() == {"org": "globex"}
+    assert client.get("/org", headers={"X-Org-Id": "bad org!"}).status_code == 400
+
+
+def test_history_migration_runs_per_database(routes):
+    import history
+    history.migrate_embedded()  # default database done
+    acme = db.get_client()["laddrr_acme"]
+    acme["critical_cases"].insert_one({"case_id": "c1", "org_id": "acme", "timeline": [{"action": "a"}]})
+    with using("acme"):
+        history.migrate_embedded()
+        assert [e["action"] for e in history.case_timeline.all("c1")] == ["a"]
+    assert acme["meta"].find_one({"_id": "history_buckets:acme"})
+
+
+@pytest.fixture
+def local_routes(monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_ROUTES", {"acme": "laddrr_acme"})
+
+
+def test_startup_seeds_routed_tenant_databases(local_routes, client):
+    acme = db.get_client()["laddrr_acme"]
+    assert acme["users"].count_documents({"org_id": "acme"}) > 0
+    assert acme["meta"].find_one({"_id": "seed:acme"})
+    assert client.get("/api/users", headers={"X-Org-Id": "acme"}).json()
@@ -233,6 +233,27 @@ class AccountabilityOSAPITester:
         
         return success and isinstance(nomination, dict) and "nomination_id" in nomination
 
+    def test_read_your_writes(self):
+        """Mutations pin the client to the primary so its next list read includes the write"""
+        client = requests.Session()
+        goal_data = {"title": "RYW Goal", "description": "Read-your-writes check", "source": "custom"}
+        try:
+            created = client.post(f"{self.base_url}/api/coaching/goals", json=goal_data, timeout=10)
+            pinned = "ryw_until" in client.cookies
+            self.log_test("Mutation sets read-your-writes cookie", created.status_code == 200 and pinned,
+                          f"status {created.status_code}, cookie {'set' if pinned else 'missing'}")
+            goal_id = created.json().get("goal_id")
+            goals = client.get(f"{self.base_url}/api/coaching/goals", timeout=10).json()
+            found = any(g.get("goal_id") == goal_id for g in goals)
+            self.log_test("List read after write sees the write", found, "created goal missing from list")
+
+            listed = requests.get(f"{self.base_url}/api/coaching/goals", timeout=10)
+            self.log_test("Reads do not set read-your-writes cookie", "ryw_until" not in listed.cookies)
+            return pinned and found
+        except Exception as e:
+            self.log_test("Read-your-writes", False, f"Error: {str(e)}")
+            return False
+
     def run_all_tests(self):
         """Run all backend tests"""
         print("🚀 Starting AccountabilityOS Backend API Tests")
@@ -249,6 +270,7 @@ class AccountabilityOSAPITester:
             "nets_arena": self.test_nets_arena(),
             "kpi_frameworks": self.test_kpi_frameworks(),
             "nominations": self.test_nominations(),
+            "read_your_writes": self.test_read_your_writes(),
         }
 
         print("-" * 60)
@@ -271,7 +293,8 @@ class AccountabilityOSAPITester:
         }
 
 def main():
-    tester = AccountabilityOSAPITester()
+    # e.g. python backend_test.py http://localhost:8001 (against a local replica set)
+    tester = AccountabilityOSAPITester(*sys.argv[1:2])
     results = tester.run_all_tests()
     
     # Return appropriate exit code
@@ -86,7 +86,7 @@ function CoachingFeedbackModal({ goal, onClose }) {
   const [feedback, setFeedback] = useState(null);
   const [loading, setLoading] = useState(true);
   useEffect(() => {
-    api.getCoachingFeedback({ goal_description: goal.title + ' - ' + goal.description, situation: '', check_ins: goal.check_ins || [] })
+    api.getCoachingFeedback({ goal_description: goal.title + ' - ' + goal.description, situation: '', goal_id: goal.goal_id })
       .then(r => setFeedback(r.data)).catch(console.error).finally(() => setLoading(false));
   }, [goal]);
   return (
@@ -239,14 +239,12 @@ export default function CoachingHub() {
                           <Sparkles className="w-3 h-3 inline mr-1" />AI Coaching
                         </button>
                       </div>
-                      {g.check_ins?.length > 0 && (
+                      {g.latest_check_in && (
                         <div className="mt-3 pt-3 space-y-1" style={{ borderTop: '1px solid var(--border)' }}>
-                          <span className="text-xs font-semibold" style={{ color: 'var(--text-secondary)' }}>Recent Check-ins</span>
-                          {g.check_ins.slice(-3).reverse().map((c, i) => (
-                            <div key={i} className="text-xs flex items-center gap-2" style={{ color: 'var(--text-secondary)' }}>
-                              <Clock className="w-3 h-3" /> {c.progress}% - {c.notes || 'No notes'}
-                            </div>
-                          ))}
+                          <span className="text-xs font-semibold" style={{ color: 'var(--text-secondary)' }}>Latest Check-in ({g.check_in_count} total)</span>
+                          <div className="text-xs flex items-center gap-2" style={{ color: 'var(--text-secondary)' }}>
+                            <Clock className="w-3 h-3" /> {g.latest_check_in.progress}% - {g.latest_check_in.notes || 'No notes'}
+                          </div>
                         </div>
                       )}
                     </div>
@@ -104,6 +104,8 @@ function TeamMemberCard({ member }) {
   );
 }
 
+const demoUsers = { employee: 'emp-001', team_lead: 'tl-001', am: 'am-001', manager: 'mgr-001', hr_head: 'hr-001' };
+
 export default function Dashboard() {
   const { role } = useRole();
   const [data, setData] = useState(null);
@@ -111,7 +113,7 @@ export default function Dashboard() {
 
   useEffect(() => {
     setLoading(true);
-    api.getDashboard(role).then(r => setData(r.data)).catch(console.error).finally(() => setLoading(false));
+    api.getDashboard(role, demoUsers[role]).then(r => setData(r.data)).catch(console.error).finally(() => setLoading(false));
   }, [role]);
 
   if (loading) return (
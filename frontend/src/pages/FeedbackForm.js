@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import api, { newIdempotencyKey } from '../services/api';
 import { Loader2, CheckCircle, AlertTriangle, ArrowLeft, Send, TrendingUp, TrendingDown, Minus, ChevronDown, ChevronUp } from 'lucide-react';
 
 function AnalysisReport({ analysis }) {
@@ -165,6 +165,8 @@ export default function FeedbackForm() {
   const [employees, setEmployees] = useState([]);
   const [submitting, setSubmitting] = useState(false);
   const [analysis, setAnalysis] = useState(null);
+  const [deferred, setDeferred] = useState(false);
+  const submitKey = useRef(null);  // one per submission, kept across retries
   const [form, setForm] = useState({
     session_id: searchParams.get('session') || '',
     employee_id: searchParams.get('employee') || '',
@@ -189,14 +191,19 @@ export default function FeedbackForm() {
     }
   }, [form.session_id]);
 
-  const update = (key, val) => setForm(f => ({ ...f, [key]: val }));
+  const update = (key, val) => {
+    submitKey.current = null;  // an edited form is a new submission
+    setForm(f => ({ ...f, [key]: val }));
+  };
 
   const submit = async () => {
     if (!form.employee_id) return;
     setSubmitting(true);
     try {
-      const r = await api.submitFeedback(form);
+      submitKey.current = submitKey.current || newIdempotencyKey();
+      const r = await api.submitFeedback(form, submitKey.current);
       if (r.data.analysis) setAnalysis(r.data.analysis);
+      setDeferred(r.data.status === 'deferred');
     } catch (e) { console.error(e); }
     setSubmitting(false);
   };
@@ -329,6 +336,11 @@ export default function FeedbackForm() {
         style={{ background: 'var(--primary)' }}>
         {submitting ? <><Loader2 className="w-4 h-4 animate-spin" /> Analyzing with AI...</> : <><Send className="w-4 h-4" /> Submit & Analyze</>}
       </button>
+      {deferred && (
+        <p data-testid="feedback-deferred" className="text-xs text-center" style={{ color: 'var(--text-secondary)' }}>
+          Feedback saved. AI analysis is busy right now and will be completed automatically shortly.
+        </p>
+      )}
     </div>
   );
 }
@@ -6,7 +6,12 @@ import { MessageSquare, Loader2, Send, AlertTriangle, Clock, CheckCircle, Chevro
 function CaseCard({ case_item, onAction }) {
   const [expanded, setExpanded] = useState(false);
   const [responseText, setResponseText] = useState('');
+  const [timeline, setTimeline] = useState([]);
   const { role } = useRole();
+
+  useEffect(() => {
+    if (expanded) api.getCaseTimeline(case_item.case_id, { limit: 50 }).then(r => setTimeline(r.data.items.slice().reverse())).catch(() => {});
+  }, [expanded, case_item.case_id, case_item.timeline_count]);
   
   const statusColors = {
     pending_supervisor: '#F59E0B', pending_employee: '#0EA5E9', pending_am: '#8B5CF6',
@@ -56,10 +61,10 @@ function CaseCard({ case_item, onAction }) {
       {expanded && (
         <div className="px-4 pb-4 space-y-3" style={{ borderTop: '1px solid var(--border)' }}>
           {/* Timeline */}
-          {case_item.timeline?.length > 0 && (
+          {timeline.length > 0 && (
             <div className="pt-3 space-y-2">
               <h4 className="text-xs font-semibold uppercase tracking-widest" style={{ color: 'var(--text-secondary)' }}>Timeline</h4>
-              {case_item.timeline.map((t, i) => (
+              {timeline.map((t, i) => (
                 <div key={i} className="flex items-start gap-2 text-xs">
                   <Clock className="w-3 h-3 mt-0.5" style={{ color: 'var(--text-secondary)' }} />
                   <div>
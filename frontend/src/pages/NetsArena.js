@@ -150,7 +150,8 @@ export default function NetsArena() {
   const endSession = async () => {
     setEnding(true);
     try {
-      const r = await api.endNets({ session_id: sessionId });
+      // Keyed by session: retrying the end of the same session replays its scorecard
+      const r = await api.endNets({ session_id: sessionId }, `nets-end-${sessionId}`);
       setScorecard(r.data);
       setPhase('scorecard');
     } catch (e) { console.error(e); }
@@ -191,6 +192,7 @@ export default function NetsArena() {
             <div className="flex items-center gap-2">
               <Lightbulb className="w-4 h-4" style={{ color: '#F59E0B' }} />
               <span className="text-xs font-semibold" style={{ color: '#F59E0B' }}>Nudge</span>
+              {nudge.degraded && <span data-testid="nudge-degraded" className="text-xs" style={{ color: 'var(--text-secondary)' }}>{nudge.degraded.source === 'cache' ? '(earlier hint)' : '(quick tip, AI busy)'}</span>}
             </div>
             <button onClick={() => setNudge(null)}><X className="w-3.5 h-3.5" style={{ color: 'var(--text-secondary)' }} /></button>
           </div>
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react';
-import api from '../services/api';
+import React, { useState, useEffect, useRef } from 'react';
+import api, { newIdempotencyKey } from '../services/api';
 import { HeartPulse, Plus, Loader2, CheckCircle, Send, Sparkles, ChevronRight, X, BarChart3 } from 'lucide-react';
 
 export default function OrgHealth() {
@@ -8,6 +8,7 @@ export default function OrgHealth() {
   const [showCreate, setShowCreate] = useState(false);
   const [creating, setCreating] = useState(false);
   const [objective, setObjective] = useState('');
+  const createKey = useRef(null);  // one per survey creation, kept across retries
   const [selectedSurvey, setSelectedSurvey] = useState(null);
   const [analyzing, setAnalyzing] = useState(false);
   const [generatingPulse, setGeneratingPulse] = useState(false);
@@ -18,7 +19,9 @@ export default function OrgHealth() {
     if (!objective.trim()) return;
     setCreating(true);
     try {
-      const r = await api.createSurvey({ objective });
+      createKey.current = createKey.current || newIdempotencyKey();
+      const r = await api.createSurvey({ objective }, createKey.current);
+      createKey.current = null;
       setSurveys([...surveys, r.data]);
       setShowCreate(false);
       setObjective('');
@@ -192,7 +195,7 @@ export default function OrgHealth() {
           <div className="absolute inset-0 bg-black/50 backdrop-blur-sm" />
           <div data-testid="create-survey-modal" className="relative w-full max-w-md rounded-md p-6 animate-fade-in" style={{ background: 'var(--surface)', border: '1px solid var(--border)' }} onClick={e => e.stopPropagation()}>
             <h3 className="font-heading font-bold mb-4" style={{ color: 'var(--text)' }}>Create New Survey</h3>
-            <textarea data-testid="survey-objective" value={objective} onChange={e => setObjective(e.target.value)} rows={4}
+            <textarea data-testid="survey-objective" value={objective} onChange={e => { createKey.current = null; setObjective(e.target.value); }} rows={4}
               placeholder="What is the objective of this survey? e.g., 'Understand employee satisfaction with remote work policies'"
               className="w-full px-3 py-2 rounded-md text-sm resize-none" style={{ background: 'var(--bg)', color: 'var(--text)', border: '1px solid var(--border)' }} />
             <p className="text-xs mt-2" style={{ color: 'var(--text-secondary)' }}>AI will generate relevant questions based on your objective.</p>
@@ -1,9 +1,47 @@
 import axios from 'axios';
 
+const ORG_ID = process.env.REACT_APP_ORG_ID;
+
 const API = axios.create({
   baseURL: process.env.REACT_APP_BACKEND_URL,
+  headers: ORG_ID ? { 'X-Org-Id': ORG_ID } : {},
 });
 
+// Plain links can't carry headers; pass the org as a query parameter instead
+const orgParam = ORG_ID ? `&org_id=${encodeURIComponent(ORG_ID)}` : '';
+
+// POST and call onEvent for each NDJSON event (analysis sections, then validation, then done)
+async function streamEvents(path, data, onEvent) {
+  const res = await fetch(`${process.env.REACT_APP_BACKEND_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...(ORG_ID ? { 'X-Org-Id': ORG_ID } : {}) },
+    body: JSON.stringify(data || {}),
+  });
+  if (!res.ok) throw new Error(`Request failed with status ${res.status}`);
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = null;
+  for (;;) {
+    const { value, done: finished } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !finished });
+    const lines = buffer.split('\n');
+    buffer = finished ? '' : lines.pop();
+    for (const line of lines.filter(Boolean)) {
+      const event = JSON.parse(line);
+      if ('done' in event) done = event.done;
+      if (event.error) throw new Error(event.error);
+      onEvent(event);
+    }
+    if (finished) return done;
+  }
+}
+
+// Pages pass one key per submission and reuse it when retrying, so a retry
+// replays the first result instead of re-running the AI
+export const newIdempotencyKey = () => crypto.randomUUID();
+const idempotent = (key) => (key ? { headers: { 'Idempotency-Key': key } } : {});
+
 export const api = {
   // Health
   health: () => API.get('/api/health'),
@@ -11,29 +49,39 @@ export const api = {
   // Users
   getUsers: () => API.get('/api/users'),
   getUser: (id) => API.get(`/api/users/${id}`),
+  updateScores: (id, scores) => API.put(`/api/users/${id}/scores`, { scores }),
+  getScoreHistory: (id, days = 90) => API.get(`/api/users/${id}/scores/history?days=${days}`),
+  getScoreTrends: (id, days = 90, windowDays = 7) => API.get(`/api/users/${id}/scores/trends?days=${days}&window_days=${windowDays}`),
   
   // Dashboard
-  getDashboard: (role) => API.get(`/api/dashboard/${role}`),
+  getDashboard: (role, userId) => API.get(`/api/dashboard/${role}${userId ? `?user_id=${userId}` : ''}`),
   
   // 1-on-1 Sessions
   getSessions: () => API.get('/api/one-on-one/sessions'),
   getSession: (id) => API.get(`/api/one-on-one/sessions/${id}`),
   createSession: (data) => API.post('/api/one-on-one/sessions', data),
-  submitFeedback: (data) => API.post('/api/one-on-one/feedback', data),
+  submitFeedback: (data, key) => API.post('/api/one-on-one/feedback', data, idempotent(key)),
+  submitFeedbackStream: (data, onEvent) => streamEvents('/api/one-on-one/feedback/stream', data, onEvent),
   getBriefingPacket: (data) => API.post('/api/one-on-one/briefing-packet', data),
   
+  // Search
+  search: (params) => API.get('/api/search', { params }),
+  
   // Critical Cases
   getCriticalCases: () => API.get('/api/critical-cases'),
   getCriticalCase: (id) => API.get(`/api/critical-cases/${id}`),
   criticalCaseAction: (id, data) => API.post(`/api/critical-cases/${id}/action`, data),
+  getCaseTimeline: (id, params) => API.get(`/api/critical-cases/${id}/timeline`, { params }),
   
   // Nets
   startNets: (data) => API.post('/api/nets/start', data),
   netsChat: (data) => API.post('/api/nets/chat', data),
   getNetsNudge: (data) => API.post('/api/nets/nudge', data),
-  endNets: (data) => API.post('/api/nets/end', data),
+  endNets: (data, key) => API.post('/api/nets/end', data, idempotent(key)),
+  endNetsStream: (data, onEvent) => streamEvents('/api/nets/end/stream', data, onEvent),
   suggestScenario: (data) => API.post('/api/nets/suggest-scenario', data),
   getNetsSessions: () => API.get('/api/nets/sessions'),
+  getNetsMessages: (id, params) => API.get(`/api/nets/sessions/${id}/messages`, { params }),
   
   // Coaching
   getGoals: (userId) => API.get(`/api/coaching/goals${userId ? `?user_id=${userId}` : ''}`),
@@ -42,6 +90,7 @@ export const api = {
   declineGoal: (id, data) => API.put(`/api/coaching/goals/${id}/decline`, data),
   updateGoalProgress: (id, data) => API.put(`/api/coaching/goals/${id}/update`, data),
   getCoachingFeedback: (data) => API.post('/api/coaching/feedback', data),
+  getGoalCheckIns: (id, params) => API.get(`/api/coaching/goals/${id}/check-ins`, { params }),
   amReviewGoal: (id, data) => API.put(`/api/coaching/goals/${id}/am-review`, data),
   
   // KPI
@@ -54,13 +103,17 @@ export const api = {
   
   // Surveys
   getSurveys: () => API.get('/api/surveys'),
-  createSurvey: (data) => API.post('/api/surveys', data),
+  createSurvey: (data, key) => API.post('/api/surveys', data, idempotent(key)),
   deploySurvey: (id, data) => API.put(`/api/surveys/${id}/deploy`, data),
   respondToSurvey: (id, data) => API.post(`/api/surveys/${id}/respond`, data),
+  respondToSurveyBulk: (id, data) => API.post(`/api/surveys/${id}/respond/bulk`, data),
   analyzeSurvey: (id) => API.post(`/api/surveys/${id}/analyze`),
+  analyzeSurveyStream: (id, onEvent) => streamEvents(`/api/surveys/${id}/analyze/stream`, {}, onEvent),
   generatePulse: (id) => API.post(`/api/surveys/${id}/leadership-pulse`),
   sendPulse: (id, data) => API.post(`/api/surveys/${id}/send-pulse`, data),
   finalAnalysis: (id) => API.post(`/api/surveys/${id}/final-analysis`),
+  surveyExportUrl: (id, format = 'csv') => `${process.env.REACT_APP_BACKEND_URL}/api/surveys/${id}/responses/export?format=${format}${orgParam}`,
+  sessionsExportUrl: (format = 'csv') => `${process.env.REACT_APP_BACKEND_URL}/api/one-on-one/sessions/export?format=${format}${orgParam}`,
   
   // Messages
   getMessages: (role) => API.get(`/api/messages${role ? `?role=${role}` : ''}`),
@@ -72,6 +125,14 @@ export const api = {
   // Performance Chat
   performanceChat: (data) => API.post('/api/performance-chat', data),
   
+  // Org Health Rollups
+  getOrgRollups: () => API.get('/api/org-health/rollups'),
+  
+  // Score Analytics
+  getScoreAnalytics: () => API.get('/api/analytics/scores'),
+  getScoreCohorts: (by) => API.get(`/api/analytics/cohorts?by=${by || 'team'}`),
+  getUserScoreFacts: (id) => API.get(`/api/analytics/users/${id}`),
+  
   // Coaching Assignment
   assignCoaching: (data) => API.post('/api/coaching/assign', data),
 };